@@ -0,0 +1,122 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from rule_engine import RuleStats, STATS_PATH, default_rules, flag_frame, client_frame, store_frame
+
+# Clients per task: large enough to amortise the frame build, small enough to balance the workers
+CHUNK_SIZE = 5000
+
+# What the workers read, set once per worker by _init_worker. With the fork start method
+# the clients and the reference data loaded by the parent are inherited copy-on-write.
+_job = {}
+
+
+def warm_reference_data(clients, rules):
+    """
+    Loads in the parent, before the workers are forked, the reference data the rules
+    read: the country lookup table, the phone metadata and the memory-mapped postal index
+    of every country of domicile in the batch.
+    """
+    from countries import resolver
+
+    resolver._table()
+    if 'phone_country' in rules:
+        from phonenumbers.phonemetadata import PhoneMetadata
+        PhoneMetadata.load_all()
+    if 'postal_code' in rules:
+        from flags_AS import get_postal_index
+        from geodata import warm_up
+        if isinstance(clients, str):
+            from client_store import read_columns
+            countries = read_columns(clients, ['client_profile.country_of_domicile'])
+            clients = [{'client_profile': {'country_of_domicile': c}}
+                       for c in countries['client_profile.country_of_domicile'].dropna()]
+        warm_up(get_postal_index(), clients)
+
+
+def _init_worker(job):
+    _job.update(job)
+
+
+def _flag_chunk(bounds):
+    start, end = bounds
+    clients, flag_fn = _job['clients'], _job['flag_fn']
+    if flag_fn is not None:
+        results = [flag_fn(clients[i]) for i in range(start, end)]
+        return [flag for flag, _ in results], [errors for _, errors in results], {}
+    if isinstance(clients, str):
+        frame = store_frame(clients, rows=range(start, end))
+    else:
+        frame = client_frame([clients[i] for i in range(start, end)])
+    stats = RuleStats(None)
+    flags_preds, client_errors = flag_frame(frame, _job['rules'], _job['mode'], stats, _job['order'])
+    return flags_preds, client_errors, stats.totals
+
+
+def _num_clients(clients):
+    if isinstance(clients, str):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(clients).metadata.num_rows
+    return len(clients)
+
+
+def flag_clients_parallel(clients, rules=None, mode="explain", workers=None, chunk_size=CHUNK_SIZE,
+                          stats_path=STATS_PATH, flag_fn=None):
+    """
+    flag_clients over a process pool: the batch is cut into chunks of consecutive clients,
+    each worker flags whole chunks, and the results are put back in client order, so the
+    output equals that of the serial run.
+
+    Args:
+        clients: Client dicts (list, LazyClients, ...), or a path to a Parquet store
+            (each worker then reads only its own rows).
+        rules (list): Rule names (default: default_rules()). In decide mode they are
+            ordered once from the rule statistics, so every chunk uses the same order.
+        mode (str): 'explain' or 'decide' (see rule_engine.flag_clients).
+        workers (int): Pool size (default: os.cpu_count()); 1 runs in-process.
+        chunk_size (int): Clients per task.
+        stats_path (str): Rule statistics file, read for the ordering and updated with
+            the workers' totals (None to neither read nor write it).
+        flag_fn (callable): Optional per-client check (client -> (flag, errors)), e.g.
+            check_all_flags, run instead of the rule engine.
+
+    Returns:
+        tuple: (flags_preds, client_errors).
+    """
+    if mode not in ("explain", "decide"):
+        raise ValueError(f"Unknown mode: {mode}")
+    names = default_rules() if rules is None else list(rules)
+    stats = RuleStats(stats_path)
+    order = stats.schedule(names) if mode == "decide" else None
+    if flag_fn is None:
+        warm_reference_data(clients, names)
+
+    n = _num_clients(clients)
+    chunks = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+    job = {'clients': clients, 'rules': names, 'order': order, 'mode': mode, 'flag_fn': flag_fn}
+    workers = workers or os.cpu_count()
+
+    start = time.perf_counter()
+    if workers == 1 or len(chunks) <= 1:
+        _init_worker(job)
+        results = [_flag_chunk(chunk) for chunk in chunks]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(job,)) as pool:
+            results = list(pool.map(_flag_chunk, chunks))
+
+    flags_preds, client_errors = [], []
+    for chunk_preds, chunk_errors, totals in results:
+        flags_preds.extend(chunk_preds)
+        client_errors.extend(chunk_errors)
+        stats.merge(totals)
+    stats.save()
+    print(f"Flagged {n} clients in {time.perf_counter() - start:.1f}s "
+          f"({len(chunks)} chunks, {min(workers, len(chunks))} workers)")
+    return flags_preds, client_errors
+
+# USAGE: flags_preds, client_errors = flag_clients_parallel(load_clients("clients_eval.jsonl"), mode="decide", workers=8)
@@ -0,0 +1,101 @@
+import os
+import json
+
+CHECKPOINT_PATH = "run_checkpoint.jsonl"
+
+
+class CheckpointLog:
+    """
+    Append-only JSON Lines log of the final decision of each client of a scoring run,
+    written batch by batch, so that a crashed run can be resumed without redoing the
+    clients (and the LLM calls) it had already decided.
+
+    The first line describes the run (source, mode, rules, checks, ...); a resumed run
+    must describe itself the same way. Every other line is one client:
+    {"client": i, "flag": bool, "errors": [...]}. A line cut short by a crash is dropped
+    on open. compact() turns the log into the solution csv and the errors file.
+
+    Args:
+        path (str): Log file.
+        run (dict): Description of the run, stored in the first line.
+        resume (bool): Keep the clients already in the log (False starts a new log).
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH, run=None, resume=False):
+        self.path = path
+        self.run = json.loads(json.dumps(run or {}))
+        self.decided = {}
+        if not (resume and os.path.exists(path) and self._load()):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"run": self.run}, sort_keys=True) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        # Reads the log back and cuts off a torn last line; False if not even the header survived
+        good = 0
+        with open(self.path, "rb") as f:
+            for n, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn last line of a crashed run
+                if not line.endswith(b"\n"):
+                    break
+                if n == 0:
+                    if record.get("run") != self.run:
+                        raise ValueError(f"{self.path} was written by a different run: {record.get('run')}; "
+                                         "start without resume to overwrite it")
+                else:
+                    self.decided[record["client"]] = (record["flag"], record["errors"])
+                good += len(line)
+        with open(self.path, "r+b") as f:
+            f.truncate(good)
+        return good > 0
+
+    def __contains__(self, client):
+        return client in self.decided
+
+    def __len__(self):
+        return len(self.decided)
+
+    def append(self, indices, flags_preds, client_errors):
+        """
+        Logs the decisions of a batch and syncs them to disk before returning.
+        """
+        lines = []
+        for i, flag, messages in zip(indices, flags_preds, client_errors):
+            flag, messages = bool(flag), list(messages)
+            self.decided[i] = (flag, messages)
+            lines.append(json.dumps({"client": i, "flag": flag, "errors": messages}, ensure_ascii=False) + "\n")
+        self._file.write("".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def compact(self, num_clients, solution_path="solution.csv", errors_path="client_errors.jsonl"):
+        """
+        Writes the solution csv and the errors file of clients 0..num_clients-1 from the
+        log, in client order. A resumed run therefore writes the same bytes as one that
+        was never interrupted.
+
+        Args:
+            num_clients (int): Clients in the run; each of them must be in the log.
+            solution_path (str): 'client_{i};Accept|Reject' csv.
+            errors_path (str): Per-client errors, written by reason_codes.write_errors
+                (JSON Lines for a .jsonl path).
+        """
+        from reason_codes import write_errors
+
+        missing = [i for i in range(num_clients) if i not in self.decided]
+        if missing:
+            raise ValueError(f"{len(missing)} clients are not in {self.path} yet (e.g. client_{missing[0]})")
+        with open(solution_path, "w", encoding="utf-8") as f:
+            for i in range(num_clients):
+                f.write(f"client_{i};{'Accept' if self.decided[i][0] else 'Reject'}\n")
+        write_errors([self.decided[i][1] for i in range(num_clients)], errors_path)
+
+# USAGE: log = CheckpointLog("run_checkpoint.jsonl", run={"mode": "decide"}, resume=True); log.append(indices, flags_preds, client_errors); log.compact(n)
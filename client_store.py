@@ -0,0 +1,318 @@
+import json
+import pickle
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PRESENT_COLUMN = "_present"
+STORE_METADATA_KEY = b"client_store"
+
+# Type signatures used to lay out the store: a scalar name, ('list', elem) or
+# ('struct', keys, fields, nullable). Anything that cannot be merged is CONFLICT and
+# is stored as JSON text so the record round-trips exactly. That includes ints mixed with
+# floats: a float column would give 140000 back as 140000.0, which the rules compare as text.
+CONFLICT = "conflict"
+_SCALARS = {bool: "bool", int: "int", float: "float", str: "str"}
+_ARROW_SCALARS = {"null": pa.string(), "bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+
+
+def _signature(value):
+    if value is None:
+        return "null"
+    if isinstance(value, dict):
+        return ("struct", tuple(value), tuple(_signature(v) for v in value.values()), False)
+    if isinstance(value, list):
+        elem = "null"
+        for item in value:
+            elem = _merge(elem, _signature(item))
+        return ("list", elem)
+    return _SCALARS.get(type(value), CONFLICT)
+
+
+def _merge(a, b):
+    if a == b:
+        return a
+    if a == CONFLICT or b == CONFLICT:
+        return CONFLICT
+    if a == "null":
+        return ("struct",) + b[1:3] + (True,) if isinstance(b, tuple) and b[0] == "struct" else b
+    if b == "null":
+        return _merge(b, a)
+    if isinstance(a, tuple) and isinstance(b, tuple) and a[0] == b[0]:
+        if a[0] == "list":
+            return ("list", _merge(a[1], b[1]))
+        if a[1] == b[1]:
+            # A conflicting field only turns that field into JSON, not the whole dict
+            return ("struct", a[1], tuple(_merge(x, y) for x, y in zip(a[2], b[2])), a[3] or b[3])
+    return CONFLICT
+
+
+def _contains_conflict(sig):
+    if sig == CONFLICT:
+        return True
+    if isinstance(sig, tuple):
+        children = [sig[1]] if sig[0] == "list" else sig[2]
+        return any(_contains_conflict(child) for child in children)
+    return False
+
+
+def _arrow_type(sig):
+    if isinstance(sig, tuple):
+        if sig[0] == "list":
+            return pa.list_(_arrow_type(sig[1]))
+        return pa.struct([pa.field(k, _arrow_type(s)) for k, s in zip(sig[1], sig[2])])
+    return _ARROW_SCALARS[sig]
+
+
+def _layout_columns(path, sig, columns):
+    # Fixed-shape, never-null dicts are expanded into dotted columns; every other value is a leaf
+    if isinstance(sig, tuple) and sig[0] == "struct" and not sig[3] and sig[1]:
+        for key, child in zip(sig[1], sig[2]):
+            _layout_columns(path + (key,), child, columns)
+        return
+    as_json = _contains_conflict(sig)
+    columns.append({
+        "name": ".".join(path),
+        "path": list(path),
+        "json": as_json,
+        "type": pa.string() if as_json else _arrow_type(sig),
+    })
+
+
+def infer_layout(clients):
+    """
+    Works out the flattened column layout of a collection of client dicts.
+
+    Args:
+        clients (iterable): Client dicts (None for missing clients).
+
+    Returns:
+        list: One dict per column with its 'name', 'path', 'json' flag and Arrow 'type'.
+    """
+    section_sigs = {}
+    seen = 0
+    for client in clients:
+        if client is None:
+            continue
+        seen += 1
+        for section in section_sigs:
+            if section not in client:
+                section_sigs[section] = _merge(section_sigs[section], "null")
+        for section, value in client.items():
+            if section in section_sigs:
+                section_sigs[section] = _merge(section_sigs[section], _signature(value))
+            else:
+                # A section first seen after other clients lacked it is nullable
+                sig = _signature(value)
+                section_sigs[section] = _merge(sig, "null") if seen > 1 else sig
+    columns = []
+    for section, sig in section_sigs.items():
+        _layout_columns((section,), sig, columns)
+    return columns
+
+
+def _dig(client, path):
+    value = client
+    for key in path:
+        if value is None:
+            return None
+        value = value.get(key)
+    return value
+
+
+def _to_batch(clients, layout, schema):
+    arrays = [pa.array([client is not None for client in clients], type=pa.bool_())]
+    for column in layout:
+        values = [_dig(client, column["path"]) for client in clients]
+        if column["json"]:
+            values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+        arrays.append(pa.array(values, type=column["type"]))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_store(clients, out_path, row_group_size=1024):
+    """
+    Writes clients to a columnar Parquet store.
+
+    Every section (passport, client_profile, account_form, client_description, label) is
+    flattened into one column per field, e.g. 'client_profile.aum.savings'. Fields whose
+    values do not share one type are kept as JSON text so the records round-trip exactly.
+
+    Args:
+        clients (sequence or callable): The clients (None for missing ones). Two passes
+            are made, so pass a list or a zero-argument callable returning a fresh iterator.
+        out_path (str): Destination Parquet file (e.g. 'clients_eval.parquet').
+        row_group_size (int): Clients per row group; row ranges are read at this granularity.
+
+    Returns:
+        int: Number of rows written.
+    """
+    source = clients if callable(clients) else (lambda: iter(clients))
+    layout = infer_layout(source())
+    metadata = {
+        "columns": [{"name": c["name"], "path": c["path"], "json": c["json"]} for c in layout],
+    }
+    schema = pa.schema(
+        [pa.field(PRESENT_COLUMN, pa.bool_())] + [pa.field(c["name"], c["type"]) for c in layout],
+        metadata={STORE_METADATA_KEY: json.dumps(metadata)},
+    )
+
+    rows = 0
+    with pq.ParquetWriter(out_path, schema) as writer:
+        batch = []
+        for client in source():
+            batch.append(client)
+            if len(batch) == row_group_size:
+                writer.write_batch(_to_batch(batch, layout, schema), row_group_size=row_group_size)
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(_to_batch(batch, layout, schema), row_group_size=row_group_size)
+            rows += len(batch)
+    return rows
+
+
+def build_store(source_path, out_path, row_group_size=1024):
+    """
+    Converts a JSON Lines store (save_data.py) or a legacy pickle into a Parquet store.
+    """
+    if source_path.endswith(".jsonl"):
+        from save_data import iter_store
+        return write_store(lambda: iter_store(source_path), out_path, row_group_size)
+    with open(source_path, "rb") as f:
+        clients = pickle.load(f)
+    return write_store(clients, out_path, row_group_size)
+
+
+def store_layout(store_path):
+    """
+    Returns the column descriptions recorded in a store.
+    """
+    schema = pq.read_schema(store_path)
+    return json.loads(schema.metadata[STORE_METADATA_KEY])["columns"]
+
+
+def _select_columns(layout, columns):
+    if columns is None:
+        return [c["name"] for c in layout]
+    # A prefix such as 'client_profile.aum' selects all of its sub-columns
+    selected = []
+    for wanted in columns:
+        matches = [c["name"] for c in layout if c["name"] == wanted or c["name"].startswith(wanted + ".")]
+        if not matches:
+            raise KeyError(f"Unknown store column: {wanted}")
+        selected.extend(m for m in matches if m not in selected)
+    return selected
+
+
+def _row_groups(parquet, rows):
+    # (start, stop, row groups overlapping [start, stop), index of the first row of the first one)
+    num_rows = parquet.metadata.num_rows
+    start, stop = 0, num_rows
+    if rows is not None:
+        start, stop, _ = slice(rows.start, rows.stop).indices(num_rows)
+    groups, offset, first_row = [], 0, None
+    for g in range(parquet.metadata.num_row_groups):
+        group_rows = parquet.metadata.row_group(g).num_rows
+        if offset < stop and offset + group_rows > start:
+            groups.append(g)
+            first_row = offset if first_row is None else first_row
+        offset += group_rows
+    return start, stop, groups, first_row
+
+
+def read_columns(store_path, columns=None, rows=None):
+    """
+    Reads only the requested columns and rows of a store.
+
+    Args:
+        store_path (str): Parquet store written by write_store.
+        columns (list): Column names or prefixes (e.g. ['client_profile.aum',
+            'passport.first_name']). None reads every column.
+        rows (range or slice): Client indices to read (step 1). None reads every row.
+            Only the row groups overlapping the range are decoded.
+
+    Returns:
+        pd.DataFrame: One row per client, indexed by client index, with the '_present'
+            column first. JSON columns are decoded back to Python objects.
+    """
+    layout = store_layout(store_path)
+    names = _select_columns(layout, columns)
+    json_columns = {c["name"] for c in layout if c["json"]}
+
+    parquet = pq.ParquetFile(store_path)
+    start, stop, groups, first_row = _row_groups(parquet, rows)
+    if not groups:
+        return pd.DataFrame(columns=[PRESENT_COLUMN] + names)
+
+    table = parquet.read_row_groups(groups, columns=[PRESENT_COLUMN] + names)
+    table = table.slice(start - first_row, stop - start)
+    df = table.to_pandas()
+    for name in names:
+        field_type = table.schema.field(name).type
+        if name in json_columns:
+            df[name] = pd.Series([None if v is None else json.loads(v) for v in table.column(name).to_pylist()],
+                                 index=df.index, dtype=object)
+        elif pa.types.is_nested(field_type) or pa.types.is_string(field_type):
+            # to_pandas turns nullable ints inside lists/structs into floats, and null strings
+            # into NaN with the pandas string dtype; keep the Python values
+            df[name] = pd.Series(table.column(name).to_pylist(), index=df.index, dtype=object)
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def _unflatten(row, layout):
+    client = {}
+    for column in layout:
+        value = row[column["name"]]
+        if value is None and len(column["path"]) == 1:
+            continue  # section absent for this client
+        if column["json"] and value is not None:
+            value = json.loads(value)
+        node = client
+        for key in column["path"][:-1]:
+            node = node.setdefault(key, {})
+        node[column["path"][-1]] = value
+    return client
+
+
+def iter_clients(store_path, rows=None, batch_size=1024):
+    """
+    Yields client dicts from a store one row group at a time (None for missing clients).
+
+    Only batch_size clients are materialised at once, so per-client rule checks can run
+    over the whole store without building the full list of dicts. As in read_columns,
+    only the row groups overlapping rows are decoded.
+    """
+    layout = store_layout(store_path)
+    parquet = pq.ParquetFile(store_path)
+    start, stop, groups, index = _row_groups(parquet, rows)
+    if not groups:
+        return
+    for batch in parquet.iter_batches(batch_size=batch_size, row_groups=groups):
+        batch_rows = batch.num_rows
+        if index + batch_rows <= start:
+            index += batch_rows
+            continue
+        for row in batch.to_pylist():
+            if start <= index < stop:
+                yield _unflatten(row, layout) if row[PRESENT_COLUMN] else None
+            index += 1
+        if index >= stop:
+            return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a columnar Parquet client store.")
+    parser.add_argument("source", help="JSON Lines store from save_data.py or a legacy clients pickle")
+    parser.add_argument("out", help="output Parquet store (e.g. clients_eval.parquet)")
+    parser.add_argument("--row-group-size", type=int, default=1024)
+    args = parser.parse_args(argv)
+    rows = build_store(args.source, args.out, args.row_group_size)
+    print(f"Wrote {rows} clients to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import json
+import mmap
+
+import numpy as np
+
+
+def normalize_client(client):
+    """
+    Applies the fix-ups load_updated_data.load_clients used to run over the whole list:
+    a passport_number wrapped in a list is unwrapped to its first element.
+    """
+    if client is None:
+        return None
+    for section in ("account_form", "client_profile"):
+        if section in client and type(client[section].get("passport_number")) not in (str, type(None)):
+            client[section]["passport_number"] = client[section]["passport_number"][0]
+    return client
+
+
+def build_offsets(store_path, index_path=None):
+    """
+    Writes the byte offset of every line of a JSON Lines store to '<store>.idx'.
+
+    The index holds num_clients + 1 uint64 values, so line i spans offsets[i]:offsets[i + 1].
+    """
+    if index_path is None:
+        index_path = store_path + ".idx"
+    with open(store_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            ends = np.zeros(0, dtype=np.uint64)
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                ends = np.flatnonzero(np.frombuffer(mm, dtype=np.uint8) == ord("\n")).astype(np.uint64) + 1
+    offsets = np.concatenate([np.zeros(1, dtype=np.uint64), ends])
+    offsets.tofile(index_path)
+    return index_path
+
+
+class LazyClients:
+    """
+    Read-only list-like view of a JSON Lines client store (save_data.py).
+
+    The store and its line-offset index are memory-mapped, and each client is decoded
+    (and normalised) only when it is accessed, so opening the view costs a few
+    milliseconds and iterating over it keeps one client in memory at a time.
+
+    Args:
+        store_path (str): JSON Lines store, one client per line ('null' for missing ones).
+        normalize (callable): Applied to every decoded client (default: normalize_client).
+    """
+
+    def __init__(self, store_path, normalize=normalize_client):
+        self.store_path = store_path
+        self.index_path = store_path + ".idx"
+        self.normalize = normalize
+        self._open()
+
+    def _index_is_current(self):
+        # A store replaced by a file with an older mtime is caught by the size check: the
+        # last offset of an index is the size of the store it was built from
+        if (not os.path.exists(self.index_path)
+                or os.path.getmtime(self.index_path) < os.path.getmtime(self.store_path)):
+            return False
+        index_size = os.path.getsize(self.index_path)
+        if index_size == 0 or index_size % 8:
+            return False
+        with open(self.index_path, "rb") as f:
+            f.seek(index_size - 8)
+            last = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        return last == os.path.getsize(self.store_path)
+
+    def _open(self):
+        if not self._index_is_current():
+            build_offsets(self.store_path, self.index_path)
+        self._offsets = np.memmap(self.index_path, dtype=np.uint64, mode="r") \
+            if os.path.getsize(self.index_path) else np.zeros(1, dtype=np.uint64)
+        self._file = open(self.store_path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.path.getsize(self.store_path) else b""
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __getstate__(self):
+        # Worker processes re-map the files instead of receiving their contents
+        return {"store_path": self.store_path, "normalize": self.normalize}
+
+    def __setstate__(self, state):
+        self.__init__(state["store_path"], state["normalize"])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _decode(self, i):
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        client = json.loads(self._mm[start:end])
+        return self.normalize(client) if self.normalize else client
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._decode(j) for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("client index out of range")
+        return self._decode(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._decode(i)
+
+    def __repr__(self):
+        return f"LazyClients({self.store_path!r}, {len(self)} clients)"
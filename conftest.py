@@ -0,0 +1,15 @@
+import os
+import pickle
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The evaluation clients shipped with the repo (a few of them are None: missing zips)
+EVAL_CLIENTS_PATH = os.path.join(HERE, "clients_eval.pkl")
+
+
+@pytest.fixture
+def eval_clients():
+    with open(EVAL_CLIENTS_PATH, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,150 @@
+import re
+
+import pycountry
+
+# Separators seen in multi-country fields ('Spain, France', 'Germany; Austria')
+COUNTRY_SEPARATORS = re.compile(r"[;,:\|]+")
+
+
+class CountryResolver:
+    """
+    Resolves country strings to ISO codes, demonyms and calling codes through lookup
+    tables, so every rule does a dictionary lookup instead of a pycountry/CountryInfo
+    call per client.
+
+    The name table is precomputed from pycountry with the keys pycountry.countries.lookup
+    accepts (alpha-2, alpha-3, numeric, name, official and common name, case-insensitive).
+    Demonyms and calling codes are computed once per distinct input and memoised.
+    hits/misses count the lookups answered from a table against the ones that had to be
+    computed.
+    """
+
+    def __init__(self):
+        self._by_key = None
+        self._demonyms = {}
+        self._calling_codes = {}
+        self.hits = {"country": 0, "demonym": 0, "calling_code": 0}
+        self.misses = {"country": 0, "demonym": 0, "calling_code": 0}
+
+    def _table(self):
+        if self._by_key is None:
+            by_key = {}
+            for country in pycountry.countries:
+                for attr in ("alpha_2", "alpha_3", "numeric", "name", "official_name", "common_name"):
+                    value = getattr(country, attr, None)
+                    if value:
+                        by_key.setdefault(value.lower(), country)
+            self._by_key = by_key
+        return self._by_key
+
+    def lookup(self, country_name):
+        """
+        Returns the pycountry record of a country name or code (None if unknown), with the
+        matching rules of pycountry.countries.lookup.
+        """
+        if not isinstance(country_name, str):
+            self.misses["country"] += 1
+            return None
+        table = self._table()
+        key = country_name.lower()
+        if key in table:
+            self.hits["country"] += 1
+            return table[key]
+        # pycountry also matches a few historic and alternative names; ask it once and remember
+        self.misses["country"] += 1
+        try:
+            country = pycountry.countries.lookup(country_name)
+        except LookupError:
+            country = None
+        table[key] = country
+        return country
+
+    def alpha_2(self, country_name):
+        country = self.lookup(country_name)
+        return country.alpha_2 if country else None
+
+    def alpha_3(self, country_name):
+        country = self.lookup(country_name)
+        return country.alpha_3 if country else None
+
+    def demonym(self, country_name, default='Unknown'):
+        """
+        Returns the CountryInfo demonym of a country (e.g. 'Danish'), or default.
+        """
+        if country_name in self._demonyms:
+            self.hits["demonym"] += 1
+        else:
+            self.misses["demonym"] += 1
+            from countryinfo import CountryInfo
+            try:
+                self._demonyms[country_name] = CountryInfo(country_name).info().get('demonym')
+            except Exception:
+                self._demonyms[country_name] = None
+        demonym = self._demonyms[country_name]
+        return default if demonym is None else demonym
+
+    def calling_code(self, region_code):
+        """
+        Returns the international calling code of an alpha-2 region (e.g. 'DK' -> 45),
+        or 0 for an unknown region, as phonenumbers.country_code_for_region does.
+        """
+        if region_code in self._calling_codes:
+            self.hits["calling_code"] += 1
+        else:
+            self.misses["calling_code"] += 1
+            import phonenumbers
+            self._calling_codes[region_code] = phonenumbers.country_code_for_region(region_code)
+        return self._calling_codes[region_code]
+
+    def split(self, countries_field, separators=COUNTRY_SEPARATORS):
+        """
+        Splits a multi-country field into stripped names ('Spain, France' -> ['Spain', 'France']).
+        """
+        if not isinstance(countries_field, str):
+            return []
+        return [name.strip() for name in separators.split(countries_field)]
+
+    def alpha_2_all(self, countries_field, separators=COUNTRY_SEPARATORS):
+        """
+        Returns the alpha-2 codes of every recognised country of a multi-country field.
+        """
+        codes = [self.alpha_2(name) for name in self.split(countries_field, separators)]
+        return [code for code in codes if code]
+
+    def stats(self):
+        """
+        Returns hits, misses and hit rate per table.
+        """
+        out = {}
+        for table in self.hits:
+            total = self.hits[table] + self.misses[table]
+            out[table] = {"hits": self.hits[table], "misses": self.misses[table],
+                          "hit_rate": self.hits[table] / total if total else None}
+        return out
+
+
+# Shared by every module in the process
+resolver = CountryResolver()
+
+
+def get_country_code(country_name):
+    """
+    Convert a full country name (e.g., 'Spain') to ISO Alpha-2 code (e.g., 'ES').
+    """
+    return resolver.alpha_2(country_name)
+
+
+def get_alpha_3_country_code(country_name):
+    """
+    Convert a full country name (e.g., 'Denmark') to the passport-style ISO Alpha-3 code ('DNK').
+    """
+    return resolver.alpha_3(country_name)
+
+
+def get_nationality(country_name):
+    """
+    Return the demonym of a country (e.g., 'Switzerland' -> 'Swiss'), or 'Unknown'.
+    """
+    return resolver.demonym(country_name)
+
+# USAGE: get_alpha_3_country_code("Denmark"); resolver.alpha_2_all("Germany; Austria"); resolver.stats()
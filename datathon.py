@@ -0,0 +1,140 @@
+import sys
+import argparse
+import importlib
+
+# Commands handled by the main() of another module: name -> (module, help)
+DELEGATED = {
+    "ingest": ("save_data", "decode client_{i}.zip files into a JSON Lines store"),
+    "store": ("client_store", "build a columnar Parquet client store"),
+    "geodata": ("geodata", "build the offline geodata bundle of the postal-code checks"),
+    "llm-stub": ("ollama_stub", "serve a stub of the ollama chat API"),
+}
+
+
+def write_solution(flags_preds, solution_path="solution.csv"):
+    with open(solution_path, "w", encoding="utf-8") as f:
+        for i, flag in enumerate(flags_preds):
+            f.write(f"client_{i};{'Accept' if flag else 'Reject'}\n")
+
+
+def flag(args):
+    from rule_engine import flag_clients
+    from reason_codes import write_errors
+
+    if args.clients.endswith(".parquet"):
+        clients = args.clients
+    else:
+        from load_updated_data import load_clients
+        clients = load_clients(args.clients)
+    flags_preds, client_errors = flag_clients(clients, mode=args.mode)
+    write_solution(flags_preds, args.solution)
+    write_errors(client_errors, args.errors)
+    print(f"Flagged {len(flags_preds)} clients: {sum(flags_preds)} accepted -> {args.solution}")
+
+
+def fit_encoders(args):
+    from load_updated_data import load_clients
+    from encode_data import fit_encoder_bundle
+
+    fit_encoder_bundle(load_clients(args.clients), args.out)
+    print(f"Encoder bundle written to {args.out}")
+
+
+def features(args):
+    from encode_data import data_for_ML
+    from feature_cache import FeatureCache
+
+    frame = FeatureCache(args.cache_dir).load(args.clients, data_for_ML, bundle_path=args.bundle)
+    if args.out:
+        frame.to_parquet(args.out)
+    print(f"{frame.shape[0]} clients x {frame.shape[1]} features" + (f" -> {args.out}" if args.out else ""))
+
+
+def stream(args):
+    from stream_pipeline import run_streaming
+
+    runner = None
+    if args.model:
+        from llm_checks import LLMRunner
+        runner = LLMRunner(args.model, host=args.host)
+    checkpoint_path = args.checkpoint
+    if args.resume and checkpoint_path is None:
+        from checkpoint import CHECKPOINT_PATH
+        checkpoint_path = CHECKPOINT_PATH
+    report = run_streaming(args.source, args.solution, args.errors, mode=args.mode, runner=runner,
+                           prefilter=args.prefilter, batch_size=args.batch_size,
+                           checkpoint_path=checkpoint_path, resume=args.resume)
+    print(report)
+
+
+def eval_rules(args):
+    from rule_eval import evaluate_rules
+
+    table = evaluate_rules(args.clients, rules=args.rules)
+    if args.out:
+        table.to_csv(args.out)
+    print(table.drop(columns="reason").round(3).sort_values(args.sort, ascending=False).to_string())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="datathon", description="Client onboarding pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in DELEGATED.items():
+        sub.add_parser(name, help=help_text, add_help=False)
+
+    p = sub.add_parser("flag", help="run the rule engine and write solution.csv")
+    p.add_argument("clients", help="client pickle, JSON Lines or Parquet store")
+    p.add_argument("--mode", choices=["explain", "decide"], default="explain")
+    p.add_argument("--solution", default="solution.csv")
+    p.add_argument("--errors", default="client_errors.jsonl",
+                   help="JSON Lines (.jsonl), reason masks (.parquet) or pickle of the error messages")
+    p.set_defaults(run=flag)
+
+    p = sub.add_parser("fit-encoders", help="fit the encoder bundle on the training clients")
+    p.add_argument("clients", help="training client pickle or JSON Lines store")
+    p.add_argument("--out", default="encoder_bundle.pkl")
+    p.set_defaults(run=fit_encoders)
+
+    p = sub.add_parser("features", help="compute (or load from the cache) the feature frame")
+    p.add_argument("clients", help="client pickle or JSON Lines store")
+    p.add_argument("--bundle", default=None, help="saved encoder bundle (default: fit on the clients)")
+    p.add_argument("--cache-dir", default="feature_cache")
+    p.add_argument("--out", default=None, help="also write the frame to this Parquet file")
+    p.set_defaults(run=features)
+
+    p = sub.add_parser("stream", help="stream clients through the rules and LLM checks into the output files")
+    p.add_argument("source", help="client zip folder, JSON Lines or Parquet store")
+    p.add_argument("--solution", default="client_labels.csv")
+    p.add_argument("--errors", default="client_errors.jsonl")
+    p.add_argument("--mode", choices=["explain", "decide"], default="explain")
+    p.add_argument("--model", default=None, help="ollama model of the LLM checks (default: rules only)")
+    p.add_argument("--host", default=None, help="ollama server (default: the ollama client's)")
+    p.add_argument("--prefilter", action="store_true", help="answer what the text matchers can first")
+    p.add_argument("--batch-size", type=int, default=256)
+    p.add_argument("--checkpoint", default=None, help="append-only log of the decisions, compacted into the outputs")
+    p.add_argument("--resume", action="store_true",
+                   help="skip the clients already decided in the checkpoint (default: run_checkpoint.jsonl)")
+    p.set_defaults(run=stream)
+
+    p = sub.add_parser("eval-rules", help="score every rule against labelled clients")
+    p.add_argument("clients", help="labelled client pickle, JSON Lines or Parquet store")
+    p.add_argument("--rules", nargs="+", default=None, help="rule names (default: the default rules)")
+    p.add_argument("--sort", default="gain_recall", help="column to sort the table by")
+    p.add_argument("--out", default=None, help="also write the table to this csv")
+    p.set_defaults(run=eval_rules)
+    return parser
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Heavy modules are only imported by the command that needs them
+    if argv and argv[0] in DELEGATED:
+        return importlib.import_module(DELEGATED[argv[0]][0]).main(argv[1:])
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    main()
+
+# USAGE: python datathon.py flag clients_eval.pkl --mode decide; datathon ingest data/eval clients_eval.jsonl
@@ -0,0 +1,110 @@
+import pickle
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+ENCODER_BUNDLE_PATH = "encoder_bundle.pkl"
+
+# Columns of data_to_df encoded with one LabelEncoder each, in the order encode() ran them
+LABEL_COLUMNS = ['gender', 'nationality', 'investment_risk_profile', 'investment_horizon', 'type_of_mandate',
+                 'country_code', 'country_of_domicile', 'marital_status', 'investment_experience', 'currency']
+
+# Code given to a category the encoder was not fitted on
+UNSEEN = -1
+
+
+class EncoderBundle:
+    """
+    All the encoders of encode_data.encode, fitted once on the training frame and
+    reused as they are on every later batch, so train and eval share one vocabulary.
+
+    Args:
+        encoders (dict): Optional column -> LabelEncoder to fit (default: new ones).
+        pref_markets_encoder (MultiLabelBinarizer): Optional encoder of 'preferred_markets'.
+        reference_date (str): Date ages are computed at (default: 5 days before the time
+            of the transform).
+    """
+
+    def __init__(self, encoders=None, pref_markets_encoder=None, reference_date=None):
+        from sklearn.preprocessing import LabelEncoder, MultiLabelBinarizer
+
+        self.encoders = encoders if encoders is not None else {column: LabelEncoder() for column in LABEL_COLUMNS}
+        self.pref_markets_encoder = pref_markets_encoder if pref_markets_encoder is not None else MultiLabelBinarizer()
+        self.reference_date = reference_date
+        self.fitted = False
+
+    def fit(self, df: pd.DataFrame) -> "EncoderBundle":
+        """
+        Fits every encoder on a data_to_df frame (the training clients).
+        """
+        for column, encoder in self.encoders.items():
+            encoder.fit(df[column])
+        self.pref_markets_encoder.fit(df['preferred_markets'].to_list())
+        self.fitted = True
+        return self
+
+    def _codes(self, column, values):
+        # LabelEncoder.transform, with UNSEEN instead of an error for new categories
+        # (get_indexer gives -1 for them; pd.Categorical will refuse values outside its categories)
+        codes = pd.Index(self.encoders[column].classes_).get_indexer(values).astype(np.int64)
+        return np.where(codes < 0, UNSEEN, codes)
+
+    def _pref_markets(self, markets, index):
+        classes = self.pref_markets_encoder.classes_
+        position = {market: i for i, market in enumerate(classes)}
+        counts = np.fromiter(map(len, markets), dtype=np.int64, count=len(markets))
+        rows = np.repeat(np.arange(len(markets)), counts)
+        cols = np.fromiter((position.get(market, -1) for row in markets for market in row),
+                           dtype=np.int64, count=int(counts.sum()))
+        known = cols >= 0  # markets the encoder has not seen get no column
+        matrix = np.zeros((len(markets), len(classes)), dtype=np.int64)
+        matrix[rows[known], cols[known]] = 1
+        return pd.DataFrame(matrix, index=index, columns=[f'pref_markets_{i}' for i in range(len(classes))])
+
+    def _ages(self, birth_dates):
+        now = pd.Timestamp(self.reference_date) if self.reference_date is not None \
+            else pd.Timestamp(datetime.now() - timedelta(5))
+        dates = pd.to_datetime(birth_dates, format="%Y-%m-%d", errors="coerce")
+        ages = (now - dates).dt.days // 365
+        if ages.isna().any():
+            print(f"{int(ages.isna().sum())} invalid birth dates. Use YYYY-MM-DD.")
+            return ages.to_numpy(dtype=np.float64, na_value=np.nan)
+        return ages.to_numpy(dtype=np.int64)
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Encodes a data_to_df frame with the fitted encoders, without refitting.
+
+        Returns:
+            The frame with the label columns replaced by their codes (UNSEEN for new
+            categories), higher_education as 0/1, one pref_markets_<i> column per market
+            seen at fit time and an 'age' column, laid out as encode_data.encode does.
+        """
+        if not self.fitted:
+            raise ValueError("EncoderBundle is not fitted; fit it on the training frame or load a saved one")
+        columns = {column: self._codes(column, df[column]) for column in self.encoders}
+        columns['higher_education'] = np.fromiter(
+            (0 if higher_ed is None or len(higher_ed) == 0 else 1 for higher_ed in df['higher_education']),
+            dtype=np.int64, count=len(df))
+        encoded = df.assign(**columns)
+        markets = self._pref_markets(df['preferred_markets'].to_list(), df.index)
+        age = pd.Series(self._ages(df['birth_date']), index=df.index, name='age')
+        return pd.concat([encoded, markets, age], axis=1)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+    def save(self, path=ENCODER_BUNDLE_PATH):
+        with open(path, "wb") as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path=ENCODER_BUNDLE_PATH) -> "EncoderBundle":
+        with open(path, "rb") as f:
+            bundle = pickle.load(f)
+        if not isinstance(bundle, cls):
+            raise TypeError(f"{path} does not hold an EncoderBundle")
+        return bundle
+
+# USAGE: EncoderBundle().fit(data_to_df(train)).save(); EncoderBundle.load().transform(data_to_df(eval_clients))
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import hashlib
+import inspect
+import functools
+
+import pandas as pd
+
+from save_data import hash_file
+
+FEATURE_CACHE_DIR = "feature_cache"
+
+# Bump by hand to invalidate every cached frame (e.g. after upgrading a dependency)
+FEATURE_VERSION = "1"
+
+# Modules that define the features: editing one of them invalidates the cache
+FEATURE_MODULES = ("numeric_features.py", "encoder_bundle.py", "encode_data.py")
+
+
+def feature_code_version(extra_files=()):
+    """
+    Hash of FEATURE_VERSION and of the source of the feature modules (and extra_files).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256(FEATURE_VERSION.encode("utf-8"))
+    for path in [os.path.join(here, name) for name in FEATURE_MODULES] + sorted(set(extra_files)):
+        if os.path.exists(path):
+            digest.update(os.path.basename(path).encode("utf-8"))
+            digest.update(hash_file(path).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _code_digest(code, digest):
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            _code_digest(const, digest)
+        else:
+            digest.update(repr(const).encode("utf-8"))
+    digest.update(repr(code.co_names).encode("utf-8"))
+
+
+def builder_version(build):
+    """
+    Hash of what defines a frame builder: the file of the module it lives in, else its
+    source (e.g. a notebook cell), else its bytecode. A functools.partial also hashes
+    its bound arguments.
+    """
+    digest = hashlib.sha256()
+    if isinstance(build, functools.partial):
+        digest.update(builder_version(build.func).encode("utf-8"))
+        digest.update(repr((build.args, sorted(build.keywords.items()))).encode("utf-8"))
+        return digest.hexdigest()
+    try:
+        path = inspect.getsourcefile(build)
+    except TypeError:
+        path = None
+    if path is not None and os.path.exists(path):
+        return hash_file(path)
+    try:
+        digest.update(inspect.getsource(build).encode("utf-8"))
+    except (OSError, TypeError):
+        code = getattr(build, "__code__", None)
+        if code is None:
+            raise ValueError(f"Cannot tell which code builds the frame with {build!r}; pass version=")
+        _code_digest(code, digest)
+    return digest.hexdigest()
+
+
+def _is_nested(values):
+    return any(isinstance(value, (list, dict)) for value in values)
+
+
+class FeatureCache:
+    """
+    Parquet copies of finished feature frames, keyed by what they were computed from:
+    the content of the input store, the feature code version, the code of the builder
+    and the encoder bundle. A change to any of them gives a new key, so stale frames are
+    not read; the least recently used frames beyond max_entries are deleted. A builder
+    defined outside a module (notebook cell) is keyed by its own source only, so pass
+    version= if it calls helpers that change.
+
+    Columns of lists/dicts (employment_history, ...) are stored as JSON text and decoded
+    on load, so a cached frame equals the one that was built.
+
+    Args:
+        cache_dir (str): Directory of the frames and of their index (index.json).
+        max_entries (int): Number of frames kept.
+    """
+
+    def __init__(self, cache_dir=FEATURE_CACHE_DIR, max_entries=4):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _read_index(self):
+        if not os.path.exists(self._index_path):
+            return {"entries": {}, "files": {}}
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_index(self, index):
+        tmp = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, self._index_path)
+
+    def _file_digest(self, path, index):
+        # Content hash of an input file, rehashed only when its size or mtime changed
+        stat = os.stat(path)
+        known = index["files"].get(os.path.abspath(path))
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"]
+        digest = hash_file(path)
+        index["files"][os.path.abspath(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                                 "sha256": digest}
+        return digest
+
+    def key(self, store_path, bundle_path=None, build=None, index=None, version=None):
+        """
+        Cache key of the features of store_path encoded with the bundle at bundle_path
+        (None: encoders fitted on the store itself) by build (see builder_version), or
+        by whatever version names when given.
+        """
+        index = index if index is not None else self._read_index()
+        if version is None and build is not None:
+            version = builder_version(build)
+        parts = [feature_code_version(), version, self._file_digest(store_path, index),
+                 self._file_digest(bundle_path, index) if bundle_path is not None else "fit-on-store"]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def get(self, key, index=None):
+        """
+        Returns the cached frame of key, or None.
+        """
+        index = index if index is not None else self._read_index()
+        entry = index["entries"].get(key)
+        if entry is None or not os.path.exists(self._path(key)):
+            self.misses += 1
+            return None
+        self.hits += 1
+        frame = pd.read_parquet(self._path(key))
+        for column in entry["json_columns"]:
+            frame[column] = pd.Series([json.loads(value) for value in frame[column]], index=frame.index,
+                                      dtype=object)
+        entry["last_used"] = time.time()
+        self._write_index(index)
+        return frame
+
+    def put(self, key, frame, source=None, index=None):
+        index = index if index is not None else self._read_index()
+        json_columns = [column for column in frame.columns
+                        if frame[column].dtype == object and _is_nested(frame[column])]
+        stored = frame.assign(**{column: [json.dumps(value) for value in frame[column]] for column in json_columns})
+        tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+        stored.to_parquet(tmp)
+        os.replace(tmp, self._path(key))
+        index["entries"][key] = {"source": source, "rows": len(frame), "json_columns": json_columns,
+                                 "created": time.time(), "last_used": time.time()}
+        self._evict(index)
+        self._write_index(index)
+
+    def _evict(self, index):
+        entries = index["entries"]
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"])[:max(0, len(entries) - self.max_entries)]:
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+            del entries[key]
+
+    def load(self, store_path, build, bundle_path=None, version=None):
+        """
+        Returns the feature frame of the clients in store_path, computing and caching it
+        only when no frame with the same key is cached.
+
+        Args:
+            store_path (str): Client pickle or JSON Lines store (load_clients).
+            build (callable): clients -> frame (e.g. data_for_ML), or (clients, bundle) ->
+                frame when bundle_path is given.
+            bundle_path (str): Saved EncoderBundle to encode with.
+            version (str): Version of build to key the frame with, instead of the hash
+                of its code (builder_version); bump it by hand when build depends on
+                code the hash does not cover.
+
+        Returns:
+            pd.DataFrame: The feature frame.
+        """
+        index = self._read_index()
+        key = self.key(store_path, bundle_path, build, index, version)
+        frame = self.get(key, index)
+        if frame is not None:
+            return frame
+
+        from load_updated_data import load_clients
+
+        clients = load_clients(store_path)
+        if bundle_path is not None:
+            from encoder_bundle import EncoderBundle
+            frame = build(clients, EncoderBundle.load(bundle_path))
+        else:
+            frame = build(clients)
+        self.put(key, frame, source=os.path.abspath(store_path), index=index)
+        return frame
+
+    def stats(self):
+        index = self._read_index()
+        return {"hits": self.hits, "misses": self.misses, "entries": len(index["entries"]),
+                "bytes": sum(os.path.getsize(self._path(k)) for k in index["entries"] if os.path.exists(self._path(k)))}
+
+# USAGE: FeatureCache().load("remaining_clients.pkl", data_for_ML, bundle_path="encoder_bundle.pkl")
@@ -1,8 +1,5 @@
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderUnavailable, GeocoderTimedOut
-
-import pgeocode
-import pycountry
+from countries import resolver
+from geodata import GEODATA_BUNDLE, open_postal_index, warm_up
 
 
 def domicile_validator(client):
@@ -17,8 +14,6 @@ def address_validator(client):
     """
     return client['account_form']['address'] == client['client_profile']['address']
 
-_nomi_cache = {}
-
 def get_country_code(country_name):
     """
     Convert a full country name (e.g., 'Spain') to ISO Alpha-2 code (e.g., 'ES').
@@ -26,18 +21,26 @@ def get_country_code(country_name):
     Returns:
         str or None: ISO Alpha-2 code or None if not found.
     """
-    try:
-        return pycountry.countries.lookup(country_name).alpha_2
-    except LookupError:
-        return None
+    return resolver.alpha_2(country_name)
+
+_postal_index = None
 
-def get_nomi_instance(country_code):
+def get_postal_index(bundle_path=GEODATA_BUNDLE):
     """
-    Return a cached pgeocode.Nominatim instance for the given country.
+    Return the shared, read-only postal-code index built from the offline geodata bundle
+    (geodata.py build). The index files are memory-mapped, so every process reuses them
+    and nothing is downloaded at runtime.
     """
-    if country_code not in _nomi_cache:
-        _nomi_cache[country_code] = pgeocode.Nominatim(country_code)
-    return _nomi_cache[country_code]
+    global _postal_index
+    if _postal_index is None:
+        _postal_index = open_postal_index(bundle_path)
+    return _postal_index
+
+def warm_up_postal_index(clients):
+    """
+    Preload the postal-code index of every country of domicile seen in the batch.
+    """
+    return warm_up(get_postal_index(), clients)
 
 def validate_postal_code_for_client(client, check_city=False):
     """
@@ -56,56 +59,22 @@ def validate_postal_code_for_client(client, check_city=False):
     city = address.get('city', '').lower()
     postal_code = address.get('postal code', '')
 
-    if check_city:
-        for country_name in country_names:
-            country_code = get_country_code(country_name)
-            if not country_code:
-                continue  # Skip invalid countries
-
-            nomi = get_nomi_instance(country_code)
-            df = nomi._data
-
-            if df is None or df.empty:
-                continue
-            
-            # Convert to NumPy array and use list comprehension (still fast)
-            col_values = df[['place_name', 'postal_code']].values
-            mask1 = [val_pair[0].lower() in city or city in val_pair[0].lower() in city for val_pair in col_values]
-            df = df[mask1]
-
-            if not df.empty:
-                return True
-            
-        return False
-
+    postal_index = get_postal_index()
     for country_name in country_names:
         country_code = get_country_code(country_name)
         if not country_code:
             continue  # Skip invalid countries
 
-        nomi = get_nomi_instance(country_code)
-        df = nomi._data
-
-        if df is None or df.empty:
+        index = postal_index.country(country_code)
+        if index is None:
             continue
-        
-        # Convert to NumPy array and use list comprehension (still fast)
-        col_values = df[['place_name', 'postal_code']].values
-        # mask1 = [val_pair[1] == postal_code and val_pair[0] in city for val_pair in col_values]
-        mask1 = [val_pair[1] == postal_code for val_pair in col_values]
-        df = df[mask1]
-
-        if not df.empty:
-            return True
-        
-        # postal_info = nomi.query_postal_code(postal_code)['postal_code']
-
-        # if postal_info is None:
-        #     continue
 
-        # # matched_cities = [c.strip().lower() for c in postal_info.place_name.split(',')]
-        # if postal_info == postal_code:
-        #     return True  # Valid match
+        if check_city:
+            # Some place name of the country appears in the city
+            if index.city_matches(city):
+                return True
+        elif isinstance(postal_code, str) and index.has_postal_code(postal_code):
+            return True
 
     return False  # No match found
 
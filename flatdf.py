@@ -1,6 +1,4 @@
 import pandas as pd
-#import encoding from pytorch
-from torch.utils.data import Dataset, DataLoader
 from sklearn.preprocessing import LabelEncoder
 
 country_code_encoder = LabelEncoder()
@@ -27,13 +25,15 @@ def data_to_df(full_data:list):
     return pd.DataFrame.from_records(dfs)
 
 
-X = data_to_df(full_data)
-
-
 def encode_country_code(df: pd.DataFrame) -> pd.DataFrame:
     country_code_encoder.fit(df['country_code'])
     df['country_code'] = country_code_encoder.transform(df['country_code'])
     return df
 
-X = encode_country_code(X)
-print(X["country_code"])
\ No newline at end of file
+
+if __name__ == "__main__":
+    from load_updated_data import load_clients
+
+    X = data_to_df(load_clients("clients.pkl"))
+    X = encode_country_code(X)
+    print(X["country_code"])
@@ -0,0 +1,158 @@
+import os
+import argparse
+
+import numpy as np
+
+from countries import resolver
+from postal_index import PostalIndex, POSTAL_INDEX_DIR
+
+GEODATA_BUNDLE = "geodata_bundle.npz"
+
+
+def country_codes_for_clients(clients):
+    """
+    Returns the sorted alpha-2 codes of every country of domicile in a batch of clients
+    (multi-country fields such as 'Spain, France' contribute each country).
+    """
+    codes = set()
+    for client in clients:
+        if not client or not client.get('client_profile'):
+            continue
+        codes.update(resolver.alpha_2_all(client['client_profile'].get('country_of_domicile')))
+    return sorted(codes)
+
+
+def build_bundle(country_codes, out_path=GEODATA_BUNDLE):
+    """
+    Snapshots the pgeocode place/postal-code tables of the given countries into one
+    compressed file. This is the only step that needs pgeocode (and network access the
+    first time a country is fetched); everything else reads the bundle.
+
+    Args:
+        country_codes (list): ISO alpha-2 codes (e.g. ['DE', 'FR']).
+        out_path (str): Destination .npz bundle.
+
+    Returns:
+        dict: country code -> number of rows stored (0 if pgeocode has no data).
+    """
+    import pgeocode
+
+    countries, offsets, places, postal_codes = [], [0], [], []
+    rows = {}
+    for country_code in sorted(set(country_codes)):
+        try:
+            data = pgeocode.Nominatim(country_code)._data
+        except ValueError:
+            data = None  # country not supported by pgeocode
+        if data is None or data.empty:
+            rows[country_code] = 0
+            continue
+        data = data.dropna(subset=["postal_code"])
+        countries.append(country_code)
+        places.extend("" if not isinstance(p, str) else p for p in data["place_name"])
+        postal_codes.extend(data["postal_code"].astype(str))
+        offsets.append(len(postal_codes))
+        rows[country_code] = len(data)
+
+    tmp_path = out_path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        countries=np.array(countries, dtype=str),
+        offsets=np.array(offsets, dtype=np.int64),
+        place_name=np.array(places, dtype=str),
+        postal_code=np.array(postal_codes, dtype=str),
+    )
+    os.replace(tmp_path, out_path)
+    print(f"Bundled {sum(rows.values())} rows for {len(countries)}/{len(rows)} countries -> {out_path}")
+    return rows
+
+
+class GeodataBundle:
+    """
+    Read-only view of a bundle written by build_bundle. Nothing is ever downloaded: a
+    country missing from the bundle simply has no data.
+    """
+
+    def __init__(self, bundle_path=GEODATA_BUNDLE):
+        if not os.path.exists(bundle_path):
+            raise FileNotFoundError(f"No geodata bundle at {bundle_path}; "
+                                    f"build it with: python geodata.py build --clients <clients file>")
+        self.bundle_path = bundle_path
+        with np.load(bundle_path) as bundle:
+            self._arrays = {name: bundle[name] for name in bundle.files}
+        self._positions = {str(c): i for i, c in enumerate(self._arrays["countries"])}
+
+    @property
+    def countries(self):
+        return list(self._positions)
+
+    def country_data(self, country_code):
+        """
+        Returns the country's table as a DataFrame with 'place_name' and 'postal_code'
+        (None if the country is not in the bundle), as PostalIndex expects it.
+        """
+        import pandas as pd
+
+        i = self._positions.get(country_code)
+        if i is None:
+            return None
+        start, stop = self._arrays["offsets"][i], self._arrays["offsets"][i + 1]
+        return pd.DataFrame({
+            "place_name": self._arrays["place_name"][start:stop],
+            "postal_code": self._arrays["postal_code"][start:stop],
+        })
+
+
+def open_postal_index(bundle_path=GEODATA_BUNDLE, index_dir=POSTAL_INDEX_DIR):
+    """
+    Returns a PostalIndex fed only from the bundle. Country indexes older than the bundle
+    are rebuilt, and the bundle itself is only opened if some country needs building.
+    """
+    bundle = {}
+
+    def load_data(country_code):
+        if "bundle" not in bundle:
+            bundle["bundle"] = GeodataBundle(bundle_path)
+        return bundle["bundle"].country_data(country_code)
+
+    source_mtime = os.path.getmtime(bundle_path) if os.path.exists(bundle_path) else None
+    return PostalIndex(index_dir, load_data=load_data, source_mtime=source_mtime)
+
+
+def warm_up(postal_index, clients):
+    """
+    Builds (if needed) and maps the index of every country of domicile in the batch, so
+    workers forked afterwards share the mapped pages and no lookup has to build anything.
+
+    Returns:
+        list: The country codes that have data.
+    """
+    return [code for code in country_codes_for_clients(clients) if postal_index.country(code) is not None]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline geodata bundle used by the postal-code checks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="snapshot pgeocode data into a bundle")
+    build.add_argument("--countries", default=None, help="comma-separated alpha-2 codes (e.g. DE,FR,CH)")
+    build.add_argument("--clients", default=None,
+                       help="clients file (.pkl, .jsonl, .parquet) whose countries of domicile to bundle")
+    build.add_argument("--out", default=GEODATA_BUNDLE, help=f"bundle path (default: {GEODATA_BUNDLE})")
+    build.add_argument("--index-dir", default=POSTAL_INDEX_DIR, help="also prebuild the postal index here")
+    args = parser.parse_args(argv)
+
+    codes = set()
+    if args.countries:
+        codes.update(c.strip().upper() for c in args.countries.split(",") if c.strip())
+    if args.clients:
+        from load_data import load_clients
+        codes.update(country_codes_for_clients(load_clients(args.clients)))
+    if not codes:
+        parser.error("give --countries and/or --clients")
+    build_bundle(codes, args.out)
+    postal_index = open_postal_index(args.out, args.index_dir)
+    postal_index.build(sorted(codes))
+
+
+if __name__ == "__main__":
+    main()
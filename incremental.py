@@ -0,0 +1,108 @@
+import os
+import json
+
+import pandas as pd
+
+from numeric_features import extract_numeric_features
+from reason_codes import read_errors, write_errors
+
+
+def read_store_rows(store_path, indices):
+    """
+    Decodes only the given client indices of a JSON Lines store (save_data.py).
+
+    Returns:
+        dict: client index -> client dict (None for missing clients).
+    """
+    wanted = set(indices)
+    rows = {}
+    with open(store_path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if i in wanted:
+                rows[i] = json.loads(line)
+    return rows
+
+
+def _read_solution(solution_path):
+    labels = {}
+    if os.path.exists(solution_path):
+        with open(solution_path, "r", encoding="utf-8") as f:
+            for line in f:
+                name, label = line.rstrip("\n").split(";")
+                labels[int(name[len("client_"):])] = label
+    return labels
+
+
+def _fill_property_to_cash(features):
+    # extract_numeric_features replaces a zero denominator by the batch maximum, so the fill
+    # has to be redone over the whole matrix once rows have been replaced
+    zero = (features["aum"] - features["property_value"]) == 0
+    if zero.any():
+        features.loc[zero, "property_to_cash_ratio"] = (
+            features.loc[~zero, "property_to_cash_ratio"].max() if (~zero).any() else -float("inf"))
+    return features
+
+
+def update_outputs(manifest, flag_fn, solution_path="solution.csv", errors_path="client_errors.jsonl",
+                   features_path=None):
+    """
+    Re-flags the clients an incremental ingestion reported as changed and patches the
+    downstream outputs in place; rows of unchanged clients are kept as they are.
+
+    Args:
+        manifest (dict or str): Manifest returned/written by save_data.ingest_clients.
+        flag_fn (callable): client -> (flag, error_messages), e.g. check_all_flags.
+        solution_path (str): 'client_{i};Accept|Reject' csv to update.
+        errors_path (str): Per-client errors to update, in a format of
+            reason_codes.write_errors (a .parquet file of reason masks loses the order
+            and repeats of the messages).
+        features_path (str): Optional Parquet file of extract_numeric_features rows,
+            indexed by client index, to update.
+
+    Returns:
+        list: The client indices that were re-flagged.
+    """
+    if isinstance(manifest, str):
+        with open(manifest, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    num_clients = manifest["num_clients"]
+    changed = [i for i in manifest["changed"] if i < num_clients]
+    clients = read_store_rows(manifest["store"], changed)
+
+    labels = _read_solution(solution_path)
+    client_errors = []
+    if os.path.exists(errors_path):
+        client_errors = read_errors(errors_path)
+    client_errors = (client_errors + [[] for _ in range(num_clients)])[:num_clients]
+
+    for i in changed:
+        flag, error_messages = flag_fn(clients[i])
+        labels[i] = "Accept" if flag else "Reject"
+        client_errors[i] = error_messages
+
+    missing_labels = [i for i in range(num_clients) if i not in labels]
+    if missing_labels:
+        raise ValueError(f"{len(missing_labels)} clients have no label yet (e.g. client_{missing_labels[0]}); "
+                         "run a full ingestion first")
+    with open(solution_path, "w", encoding="utf-8") as f:
+        for i in range(num_clients):
+            f.write(f"client_{i};{labels[i]}\n")
+    write_errors(client_errors, errors_path)
+
+    if features_path is not None:
+        present = [i for i in changed if clients[i] is not None]
+        features = None
+        if present:
+            features = extract_numeric_features([clients[i] for i in present])
+            features.index = present
+        if os.path.exists(features_path):
+            old_rows = pd.read_parquet(features_path)
+            old_rows = old_rows[~old_rows.index.isin(changed) & (old_rows.index < num_clients)]
+            features = old_rows if features is None else pd.concat([old_rows, features])
+        if features is not None:
+            _fill_property_to_cash(features.sort_index()).to_parquet(features_path)
+
+    print(f"Re-flagged {len(changed)}/{num_clients} clients")
+    return changed
+
+# USAGE: update_outputs(ingest_clients("data/eval", "clients_eval.jsonl", incremental=True), check_all_flags)
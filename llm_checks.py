@@ -0,0 +1,592 @@
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+
+LLM_CACHE_PATH = "llm_cache.sqlite"
+
+
+#### PROMPTS (as in llama_pipeline.ipynb)
+
+
+def convert_to_natural_text(work_experience):
+    # Loop through each work experience entry
+    natural_text = []
+    for entry in work_experience:
+        start_year = entry['start_year']
+        end_year = entry['end_year']
+        company = entry['company']
+        position = entry['position']
+
+        # Check if end_year is None or a valid year
+        if end_year is None:
+            text = f"from {start_year}, the individual currently working as an {position} at {company}"
+        else:
+            end_year_text = f"until {end_year}"
+            text = f"from {start_year}, the individual worked as an {position} at {company} {end_year_text}"
+        natural_text.append(text)
+
+    return natural_text
+
+
+def generate_wealth_summary_text(client_profile):
+    # Currency symbol or code
+    currency = client_profile['client_profile']['currency']
+    aum = client_profile['client_profile']['aum']
+    savings = aum['savings']
+    inheritance_value = aum['inheritance']
+    inheritance = client_profile['client_profile']['inheritance_details']
+
+    inheritance_text = (
+        f"The client inherited {inheritance_value} {currency} in {inheritance.get('inheritance year')} "
+        f"from their {inheritance.get('relationship')}, who was a {inheritance.get('profession')}."
+        if inheritance else "No inheritance details provided."
+    )
+
+    real_estate_list = client_profile['client_profile']["real_estate_details"]
+    if real_estate_list:
+        real_estate_texts = [
+            f"a {prop['property type']} in {prop['property location']} valued at {prop['property value']} {currency}"
+            for prop in real_estate_list
+        ]
+        real_estate_text = "The client owns " + ", and ".join(real_estate_texts) + "."
+    else:
+        real_estate_text = "No real estate owned."
+    savings_text = f"The client has savings of {savings} {currency} while working."
+
+    return f"{savings_text} {real_estate_text} {inheritance_text}"
+
+
+def family_background_fields(client):
+    return {"marital_status": client["client_profile"]["marital_status"],
+            "family_background": client["client_description"]["Family Background"]}
+
+
+def education_background_fields(client):
+    list_of_education = []
+    if client["client_profile"]['secondary_school']['name']:
+        list_of_education.append(client["client_profile"]['secondary_school']['name'])
+    for higher in client["client_profile"]['higher_education']:
+        list_of_education.append(higher['university'])
+    return {"schools": ', '.join(list_of_education),
+            "education_background": client["client_description"]["Education Background"]}
+
+
+def work_background_fields(client):
+    return {"employment": ' and '.join(convert_to_natural_text(client["client_profile"]["employment_history"])),
+            "occupation_history": client["client_description"]["Occupation History"]}
+
+
+def wealth_background_fields(client):
+    return {"wealth_history": generate_wealth_summary_text(client),
+            "wealth_summary": client["client_description"].get("Wealth Summary", "")}
+
+
+def client_summary_fields(client):
+    return {"client_summary": client['client_description']['Client Summary']}
+
+
+def estimate_tokens(text):
+    # About four characters per token for the models we use; only used for budgeting
+    return (len(text) + 3) // 4
+
+
+class LLMCheck:
+    """
+    One yes/no consistency question asked to the model for every client.
+
+    The user message is rendered from a str.format template and the fields extracted
+    from the client; the system prompt is the same for every client, so the server can
+    reuse its processed prefix from one request to the next.
+
+    Args:
+        name (str): Check name (e.g. 'family_background').
+        system (str): System prompt.
+        template (str): User message template, e.g. 'Client Summary: {client_summary}'.
+        fields (callable): client -> dict of template fields.
+        failure_message (str): Error appended to client_errors when the answer is False.
+        max_output_tokens (int): Tokens the model may generate per answer (num_predict).
+        max_input_tokens (int): Budget for the user message; longer messages are cut
+            (None: no limit).
+    """
+
+    def __init__(self, name, system, template, fields, failure_message, max_output_tokens=5,
+                 max_input_tokens=None):
+        self.name = name
+        self.system = system
+        self.template = template
+        self.fields = fields
+        self.failure_message = failure_message
+        self.max_output_tokens = max_output_tokens
+        self.max_input_tokens = max_input_tokens
+
+    @property
+    def options(self):
+        return {"num_predict": self.max_output_tokens, "temperature": 0.0}
+
+    def render(self, client):
+        text = self.template.format(**{k: str(v) for k, v in self.fields(client).items()})
+        if self.max_input_tokens is not None and estimate_tokens(text) > self.max_input_tokens:
+            text = text[:4 * self.max_input_tokens]
+        return text
+
+    def messages(self, client):
+        return [{"role": "system", "content": self.system},
+                {"role": "user", "content": self.render(client)}]
+
+    def packed_messages(self, clients):
+        """
+        One request for several clients: the system prompt is sent once and the model
+        answers one numbered line per client.
+        """
+        system = (self.system + " You will receive several numbered inputs. Reply with one line per input, "
+                  "formatted as '<number>: True' or '<number>: False'.")
+        user = "\n".join(f"{k}. {self.render(client)}" for k, client in enumerate(clients, start=1))
+        return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+    def packed_options(self, count):
+        return {"num_predict": (self.max_output_tokens + 3) * count, "temperature": 0.0}
+
+
+# name -> LLMCheck, in the order check_all_backgrounds asks them
+CHECKS = {}
+
+
+def register_check(name, system, template, fields, failure_message, **budget):
+    CHECKS[name] = LLMCheck(name, system, template, fields, failure_message, **budget)
+    return CHECKS[name]
+
+
+register_check(
+    'family_background',
+    "You are a logical AI assistant. Based on the user's input, check if the marital status "
+    "is coherent with the family background. Only reply with 'True' if they are coherent, otherwise reply with 'False'.",
+    "marital status:{marital_status}. Family Background:{family_background}",
+    family_background_fields, "Family Background Check Failed")
+register_check(
+    'education_background',
+    "You are a logical AI assistant. Based on the user's input, check if the education background matches "
+    "the listed schools. Only reply with 'True' if they match, otherwise reply with 'False'.",
+    "Graduated from {schools}. Education Background: {education_background}",
+    education_background_fields, "Education Background Check Failed")
+register_check(
+    'work_background',
+    "You are a logical AI assistant. Based on the user's input, check if the structured employment history "
+    "is coherent with the work background description. Only reply with 'True' if they are consistent, otherwise reply with 'False'.",
+    "Employment history: {employment}. Work History Description: {occupation_history}",
+    work_background_fields, "Work Background Check Failed")
+register_check(
+    'wealth_background',
+    "You are a logical AI assistant. Based on the user's input, check if the structured wealth History "
+    "is coherent with the client's wealth history description. Only reply with 'True' if they are consistent, otherwise reply with 'False'.",
+    "Wealth History: {wealth_history} Wealth Description: {wealth_summary}",
+    wealth_background_fields, "Wealth Background Check Failed")
+register_check(
+    'client_summary',
+    "You are a logical AI assistant. Based on the user's input, determine whether the client summary contains "
+    "a positive recommendation. Only reply with 'True' if it clearly recommends favors the client, otherwise reply with 'False'.",
+    "Client Summary: {client_summary}",
+    client_summary_fields, "Client Summary Check Failed")
+
+# check_all_backgrounds in final_pipeline.ipynb only runs this one
+DEFAULT_CHECKS = ['family_background']
+
+# Asked again, once, when a reply cannot be parsed
+STRICT_FOLLOW_UP = "Answer with exactly one word: True or False."
+
+_THINK = re.compile(r"<think>.*?(</think>|$)", re.DOTALL)
+_ANSWER = re.compile(r"\b(true|false)\b")
+_YES_NO = re.compile(r"\b(yes|no)\b")
+_NUMBERED_ANSWER = re.compile(r"(\d+)\s*[:.)\-]\s*\**\s*(true|false|yes|no)\b")
+
+
+def parse_answer(answer):
+    """
+    Reads a True/False reply: reasoning inside <think> tags is ignored and the first
+    true/false word decides (yes/no when there is none). Returns None when there is none.
+    """
+    text = _THINK.sub("", str(answer)).lower()
+    match = _ANSWER.search(text) or _YES_NO.search(text)
+    if match is None:
+        return None
+    return match.group(1) in ("true", "yes")
+
+
+def parse_numbered_answers(answer, count):
+    """
+    Reads the reply to a packed request; returns a list of count answers (None for the
+    inputs the reply does not cover).
+    """
+    found = [None] * count
+    for number, word in _NUMBERED_ANSWER.findall(_THINK.sub("", str(answer)).lower()):
+        k = int(number) - 1
+        if 0 <= k < count and found[k] is None:
+            found[k] = word in ("true", "yes")
+    return found
+
+
+def parse_boolean_answer(answer):
+    # Lenient form: anything unreadable counts as False (llama_pipeline.ipynb raised a
+    # ValueError on an unreadable answer instead)
+    verdict = parse_answer(answer)
+    return False if verdict is None else verdict
+
+
+#### CACHE
+
+
+def request_key(model, messages, options):
+    """
+    Cache key of a chat request: sha256 of its model, messages and options.
+    """
+    payload = json.dumps({"model": model, "messages": messages, "options": options or {}},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Disk cache of model replies keyed by request_key, in a SQLite file so several
+    processes can share it.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH):
+        self.path = path
+        # Used from the runner's loop thread, not the thread that opened it
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses "
+                         "(key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL)")
+        self._db.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT key, response FROM responses WHERE key IN ({','.join('?' * len(part))})", part)
+            found.update(rows.fetchall())
+        return found
+
+    def put_many(self, items, model):
+        now = time.time()
+        self._db.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                             [(key, model, response, now) for key, response in items])
+        self._db.commit()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+#### RUNNER
+
+
+class LLMRunner:
+    """
+    Sends chat requests to an ollama server concurrently.
+
+    The runner owns one event loop, on a background thread started by the first run(),
+    and one ollama client on it: every run() reuses them (and their open connections)
+    until close(). Identical requests in a batch are sent once, replies already in the cache are not
+    sent at all, and at most `concurrency` requests are in flight. Each request is
+    retried on errors and timeouts with exponential backoff. Replies are written to the
+    cache after every batch, so an interrupted run resumes where it stopped.
+
+    Args:
+        model (str): ollama model name (e.g. 'phi:latest', 'gemma3').
+        host (str): ollama server URL (default: the ollama client's default).
+        concurrency (int): Maximum requests in flight.
+        timeout (float): Seconds allowed per attempt.
+        retries (int): Attempts after the first one.
+        backoff (float): Seconds before the first retry, doubled at every retry.
+        batch_size (int): Requests sent (and cached) per batch.
+        cache_path (str): SQLite response cache (None disables it).
+        keep_alive (str): How long the server keeps the model (and the processed system
+            prompt) loaded between requests.
+    """
+
+    def __init__(self, model, host=None, concurrency=4, timeout=60.0, retries=3, backoff=1.0,
+                 batch_size=64, cache_path=LLM_CACHE_PATH, keep_alive="30m"):
+        self.model = model
+        self.host = host
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self.keep_alive = keep_alive
+        self.stats = {"requests": 0, "unique": 0, "cached": 0, "sent": 0, "retries": 0}
+        self.latencies = {}
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="llm-runner", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def _session(self):
+        # Client and semaphore of the calling loop: the runner's own ones on its loop,
+        # fresh ones when run_async is awaited from another loop (e.g. a notebook's)
+        import ollama
+
+        if asyncio.get_running_loop() is not self._loop:
+            return ollama.AsyncClient(host=self.host), asyncio.Semaphore(self.concurrency)
+        if self._client is None:
+            self._client = ollama.AsyncClient(host=self.host)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client, self._semaphore
+
+    def close(self):
+        """
+        Closes the client and stops the event loop; a later run() starts new ones.
+        """
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = self._semaphore = None
+        if loop is None:
+            return
+        if client is not None and hasattr(client, "close"):
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def _send(self, client, semaphore, messages, options, tag):
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await asyncio.wait_for(
+                        client.chat(model=self.model, messages=messages, options=options,
+                                    keep_alive=self.keep_alive), self.timeout)
+                    self.latencies.setdefault(tag, []).append(time.perf_counter() - start)
+                return response['message']['content']
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def run_async(self, requests, tags=None):
+        """
+        Args:
+            requests (list): (messages, options) pairs.
+            tags (list): Optional label per request (e.g. the check name) under which
+                its latency is recorded.
+
+        Returns:
+            list: The reply text of every request, in order.
+        """
+        tags = tags if tags is not None else [None] * len(requests)
+        keys = [request_key(self.model, messages, options) for messages, options in requests]
+        unique = {}
+        for key, request, tag in zip(keys, requests, tags):
+            unique.setdefault(key, request + (tag,))
+        replies = self.cache.get_many(unique) if self.cache is not None else {}
+        self.stats["requests"] += len(requests)
+        self.stats["unique"] += len(unique)
+        self.stats["cached"] += len(replies)
+
+        todo = [key for key in unique if key not in replies]
+        client, semaphore = self._session()
+        for i in range(0, len(todo), self.batch_size):
+            batch = todo[i:i + self.batch_size]
+            answers = await asyncio.gather(*(self._send(client, semaphore, *unique[key]) for key in batch))
+            self.stats["sent"] += len(batch)
+            replies.update(zip(batch, answers))
+            if self.cache is not None:
+                self.cache.put_many(zip(batch, answers), self.model)
+        return [replies[key] for key in keys]
+
+    def run(self, requests, tags=None):
+        return asyncio.run_coroutine_threadsafe(self.run_async(requests, tags), self._start()).result()
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """
+        Returns, per tag, the number of requests sent and their latency percentiles in
+        seconds (cached replies are not counted).
+        """
+        import numpy as np
+
+        out = {}
+        for tag, values in self.latencies.items():
+            row = {"model": self.model, "n": len(values)}
+            row.update({f"p{p}": round(float(np.percentile(values, p)), 4) for p in percentiles})
+            out[tag] = row
+        return out
+
+
+def ask_checks(items, runner, clients_per_request=1):
+    """
+    Gets a True/False answer for every (check name, client) item.
+
+    Round 1 sends every item, clients_per_request clients per request (one system prompt
+    for all of them). Clients a packed reply does not cover are sent again on their own,
+    and replies that still cannot be parsed get one follow-up asking for a one-word
+    answer; what remains unreadable counts as False.
+
+    Returns:
+        tuple: (answers, counts) where answers is one bool per item and counts tells how
+            many were parsed directly, re-sent alone, re-asked, and defaulted to False.
+    """
+    answers = [None] * len(items)
+    counts = {"parsed": 0, "resent": 0, "reasked": 0, "defaulted": 0}
+
+    def single_round(positions, follow_up=None):
+        requests, tags, replies_for = [], [], []
+        for pos in positions:
+            name, client = items[pos]
+            check = CHECKS[name]
+            messages = check.messages(client)
+            if follow_up is not None:
+                messages = messages + [{"role": "assistant", "content": follow_up[pos]},
+                                       {"role": "user", "content": STRICT_FOLLOW_UP}]
+            requests.append((messages, check.options))
+            tags.append(name)
+            replies_for.append(pos)
+        replies = runner.run(requests, tags) if requests else []
+        return dict(zip(replies_for, replies))
+
+    if clients_per_request > 1:
+        by_check = {}
+        for pos, (name, _) in enumerate(items):
+            by_check.setdefault(name, []).append(pos)
+        requests, tags, groups = [], [], []
+        for name, positions in by_check.items():
+            check = CHECKS[name]
+            for i in range(0, len(positions), clients_per_request):
+                group = positions[i:i + clients_per_request]
+                requests.append((check.packed_messages([items[p][1] for p in group]), check.packed_options(len(group))))
+                tags.append(name + " (packed)")
+                groups.append(group)
+        for group, reply in zip(groups, runner.run(requests, tags) if requests else []):
+            for pos, verdict in zip(group, parse_numbered_answers(reply, len(group))):
+                answers[pos] = verdict
+        pending = [pos for pos, a in enumerate(answers) if a is None]
+        counts["resent"] = len(pending)
+    else:
+        pending = list(range(len(items)))
+
+    replies = single_round(pending)
+    for pos, reply in replies.items():
+        answers[pos] = parse_answer(reply)
+    counts["parsed"] = sum(a is not None for a in answers)
+
+    unreadable = [pos for pos in pending if answers[pos] is None]
+    counts["reasked"] = len(unreadable)
+    for pos, reply in single_round(unreadable, follow_up=replies).items():
+        answers[pos] = parse_answer(reply)
+    counts["defaulted"] = sum(a is None for a in answers)
+    return [bool(a) for a in answers], counts
+
+
+def run_llm_checks(clients, runner, checks=DEFAULT_CHECKS, clients_per_request=1):
+    """
+    Asks every check for every client in one concurrent run.
+
+    Returns:
+        dict: check name -> list of bools (one per client).
+    """
+    items = [(name, client) for name in checks for client in clients]
+    answers, _ = ask_checks(items, runner, clients_per_request)
+    return {name: answers[k * len(clients):(k + 1) * len(clients)] for k, name in enumerate(checks)}
+
+
+def run_tiered_checks(clients, runner, checks=DEFAULT_CHECKS, clients_per_request=1):
+    """
+    Answers every check with the cheap text matchers of prefilter.py first and asks the
+    model about every client they could not accept (they never reject on their own).
+
+    Returns:
+        tuple: (verdicts, report) where verdicts maps check name -> list of bools (one per
+            client) and report maps check name -> clients resolved by each tier plus the
+            estimated wall-clock time the cheap tier saved.
+    """
+    from prefilter import cheap_verdict
+
+    verdicts, report = {}, {}
+    unsure = {}
+    start = time.perf_counter()
+    for name in checks:
+        verdicts[name] = [cheap_verdict(name, client) for client in clients]
+        unsure[name] = [i for i, verdict in enumerate(verdicts[name]) if verdict is None]
+    cheap_seconds = time.perf_counter() - start
+
+    owners = [(name, i) for name in checks for i in unsure[name]]
+    sent_before = runner.stats["sent"]
+    start = time.perf_counter()
+    answers, _ = ask_checks([(name, clients[i]) for name, i in owners], runner, clients_per_request)
+    llm_seconds = time.perf_counter() - start
+    sent = runner.stats["sent"] - sent_before
+    for (name, i), answer in zip(owners, answers):
+        verdicts[name][i] = answer
+
+    # Time per request actually sent to the model in this run (replies from the cache are free)
+    seconds_per_request = llm_seconds / sent if sent else None
+    for name in checks:
+        asked = set(unsure[name])
+        cheap = len(clients) - len(asked)
+        report[name] = {
+            "cheap": cheap,
+            "llm": len(asked),
+            "saved_s": round(cheap * seconds_per_request, 3) if seconds_per_request else None,
+        }
+    report["_total"] = {"cheap_s": round(cheap_seconds, 3), "llm_s": round(llm_seconds, 3), "llm_sent": sent}
+    return verdicts, report
+
+
+def infer_llm(clients, flags_preds, client_errors, runner, checks=DEFAULT_CHECKS, prefilter=False,
+              clients_per_request=1):
+    """
+    Batched infer_llama: runs the checks on the clients the rules accepted and, like
+    check_all_backgrounds, records the first failing check of each client.
+
+    Args:
+        prefilter (bool): Let the cheap text matchers answer first (run_tiered_checks)
+            and print how many clients each tier resolved.
+        clients_per_request (int): Clients packed into one request (see ask_checks).
+
+    Returns:
+        tuple: The updated (flags_preds, client_errors).
+    """
+    accepted = [i for i, flag in enumerate(flags_preds) if flag]
+    batch = [clients[i] for i in accepted]
+    if prefilter:
+        verdicts, report = run_tiered_checks(batch, runner, checks, clients_per_request)
+        for name in checks:
+            r = report[name]
+            print(f"{name}: {r['cheap']} accepted by text matching, {r['llm']} sent to the model, "
+                  f"saved ~{r['saved_s']}s")
+    else:
+        verdicts = run_llm_checks(batch, runner, checks, clients_per_request)
+    for j, i in enumerate(accepted):
+        for name in checks:
+            if not verdicts[name][j]:
+                flags_preds[i] = False
+                client_errors[i].append(CHECKS[name].failure_message)
+                break
+    return flags_preds, client_errors
+
+# USAGE: runner = LLMRunner("phi:latest", concurrency=8); infer_llm(clients, *flag_clients(clients), runner, prefilter=True, clients_per_request=8); runner.latency_percentiles()
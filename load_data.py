@@ -1,16 +1,25 @@
 import pickle
+import json
 
 def load_clients(pickle_path):
     """
     Loads the clients matrix from a pickle file.
     
     Args:
-        pickle_path (str): Path to the pickle file (e.g., 'clients_matrix.pkl')
+        pickle_path (str): Path to the pickle file (e.g., 'clients_matrix.pkl'), or a
+            JSON Lines store written by save_data.py (e.g., 'clients_eval.jsonl') or a
+            Parquet store written by client_store.py (e.g., 'clients_eval.parquet')
         
     Returns:
         list: A list of 10,000 dictionaries (one per client), or None if error.
     """
     try:
+        if pickle_path.endswith(".jsonl"):
+            with open(pickle_path, "r", encoding="utf-8") as f:
+                return [json.loads(line) for line in f]
+        if pickle_path.endswith(".parquet"):
+            from client_store import iter_clients
+            return list(iter_clients(pickle_path))
         with open(pickle_path, "rb") as f:
             clients = pickle.load(f)
         return clients
@@ -1,27 +1,30 @@
 import pickle
 
+from client_view import LazyClients, normalize_client
+
 
 def load_clients(pickle_path):
     """
     Loads the clients matrix from a pickle file.
 
     Args:
-        pickle_path (str): Path to the pickle file (e.g., 'clients_matrix.pkl')
+        pickle_path (str): Path to the pickle file (e.g., 'clients_matrix.pkl'), or a
+            JSON Lines store written by save_data.py (e.g., 'clients.jsonl'), which is
+            opened lazily: clients are decoded and normalised only when accessed.
 
     Returns:
         list: A list of 10,000 dictionaries (one per client), or None if error.
     """
     try:
+        if pickle_path.endswith(".jsonl"):
+            return LazyClients(pickle_path)
         with open(pickle_path, "rb") as f:
             clients = pickle.load(f)
         for i in range(len(clients)):
-            if type(clients[i]['account_form']['passport_number']) != str:
-                clients[i]['account_form']['passport_number'] = clients[i]['account_form']['passport_number'][0]
-            if type(clients[i]['client_profile']['passport_number']) != str:
-                clients[i]['client_profile']['passport_number'] = clients[i]['client_profile']['passport_number'][0]
+            clients[i] = normalize_client(clients[i])
         return clients
     except Exception as e:
         print(f"Failed to load pickle file: {e}")
         return None
 
-# USAGE: load_clients("clients.pkl")
\ No newline at end of file
+# USAGE: load_clients("clients.pkl")
@@ -2,122 +2,246 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Tuple
 
+# Default reference date: the end year of the jobs that are still held
+CURRENT_YEAR = 2025
 
-def calculate_effective_experience(jobs: List[Tuple[int, int]]) -> int:
+
+def reference_year(reference_date=CURRENT_YEAR) -> int:
+    """
+    Year of a reference date given as a year (2025), a date string ('2021-04-10') or a
+    date/timestamp.
+    """
+    if isinstance(reference_date, (int, np.integer)):
+        return int(reference_date)
+    return pd.Timestamp(reference_date).year
+
+
+def calculate_effective_experience(jobs: List[Tuple[int, int]], reference_date=CURRENT_YEAR) -> int:
     """
     Calculates effective work experience in years, avoiding double-counting overlapping years.
 
     Args:
         jobs: List of (start_year, end_year) tuples. None as end_year means the job is current.
+        reference_date: Date the current jobs run until (see reference_year).
 
     Returns:
         Total number of unique working years across all jobs.
     """
-    worked_years = set()
-    for start, end in jobs:
-        if start is None:
-            continue
-        end = end if end is not None else 2025
-        worked_years.update(range(start, end))
-    return len(worked_years)
+    now = reference_year(reference_date)
+    intervals = sorted((start, now if end is None else end) for start, end in jobs if start is not None)
+    worked = 0
+    covered_until = None
+    for start, end in intervals:
+        if covered_until is not None:
+            start = max(start, covered_until)
+        if end > start:
+            worked += end - start
+            covered_until = end
+    return worked
+
 
+def _amounts(values) -> np.ndarray:
+    # Money values: int64 when every one of them is a whole number, float64 otherwise
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub':
+        return values.astype(np.int64)
+    values = values.astype(np.float64)
+    if np.isfinite(values).all() and (values == np.round(values)).all():
+        return values.astype(np.int64)
+    return values
 
-def extract_numeric_features(full_data: List[Dict[str, Any]]) -> pd.DataFrame:
+
+def job_table(employment_histories, reference_date=CURRENT_YEAR) -> Dict[str, np.ndarray]:
+    """
+    Flattens the employment histories of all clients into one row per job.
+
+    Args:
+        employment_histories: One list of job dicts per client.
+        reference_date: Date the current jobs run until (see reference_year).
+
+    Returns:
+        dict of arrays: 'client' (position of the job's client), 'start', 'end' (the
+        reference year for current jobs), 'current' and 'salary', plus 'counts' (jobs per
+        client).
+    """
+    now = reference_year(reference_date)
+    counts = np.fromiter(map(len, employment_histories), dtype=np.int64, count=len(employment_histories))
+    jobs = [job for emp_hist in employment_histories for job in emp_hist]
+    end_years = [job['end_year'] for job in jobs]
+    current = np.array([end is None for end in end_years], dtype=bool)
+    return {
+        'client': np.repeat(np.arange(len(counts)), counts),
+        'start': np.array([job['start_year'] for job in jobs], dtype=np.int64),
+        'end': np.array([now if end is None else end for end in end_years], dtype=np.int64),
+        'current': current,
+        'salary': _amounts([job['salary'] for job in jobs]),
+        'counts': counts,
+    }
+
+
+def experience_features(jobs: Dict[str, np.ndarray], n_clients: int) -> Dict[str, np.ndarray]:
+    """
+    Merges the [start, end) year intervals of every client's jobs into continuous blocks,
+    for all clients at once.
+
+    Args:
+        jobs: Job table (see job_table).
+        n_clients: Number of clients of the table.
+
+    Returns:
+        dict of int arrays (one value per client): 'effective_work_experience' (years
+        worked, overlaps counted once), 'gap_years' (years without a job between the first
+        and the last block) and 'longest_tenure' (length of the longest block).
+    """
+    client, start, end = jobs['client'], jobs['start'], jobs['end']
+    keep = end > start
+    client, start, end = client[keep], start[keep], end[keep]
+    order = np.lexsort((start, client))
+    client, start, end = client[order], start[order], end[order]
+
+    # running max of end within each client: shifting every client's years into its own
+    # range keeps one global maximum.accumulate from leaking across clients
+    first_year = start.min() if len(start) else 0
+    span = (end.max() - first_year + 1) if len(end) else 1
+    shift = client * span - first_year
+    running = np.maximum.accumulate(end + shift) - shift
+
+    # a block starts at a client's first job and at every job starting after all earlier ones ended
+    new_block = np.ones(len(client), dtype=bool)
+    new_block[1:] = (client[1:] != client[:-1]) | (start[1:] > running[:-1])
+    block_first = np.flatnonzero(new_block)
+    block_client = client[block_first]
+    block_start = start[block_first]
+    block_end = np.maximum.reduceat(end, block_first) if len(block_first) else end
+    block_length = block_end - block_start
+
+    effective = np.zeros(n_clients, dtype=np.int64)
+    np.add.at(effective, block_client, block_length)
+    longest = np.zeros(n_clients, dtype=np.int64)
+    np.maximum.at(longest, block_client, block_length)
+    # blocks are ordered in time, so a career spans from its first block to its last
+    first_of_client = np.ones(len(block_client), dtype=bool)
+    first_of_client[1:] = block_client[1:] != block_client[:-1]
+    last_of_client = np.roll(first_of_client, -1)
+    career_start = np.zeros(n_clients, dtype=np.int64)
+    career_end = np.zeros(n_clients, dtype=np.int64)
+    career_start[block_client[first_of_client]] = block_start[first_of_client]
+    career_end[block_client[last_of_client]] = block_end[last_of_client]
+    return {
+        'effective_work_experience': effective,
+        'gap_years': career_end - career_start - effective,
+        'longest_tenure': longest,
+    }
+
+
+def extract_numeric_features(full_data: List[Dict[str, Any]], reference_date=CURRENT_YEAR) -> pd.DataFrame:
     """
     Extracts numeric features from a list of client dictionaries.
 
     Args:
         full_data: List of dictionaries, each representing a client with nested data.
+        reference_date: Date the current jobs run until (see reference_year).
 
     Returns:
         A pandas DataFrame containing engineered numeric features.
     """
+    profiles = [client['client_profile'] for client in full_data]
+    aums = [profile['aum'] for profile in profiles]
+
+    return _derive_numeric_features(
+        # total AUM
+        aum_vec=_amounts([sum(aum.values()) for aum in aums]),
+        # total property value
+        property_value_vec=_amounts([aum['real_estate_value'] for aum in aums]),
+        # number of properties owned
+        property_count_vec=np.fromiter((len(profile['real_estate_details']) for profile in profiles),
+                                       dtype=np.int64, count=len(profiles)),
+        # total value inherited
+        inheritance_vec=_amounts([aum['inheritance'] for aum in aums]),
+        # client's savings
+        savings_vec=_amounts([aum['savings'] for aum in aums]),
+        jobs=job_table([profile['employment_history'] for profile in profiles], reference_date),
+    )
+
+
+def extract_numeric_features_from_store(store_path: str, rows=None, reference_date=CURRENT_YEAR) -> pd.DataFrame:
+    """
+    Extracts the same numeric features as extract_numeric_features straight from a
+    columnar client store (client_store.py), reading only the columns it needs.
+
+    Args:
+        store_path: Parquet store written by client_store.write_store.
+        rows: Optional range of client indices to read.
+        reference_date: Date the current jobs run until (see reference_year).
+
+    Returns:
+        A pandas DataFrame of engineered numeric features, indexed by client index.
+        Missing clients are left out.
+    """
+    from client_store import read_columns
+
+    df = read_columns(store_path, ['client_profile.aum', 'client_profile.real_estate_details',
+                                   'client_profile.employment_history'], rows=rows)
+    df = df[df['_present']]
+    aum_columns = [c for c in df.columns if c.startswith('client_profile.aum.')]
+
+    df_numeric = _derive_numeric_features(
+        aum_vec=_amounts(df[aum_columns].to_numpy(dtype=np.float64).sum(axis=1)),
+        property_value_vec=_amounts(df['client_profile.aum.real_estate_value'].to_numpy(dtype=np.float64)),
+        property_count_vec=df['client_profile.real_estate_details'].map(len).to_numpy(dtype=np.int64),
+        inheritance_vec=_amounts(df['client_profile.aum.inheritance'].to_numpy(dtype=np.float64)),
+        savings_vec=_amounts(df['client_profile.aum.savings'].to_numpy(dtype=np.float64)),
+        jobs=job_table(df['client_profile.employment_history'].to_list(), reference_date),
+    )
+    df_numeric.index = df.index
+    return df_numeric
 
-    # total AUM
-    aum_vec = [np.sum(list(client['client_profile']['aum'].values())) for client in full_data]
 
-    # total property value
-    property_value_vec = [client['client_profile']['aum']['real_estate_value'] for client in full_data]
-    #number of propertis owned
-    property_count_vec = [len(client['client_profile']['real_estate_details']) for client in full_data]
+def _safe_divide(numerator, denominator, fallback):
+    # numerator / denominator where the denominator is non-zero, fallback elsewhere
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    out = np.array(np.broadcast_to(fallback, numerator.shape), dtype=np.float64)
+    nonzero = denominator != 0
+    np.divide(numerator, denominator, out=out, where=nonzero)
+    return out
 
-    # total value inherited
-    inheritance_vec = [client['client_profile']['aum']['inheritance'] for client in full_data]
 
-    # client's savings
-    savings_vec = [client['client_profile']['aum']['savings'] for client in full_data]
+def _derive_numeric_features(aum_vec, property_value_vec, property_count_vec,
+                             inheritance_vec, savings_vec, jobs) -> pd.DataFrame:
+    n = len(aum_vec)
+    client, salary = jobs['client'], jobs['salary']
 
     # how many different jobs did the client have
-    job_count_vec = [len(client['client_profile']['employment_history']) for client in full_data]
+    job_count_vec = jobs['counts']
 
-    # Compute property-to-cash ratio with zero-division handling
-    property_to_cash_vec = [
-        prop_value / (total_value - prop_value) if (total_value - prop_value) != 0 else -float('inf')
-        for prop_value, total_value in zip(property_value_vec, aum_vec)
-    ]
-    max_ratio = np.max(property_to_cash_vec)
-    property_to_cash_vec = [max_ratio if value == -float("inf") else value for value in property_to_cash_vec]
+    # Property-to-cash ratio; a zero denominator takes the largest ratio of the batch
+    property_to_cash_vec = _safe_divide(property_value_vec, aum_vec - property_value_vec, -np.inf)
+    property_to_cash_vec[property_to_cash_vec == -np.inf] = property_to_cash_vec.max() if n else -np.inf
 
     # Inheritance / (inheritance + savings), safe against zero-division
-    inheritance_to_cash_vec = [
-        inheritance / (inheritance + saving) if (inheritance + saving) != 0 else 0
-        for inheritance, saving in zip(inheritance_vec, savings_vec)
-    ]
-
-    # Salary & experience metrics
-    current_salary_vec = []
-    max_salary_vec = []
-    total_work_experience_vec = []
-    effective_work_experience_vec = []
-
-    for client in full_data:
-        emp_hist = client['client_profile']['employment_history']
-        salary = 0
-        max_salary = 0
-
-        if len(emp_hist) == 0:
-            total_work_experience = 0
-            effective_work_experience = 0
-        
-        else:
-            year_history = []
-            min_start = np.inf
-            max_end = -np.inf
-            for job in emp_hist:
-                if max_salary < job['salary']:
-                    max_salary = job['salary']
-
-                start, end = job['start_year'], job['end_year']
-                year_history.append((start, end))
-
-                if end is None:
-                    salary += job['salary']
-                    end = 2025
-
-                if start < min_start:
-                    min_start = start
-                if end > max_end:
-                    max_end = end
-
-            total_work_experience = max_end-min_start
-            effective_work_experience = calculate_effective_experience(year_history)
-
-        total_work_experience_vec.append(total_work_experience)
-        effective_work_experience_vec.append(effective_work_experience)
-        current_salary_vec.append(salary)
-        max_salary_vec.append(max_salary)
+    inheritance_to_cash_vec = _safe_divide(inheritance_vec, inheritance_vec + savings_vec, 0)
+
+    # Salary & experience metrics, reduced per client over the job table
+    current_salary_vec = np.zeros(n, dtype=salary.dtype)
+    np.add.at(current_salary_vec, client[jobs['current']], salary[jobs['current']])
+    max_salary_vec = np.zeros(n, dtype=salary.dtype)
+    np.maximum.at(max_salary_vec, client, salary)
+
+    has_jobs = job_count_vec > 0
+    min_start = np.full(n, np.iinfo(np.int64).max)
+    np.minimum.at(min_start, client, jobs['start'])
+    max_end = np.full(n, np.iinfo(np.int64).min)
+    np.maximum.at(max_end, client, jobs['end'])
+    total_work_experience_vec = np.where(has_jobs, max_end - min_start, 0)
+    experience = experience_features(jobs, n)
+    effective_work_experience_vec = experience['effective_work_experience']
 
     # Savings per active work year
-    saving_per_annum_vec = [
-        saving / work_exp if work_exp != 0 else saving
-        for saving, work_exp in zip(savings_vec, effective_work_experience_vec)
-    ]
+    saving_per_annum_vec = _safe_divide(savings_vec, effective_work_experience_vec, savings_vec)
 
     # Current salary compared to max salary seen in career
-    salary_to_max_salary_vec = [
-        salary / max_salary if max_salary != 0 else 0
-        for salary, max_salary in zip(current_salary_vec, max_salary_vec)
-    ]
+    salary_to_max_salary_vec = _safe_divide(current_salary_vec, max_salary_vec, 0)
 
     # Construct final DataFrame
     df_numeric = pd.DataFrame({
@@ -133,8 +257,12 @@ def extract_numeric_features(full_data: List[Dict[str, Any]]) -> pd.DataFrame:
         'inheritance_to_cash_ratio': inheritance_to_cash_vec,
         'total_work_experience': total_work_experience_vec,
         'effective_work_experience': effective_work_experience_vec,
+        'gap_years': experience['gap_years'],
+        'longest_tenure': experience['longest_tenure'],
         'saving_per_annum': saving_per_annum_vec,
         'salary_to_max_salary_ratio': salary_to_max_salary_vec
     })
 
     return df_numeric
+
+# USAGE: extract_numeric_features(clients, reference_date="2021-04-10")[["effective_work_experience", "gap_years", "longest_tenure"]]
@@ -0,0 +1,104 @@
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def default_answer(model, messages, options):
+    return "True"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        if self.path != "/api/chat":
+            self._send(404, {"error": f"unknown endpoint {self.path}"})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.requests.append(request)
+            failure = server.failures.pop(0) if server.failures else None
+        if failure == "error":
+            self._send(500, {"error": "stub failure"})
+            return
+        if failure == "slow":
+            time.sleep(server.slow_seconds)
+        if server.delay:
+            time.sleep(server.delay)
+        content = server.answer(request.get("model"), request.get("messages", []), request.get("options") or {})
+        self._send(200, {
+            "model": request.get("model"),
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": sum(len(m.get("content", "").split()) for m in request.get("messages", [])),
+            "eval_count": len(content.split()),
+        })
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Minimal server speaking the ollama /api/chat endpoint (non-streaming), for running the
+    LLM checks without a model.
+
+    Args:
+        port (int): Port to listen on (0 picks a free one; see .host).
+        answer (callable): (model, messages, options) -> reply text (default: 'True').
+        delay (float): Seconds to wait before every reply.
+        failures (list): Behaviour of the next requests, in order: 'error' returns HTTP 500,
+            'slow' waits slow_seconds before answering (to trigger timeouts).
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port=0, answer=default_answer, delay=0.0, failures=None, slow_seconds=5.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.answer = answer
+        self.delay = delay
+        self.failures = list(failures or [])
+        self.slow_seconds = slow_seconds
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a stub of the ollama chat API.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--answer", default="True", help="reply sent to every request")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before replying")
+    args = parser.parse_args(argv)
+    server = StubServer(args.port, answer=lambda model, messages, options: args.answer, delay=args.delay)
+    print(f"Stub ollama server on {server.host}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
+
+# USAGE: server = StubServer().start(); run_llm_checks(clients, LLMRunner("phi:latest", host=server.host)); server.stop()
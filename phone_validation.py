@@ -0,0 +1,175 @@
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import phonenumbers
+
+from countries import resolver
+
+# Same separators as check_phone_number_with_country_name in jad_flags_checker.ipynb
+PHONE_COUNTRY_SEPARATORS = re.compile(r"[;,:\|]+")
+
+
+def normalize_phone_number(phone_number: str, region_code: str) -> str:
+    # Replace starting '00' with '+'
+    phone_number = phone_number.strip()
+    if phone_number.startswith("00"):
+        phone_number = "+" + phone_number[2:]
+
+    # Remove all spaces, dashes, etc., but keep leading +
+    cleaned = re.sub(r"[^\d+]", "", phone_number)
+
+    # If it starts with '+', check and remove extra '0' after country code
+    if cleaned.startswith("+"):
+        try:
+            parsed = phonenumbers.parse(cleaned, None)
+            actual_cc = str(parsed.country_code)
+            if cleaned.startswith(f"+{actual_cc}0"):
+                # Remove the 0 after country code
+                cleaned = f"+{actual_cc}{cleaned[len(actual_cc)+2:]}"
+        except phonenumbers.NumberParseException:
+            pass
+    else:
+        # Local number without country code — assume local and prepend +country_code
+        if not cleaned.startswith("0"):
+            cleaned = "0" + cleaned
+        try:
+            country_calling_code = resolver.calling_code(region_code)
+            cleaned = f"+{country_calling_code}{cleaned.lstrip('0')}"
+        except Exception:
+            return phone_number  # fallback
+    return cleaned
+
+
+def is_valid_for_region(phone_number: str, region_code: str) -> bool:
+    """
+    True if phone_number is a valid number of region_code (one iteration of
+    check_phone_number_with_country_name), including the Dutch mobile special case.
+    """
+    try:
+        normalized_number = normalize_phone_number(phone_number, region_code)
+        parsed = phonenumbers.parse(normalized_number, None)
+        is_valid = phonenumbers.is_valid_number(parsed)
+        region = phonenumbers.region_code_for_number(parsed)
+        if (normalized_number.startswith("316") and len(normalized_number) == 11 or len(normalized_number) == 10
+                or normalized_number.startswith("+316") and len(normalized_number) == 12) and region_code == "NL":
+            is_valid = True
+        return bool(is_valid and region == region_code)
+    except phonenumbers.NumberParseException:
+        return False
+
+
+def _validate_pairs(pairs):
+    # Runs in the workers
+    return [is_valid_for_region(number, region) for number, region in pairs]
+
+
+def country_regions(country_names):
+    """
+    Alpha-2 codes of a multi-country field, in order, skipping unknown countries.
+    """
+    return [code for code in (resolver.alpha_2(name.strip()) for name in PHONE_COUNTRY_SEPARATORS.split(country_names))
+            if code]
+
+
+class PhoneValidator:
+    """
+    Validates phone numbers against countries of domicile with a bounded LRU memo of
+    (number, region) results.
+
+    Args:
+        maxsize (int): Number of (number, region) results kept.
+        workers (int): Process pool size for large batches (default: os.cpu_count()).
+        parallel_threshold (int): Batches with fewer uncached pairs run in-process.
+    """
+
+    def __init__(self, maxsize=100_000, workers=None, parallel_threshold=5000):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return self._cache[key]
+        self.misses += 1
+        return None
+
+    def _put(self, key, value):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def is_valid(self, phone_number, region_code):
+        key = (phone_number, region_code)
+        valid = self._get(key)
+        if valid is None:
+            valid = is_valid_for_region(phone_number, region_code)
+            self._put(key, valid)
+        return valid
+
+    def check(self, phone_number, country_names):
+        """
+        Drop-in for check_phone_number_with_country_name: True if the number is valid
+        for any of the listed countries.
+        """
+        return any(self.is_valid(phone_number, region) for region in country_regions(country_names))
+
+    def check_batch(self, phone_numbers, country_names):
+        """
+        Runs check over a whole batch: (number, region) pairs are deduplicated, the ones not
+        memoised are validated once (in a process pool when there are many), and the
+        per-client answers are assembled from the results.
+
+        Args:
+            phone_numbers (list): One phone number per client.
+            country_names (list): The matching countries of domicile.
+
+        Returns:
+            list: One bool per client.
+        """
+        regions = {names: country_regions(names) for names in set(country_names)}
+        pairs = {(number, region) for number, names in zip(phone_numbers, country_names)
+                 for region in regions[names]}
+        known = {}
+        todo = []
+        for pair in pairs:
+            valid = self._get(pair)
+            if valid is None:
+                todo.append(pair)
+            else:
+                known[pair] = valid
+
+        if len(todo) >= self.parallel_threshold and self.workers != 1:
+            chunk = 1000
+            chunks = [todo[i:i + chunk] for i in range(0, len(todo), chunk)]
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = [valid for part in pool.map(_validate_pairs, chunks) for valid in part]
+        else:
+            results = _validate_pairs(todo)
+        for pair, valid in zip(todo, results):
+            known[pair] = valid
+            self._put(pair, valid)
+
+        return [any(known[(number, region)] for region in regions[names])
+                for number, names in zip(phone_numbers, country_names)]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache),
+                "hit_rate": self.hits / total if total else None}
+
+
+# Shared by the rules of this process
+validator = PhoneValidator()
+
+
+def check_phone_number_with_country_name(phone_number: str, country_names: str) -> bool:
+    return validator.check(phone_number, country_names)
+
+# USAGE: validator.check_batch([c['client_profile']['phone_number'] for c in clients], [c['client_profile']['country_of_domicile'] for c in clients])
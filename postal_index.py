@@ -0,0 +1,166 @@
+import os
+import unicodedata
+
+import numpy as np
+
+POSTAL_INDEX_DIR = "postal_index"
+
+# Arrays stored per country; all are sorted so lookups are binary searches on the mmapped file
+_ARRAYS = ("postal_codes", "places", "place_offsets", "place_postal")
+
+
+def normalize_place(name):
+    """
+    Lowercases a place or city name, applies NFC and collapses whitespace, so the index
+    and the client address compare the same way.
+    """
+    if not isinstance(name, str):
+        return ""
+    return " ".join(unicodedata.normalize("NFC", name).lower().split())
+
+
+def build_country_index(data, out_dir):
+    """
+    Writes the postal-code index of one country.
+
+    Args:
+        data (pd.DataFrame): pgeocode country data (needs 'place_name' and 'postal_code').
+        out_dir (str): Folder for this country (e.g. 'postal_index/DE').
+
+    Files written (all .npy, loadable with mmap_mode='r'):
+        postal_codes: sorted unique postal codes.
+        places: sorted unique normalised place names.
+        place_offsets, place_postal: the postal codes of places[i] are
+            postal_codes[place_postal[place_offsets[i]:place_offsets[i + 1]]].
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rows = data[["place_name", "postal_code"]].dropna(subset=["postal_code"])
+    codes = rows["postal_code"].astype(str).to_numpy()
+    places = np.array([normalize_place(p) for p in rows["place_name"]], dtype=object)
+
+    postal_codes = np.unique(codes).astype(str)
+    named = places != ""
+    pairs = sorted(set(zip(places[named], codes[named])))
+    place_names = np.array(sorted({p for p, _ in pairs}), dtype=str)
+    place_ids = np.searchsorted(place_names, [p for p, _ in pairs])
+    place_postal = np.searchsorted(postal_codes, [c for _, c in pairs]).astype(np.int64)
+    # pairs are sorted by place, so each place's codes are one contiguous run
+    place_offsets = np.concatenate([[0], np.cumsum(np.bincount(place_ids, minlength=len(place_names)))])
+
+    arrays = {
+        "postal_codes": postal_codes,
+        "places": place_names if len(place_names) else np.zeros(0, dtype="U1"),
+        "place_offsets": place_offsets.astype(np.int64),
+        "place_postal": place_postal,
+    }
+    for name, array in arrays.items():
+        # Unique temporary name, so processes building the same country do not collide
+        tmp_path = os.path.join(out_dir, f"{name}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(out_dir, name + ".npy"))
+    return out_dir
+
+
+def _sorted_contains(sorted_array, values):
+    # Vectorised membership test against a sorted (possibly memory-mapped) array
+    values = np.asarray(values, dtype=str)
+    if len(sorted_array) == 0 or len(values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    pos = np.searchsorted(sorted_array, values)
+    pos[pos == len(sorted_array)] = 0
+    return sorted_array[pos] == values
+
+
+class CountryIndex:
+    """
+    Memory-mapped postal-code index of one country (see build_country_index).
+    """
+
+    def __init__(self, country_dir):
+        self.country_dir = country_dir
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(country_dir, name + ".npy"), mmap_mode="r"))
+
+    def has_postal_code(self, postal_code):
+        return bool(_sorted_contains(self.postal_codes, [str(postal_code)])[0])
+
+    def _place_id(self, place):
+        place = normalize_place(place)
+        pos = int(np.searchsorted(self.places, place))
+        return pos if pos < len(self.places) and self.places[pos] == place else None
+
+    def postal_codes_for_place(self, place):
+        """
+        Returns the postal codes listed for a place name ([] for an unknown place).
+        """
+        i = self._place_id(place)
+        if i is None:
+            return []
+        ids = self.place_postal[self.place_offsets[i]:self.place_offsets[i + 1]]
+        return [str(code) for code in self.postal_codes[ids]]
+
+    def city_matches(self, city):
+        """
+        True if some place name of the country occurs in city (the check_city rule of
+        validate_postal_code_for_client). Only the substrings of city are looked up, so
+        the cost depends on the length of the city name, not on the size of the country.
+        """
+        city = normalize_place(city)
+        substrings = {city[i:j] for i in range(len(city)) for j in range(i + 1, len(city) + 1)}
+        return bool(substrings) and bool(_sorted_contains(self.places, sorted(substrings)).any())
+
+
+class PostalIndex:
+    """
+    Per-country postal-code indexes stored under index_dir/<alpha-2 code>/.
+
+    A country is built from its pgeocode data the first time it is needed and only
+    loaded (memory-mapped) afterwards, in this and every later process.
+
+    Args:
+        index_dir (str): Root folder of the index (default: 'postal_index').
+        load_data (callable): country code -> pgeocode-style DataFrame, or None when
+            the country has no data. Used only for countries not built yet.
+        source_mtime (float): Modification time of the data load_data reads; country
+            indexes built before it are rebuilt.
+    """
+
+    def __init__(self, index_dir=POSTAL_INDEX_DIR, load_data=None, source_mtime=None):
+        self.index_dir = index_dir
+        self.load_data = load_data
+        self.source_mtime = source_mtime
+        self._countries = {}
+
+    def _is_built(self, country_dir):
+        marker = os.path.join(country_dir, "place_postal.npy")
+        if not os.path.exists(marker):
+            return False
+        return self.source_mtime is None or os.path.getmtime(marker) >= self.source_mtime
+
+    def country(self, country_code):
+        """
+        Returns the CountryIndex of a country, or None if there is no data for it.
+        """
+        if country_code not in self._countries:
+            country_dir = os.path.join(self.index_dir, country_code)
+            if not self._is_built(country_dir):
+                data = self.load_data(country_code) if self.load_data else None
+                if data is None or data.empty:
+                    self._countries[country_code] = None
+                    return None
+                build_country_index(data, country_dir)
+            self._countries[country_code] = CountryIndex(country_dir)
+        return self._countries[country_code]
+
+    def build(self, country_codes):
+        """
+        Builds (or rebuilds) the index of every given country.
+        """
+        for country_code in country_codes:
+            self._countries.pop(country_code, None)
+            country_dir = os.path.join(self.index_dir, country_code)
+            if os.path.exists(os.path.join(country_dir, "place_postal.npy")):
+                os.remove(os.path.join(country_dir, "place_postal.npy"))
+            self.country(country_code)
+
+# USAGE: PostalIndex(load_data=GeodataBundle("geodata_bundle.npz").country_data).country("DE").has_postal_code("10115")
@@ -0,0 +1,109 @@
+import re
+
+# Phrases the client descriptions use to state each marital status. Words such as
+# 'husband' or 'wife' also occur in texts about a widowed or divorced client, so they are
+# left to the model.
+MARITAL_KEYWORDS = {
+    'single': ['single'],
+    'married': ['married', 'tied the knot'],
+    'divorced': ['divorced'],
+    'widowed': ['widowed', 'widow', 'widower'],
+}
+
+# Phrases that may tell of a marriage that ended: a text using one is left to the model
+ENDED_KEYWORDS = ['lost', 'passed away', 'died', 'death', 'late', 'former', 'ex', 'no longer',
+                  'separated', 'until', 'divorce', 'never']
+
+
+def clean_string(s):
+    if not isinstance(s, str):
+        return ""
+    return s.lower().strip()
+
+
+def _names_verdict(names, text):
+    """
+    True if every name occurs verbatim in text, None (ask the model) otherwise: a name
+    may be rephrased, so a missing one is no evidence of a mismatch.
+    """
+    text_clean = clean_string(text)
+    if all(clean_string(name) in text_clean for name in names):
+        return True
+    return None
+
+
+def _mentions(text, keywords):
+    return any(re.search(r"\b" + re.escape(k) + r"\b", text) for k in keywords)
+
+
+def family_background(client):
+    """
+    Marital status against the 'Family Background' text: True when the text only names
+    that status and nothing hints at a marriage that ended, None (ask the model) otherwise.
+    """
+    status = clean_string(client['client_profile'].get('marital_status'))
+    text = clean_string(client['client_description'].get('Family Background'))
+    if status not in MARITAL_KEYWORDS or _mentions(text, ENDED_KEYWORDS):
+        return None
+    found = {s for s, keywords in MARITAL_KEYWORDS.items() if _mentions(text, keywords)}
+    return True if found == {status} else None
+
+
+def education_background(client):
+    """
+    Listed secondary school and universities against the 'Education Background' text.
+    """
+    names = []
+    if client['client_profile']['secondary_school'].get('name'):
+        names.append(client['client_profile']['secondary_school']['name'])
+    names.extend(higher['university'] for higher in client['client_profile']['higher_education'])
+    return _names_verdict(names, client['client_description'].get('Education Background'))
+
+
+def work_background(client):
+    """
+    Companies and positions of the employment history against the 'Occupation History' text.
+    """
+    names = []
+    for job in client['client_profile']['employment_history']:
+        names.extend([job['company'], job['position']])
+    return _names_verdict(names, client['client_description'].get('Occupation History'))
+
+
+def wealth_background(client):
+    """
+    True when every non-zero amount (savings, inheritance, property values) is written in
+    the 'Wealth Summary'; otherwise left to the model (amounts can be rephrased).
+    """
+    aum = client['client_profile']['aum']
+    amounts = [aum.get('savings'), aum.get('inheritance')]
+    amounts += [prop.get('property value') for prop in client['client_profile']['real_estate_details']]
+    text = clean_string(client['client_description'].get('Wealth Summary'))
+    if all(str(amount) in text for amount in amounts if amount):
+        return True
+    return None
+
+
+# check name (llm_checks.CHECKS) -> client -> True / None (ask the model). The cheap tier
+# only ever accepts: keyword evidence is too weak to reject a client without the model.
+CHEAP_CHECKS = {
+    'family_background': family_background,
+    'education_background': education_background,
+    'work_background': work_background,
+    'wealth_background': wealth_background,
+}
+
+
+def cheap_verdict(check_name, client):
+    """
+    Answer of the cheap tier for one check and client: True when the text matchers are
+    sure the check passes, None when the model has to decide (or the check has no cheap
+    tier, e.g. 'client_summary').
+    """
+    check = CHEAP_CHECKS.get(check_name)
+    if check is None:
+        return None
+    try:
+        return check(client)
+    except (KeyError, TypeError, AttributeError):
+        return None  # malformed record: let the model look at it
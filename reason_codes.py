@@ -0,0 +1,249 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+
+# Every error message a client can get; a message's position is its bit in the reason
+# masks. Append new messages at the end only: saved masks are decoded with the table
+# stored next to them, but reordering would break older readers.
+#
+# A mask is a set: it keeps neither the order of a client's messages nor repeats of one
+# (two rules share a reason), so decode_masks does not always give back the lists
+# flag_clients made. Keep the exact lists in JSON Lines (write_errors(..., '.jsonl')).
+REASONS = (
+    "Missing docs",
+    "Missing passport information",
+    "Missing account_form information",
+    "Missing client_profile information",
+    "Missing client_description information",
+    # rule_engine.RULES
+    "High School Graduation Inconsistent",
+    "Country Code Mismatch",
+    "Passport Name Mismatch",
+    "Full Name Mismatch",
+    "Passport Gender Mismatch",
+    "Passport Number Mismatch",
+    "Passport Expiry Date Invalid",
+    "Email Address Invalid",
+    "Phone Number Mismatch",
+    "Email Address Mismatch",
+    "Passport Issued Date Invalid",
+    "Passport Birth Date Mismatch",
+    "Passport Issued Date Mismatch",
+    "Passport Expiry Date Mismatch",
+    "MRZ Mismatch",
+    "Currency Mismatch",
+    "Country of Domicile Mismatch",
+    "Address Mismatch",
+    "Age less than 18",
+    "Graduation Years Inconsistent",
+    "Employment History Years Inconsistent",
+    "Gender Not Specified",
+    "Type of Mandate Not Specified",
+    "Investment Risk Profile Not Specified",
+    "Real Estate Value Mismatch",
+    "Secondary School Name Mismatch",
+    "University info Mismatch",
+    "Missing Inheritance Details",
+    "Missing Passport Number in Client Profile",
+    "Missing Phone Number in Client Profile",
+    "Missing Address Details in Client Profile",
+    "Missing Employment History Details in Client Profile",
+    "Missing Education Background in Client Profile",
+    "Missing Passport Details",
+    "Missing Account Form Details",
+    "Missing Address Details in Account Form",
+    "Inheritance Information does not match Wealth Summary",
+    "Inheritance amount does not match Wealth Summary",
+    "Savings amount does not match Wealth Summary",
+    "Invalid Postal Code",
+    "Invalid Phone Number",
+    # llm_checks.CHECKS
+    "Family Background Check Failed",
+    "Education Background Check Failed",
+    "Work Background Check Failed",
+    "Wealth Background Check Failed",
+    "Client Summary Check Failed",
+)
+
+# message -> bit
+REASON_CODES = {message: code for code, message in enumerate(REASONS)}
+
+# Column of the masks in a reasons Parquet file, and metadata key of its reason table
+MASK_COLUMN = "reasons"
+TABLE_KEY = b"reason_table"
+
+
+#### ENCODING
+
+
+def encode_errors(client_errors):
+    """
+    Turns per-client lists of error messages into one uint64 mask per client, bit
+    REASON_CODES[message] being set when the client has that message.
+
+    Raises:
+        ValueError: For a message that is not in REASONS.
+    """
+    masks = np.zeros(len(client_errors), dtype=np.uint64)
+    for i, messages in enumerate(client_errors):
+        mask = 0
+        for message in messages:
+            code = REASON_CODES.get(message)
+            if code is None:
+                raise ValueError(f"Unknown error message {message!r}; add it to reason_codes.REASONS")
+            mask |= 1 << code
+        masks[i] = mask
+    return masks
+
+
+def reason_matrix(masks, reasons=REASONS):
+    """
+    Boolean clients x reasons matrix of the masks (one column per reason, in code order).
+    """
+    masks = np.ascontiguousarray(masks, dtype='<u8')
+    bits = np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    return bits[:, :len(reasons)].astype(bool)
+
+
+def decode_masks(masks, reasons=REASONS):
+    """
+    Turns masks back into per-client lists of messages, in REASONS order (not
+    necessarily the order they were reported in), each message once.
+    """
+    matrix = reason_matrix(masks, reasons)
+    return [[reasons[j] for j in np.flatnonzero(row)] for row in matrix]
+
+
+#### AGGREGATION
+
+
+def reason_frame(masks, reasons=REASONS):
+    """
+    reason_matrix as a DataFrame with the messages as columns; replaces the one-hot
+    error matrix the notebooks build from all_errors.
+    """
+    return pd.DataFrame(reason_matrix(masks, reasons), columns=list(reasons))
+
+
+def reason_counts(masks, reasons=REASONS, drop_zero=True):
+    """
+    Number of clients with each reason, most frequent first.
+    """
+    counts = pd.Series(reason_matrix(masks, reasons).sum(axis=0), index=list(reasons), name="clients")
+    if drop_zero:
+        counts = counts[counts > 0]
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def co_occurrence(masks, reasons=REASONS, drop_zero=True):
+    """
+    Reasons x reasons matrix of the number of clients having both reasons; the diagonal
+    holds reason_counts.
+    """
+    # Float product (BLAS); exact for any realistic number of clients
+    matrix = reason_matrix(masks, reasons).astype(np.float64)
+    counts = pd.DataFrame((matrix.T @ matrix).astype(np.int64), index=list(reasons), columns=list(reasons))
+    if drop_zero:
+        seen = np.diag(counts.to_numpy()) > 0
+        counts = counts.loc[seen, seen]
+    return counts
+
+
+def reason_mask(messages):
+    """
+    Mask with the bits of the given messages set.
+    """
+    mask = 0
+    for message in messages:
+        if message not in REASON_CODES:
+            raise ValueError(f"Unknown error message {message!r}")
+        mask |= 1 << REASON_CODES[message]
+    return np.uint64(mask)
+
+
+def select_clients(masks, all_of=(), any_of=(), none_of=()):
+    """
+    Boolean array of the clients that have every reason of all_of, at least one of
+    any_of (when given) and none of none_of.
+
+    Example:
+        select_clients(masks, all_of=["MRZ Mismatch"], none_of=["Missing docs"])
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    need, some, avoid = reason_mask(all_of), reason_mask(any_of), reason_mask(none_of)
+    keep = (masks & need) == need
+    if any_of:
+        keep &= (masks & some) != 0
+    return keep & ((masks & avoid) == 0)
+
+
+#### FILES
+
+
+def save_reasons(masks, path):
+    """
+    Writes the masks as a one-column uint64 Parquet file, with the reason table in the
+    file's metadata.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table({MASK_COLUMN: pa.array(np.asarray(masks, dtype=np.uint64))})
+    table = table.replace_schema_metadata({TABLE_KEY: json.dumps(list(REASONS)).encode("utf-8")})
+    pq.write_table(table, path)
+
+
+def load_reasons(path):
+    """
+    Reads masks saved by save_reasons, re-coded to the current REASONS if the file was
+    written with a different table.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    masks = table.column(MASK_COLUMN).to_numpy().astype(np.uint64)
+    stored = json.loads(table.schema.metadata[TABLE_KEY])
+    if tuple(stored) == REASONS[:len(stored)]:
+        return masks
+    recoded = np.zeros_like(masks)
+    matrix = reason_matrix(masks, stored)
+    for j, message in enumerate(stored):
+        recoded[matrix[:, j]] |= reason_mask([message])
+    return recoded
+
+
+def write_errors(client_errors, path):
+    """
+    Writes per-client error lists as JSON Lines (.jsonl, exact), reason masks (.parquet;
+    compact but unordered and without repeats, see REASONS) or, for older readers, a
+    pickled list of lists (any other path).
+    """
+    if path.endswith(".parquet"):
+        save_reasons(encode_errors(client_errors), path)
+    elif path.endswith(".jsonl"):
+        with open(path, "w", encoding="utf-8") as f:
+            for errors in client_errors:
+                f.write(json.dumps(errors, ensure_ascii=False) + "\n")
+    else:
+        # One object per distinct message, so the pickle only depends on the messages
+        messages = {}
+        with open(path, "wb") as f:
+            pickle.dump([[messages.setdefault(m, m) for m in errors] for errors in client_errors], f)
+
+
+def read_errors(path):
+    """
+    Reads a file written by write_errors back into per-client lists of messages.
+    """
+    if path.endswith(".parquet"):
+        return decode_masks(load_reasons(path))
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# USAGE: save_reasons(encode_errors(client_errors), "client_reasons.parquet"); reason_counts(load_reasons("client_reasons.parquet"))
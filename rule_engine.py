@@ -0,0 +1,900 @@
+import os
+import json
+import time
+import weakref
+import operator
+from datetime import datetime, timedelta
+from itertools import chain, repeat
+
+import numpy as np
+import pandas as pd
+
+# Sections a client must have before any other rule is evaluated (check_client_nones)
+REQUIRED_SECTIONS = ['passport', 'account_form', 'client_profile', 'client_description']
+
+# Reference date used by check_passport_expiry_date in final_pipeline.ipynb
+EXPIRY_REFERENCE_DATE = "2021-04-10"
+
+# Per-rule cost and hit counts gathered by every evaluate/decide run (see RuleStats)
+STATS_PATH = "rule_stats.json"
+
+
+class Rule:
+    """
+    A registered check: func(frame) returns a boolean numpy array that is True where the
+    client fails the check, and reason is the message appended to that client's errors.
+    """
+
+    def __init__(self, name, reason, func, default=True):
+        self.name = name
+        self.reason = reason
+        self.func = func
+        self.default = default
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, {self.reason!r})"
+
+
+# name -> Rule, in the order check_all_flags reports reasons
+RULES = {}
+
+
+def rule(name, reason, default=True):
+    """
+    Registers a vectorized check under name. Rules registered with default=False are only
+    run when asked for explicitly.
+    """
+    def register(func):
+        RULES[name] = Rule(name, reason, func, default)
+        return func
+    return register
+
+
+def default_rules():
+    return [r.name for r in RULES.values() if r.default]
+
+
+#### FRAME
+
+
+def client_frame(clients):
+    """
+    Builds the frame rules run on: one row per client and one object column per
+    '<section>.<field>' (e.g. 'passport.first_name', 'client_profile.address').
+
+    Args:
+        clients (iterable): Client dicts (None for missing clients), e.g. a list,
+            a LazyClients view or client_store.iter_clients.
+
+    Returns:
+        pd.DataFrame: Also holds '_present' and '_missing_section' (the first required
+            section a present client lacks, or None).
+    """
+    clients = clients if isinstance(clients, list) else list(clients)
+    n = len(clients)
+    present = np.fromiter(map(operator.is_not, clients, repeat(None)), dtype=bool, count=n)
+    data = {'_present': present}
+    empty = {section: np.ones(n, dtype=bool) for section in REQUIRED_SECTIONS}
+    records = [c if c is not None else {} for c in clients]
+    # Column-wise: one pass over the clients per section, then one dict.get per field
+    for section in dict.fromkeys(chain.from_iterable(records)):
+        values = list(map(dict.get, records, repeat(section)))
+        is_dict = np.fromiter(map(isinstance, values, repeat(dict)), dtype=bool, count=n)
+        dicts = list(values)
+        for i in np.flatnonzero(~is_dict):
+            dicts[i] = {}
+        if section in empty:
+            empty[section] = (np.fromiter(map(operator.is_, values, repeat(None)), dtype=bool, count=n)
+                              | (is_dict & (np.fromiter(map(len, dicts), dtype=np.int64, count=n) == 0)))
+
+        # Fields in order of first appearance; usually the first client already has them all
+        every_field = set().union(*dicts)
+        fields = {}
+        for d in dicts:
+            if len(fields) == len(every_field):
+                break
+            fields.update(dict.fromkeys(d))
+        for field in fields:
+            data[f"{section}.{field}"] = np.fromiter(map(dict.get, dicts, repeat(field)), dtype=object, count=n)
+        # A section that is not a dict (for some client) is kept whole in a column of its own
+        if any(section in records[i] for i in np.flatnonzero(~is_dict)):
+            data[section] = np.fromiter((None if isinstance(v, dict) else v for v in values), dtype=object, count=n)
+
+    missing = np.full(n, None, dtype=object)
+    for section in reversed(REQUIRED_SECTIONS):
+        missing[empty[section] & present] = section
+    data['_missing_section'] = missing
+    # object dtype keeps None for absent fields (the string dtype would turn them into NaN)
+    return pd.DataFrame({k: pd.Series(v, dtype=v.dtype) for k, v in data.items()})
+
+
+def store_frame(store_path, rows=None):
+    """
+    Builds the same frame as client_frame from a columnar store (client_store.py) without
+    materialising the client dicts: columns expanded below '<section>.<field>' (address,
+    aum, secondary_school, ...) are folded back into one column of dicts.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from client_store import read_columns, store_layout, PRESENT_COLUMN
+
+    df = read_columns(store_path, rows=rows)
+    layout = {c['name']: c['path'] for c in store_layout(store_path)}
+    schema = pq.read_schema(store_path)
+    for name in layout:
+        if pa.types.is_integer(schema.field(name).type):
+            # Nullable int columns come back as floats; rules compare their str() with free text
+            df[name] = pd.Series([None if pd.isna(v) else int(v) for v in df[name]], index=df.index, dtype=object)
+        elif df[name].dtype != object:
+            df[name] = pd.Series([None if pd.isna(v) else v for v in df[name].tolist()], index=df.index,
+                                 dtype=object)
+    data = {'_present': df[PRESENT_COLUMN].to_numpy(dtype=bool)}
+    n = len(df)
+
+    grouped = {}
+    for name, path in layout.items():
+        if len(path) == 1:
+            # A whole section kept as one column (it was absent for some clients)
+            values = df[name].to_numpy(dtype=object)
+            for i, value in enumerate(values):
+                for field, v in (value or {}).items():
+                    data.setdefault(f"{path[0]}.{field}", np.full(n, None, dtype=object))[i] = v
+        elif len(path) == 2:
+            data[name] = df[name].to_numpy(dtype=object)
+        else:
+            grouped.setdefault(".".join(path[:2]), []).append((path[2:], df[name].to_numpy(dtype=object)))
+    for name, parts in grouped.items():
+        folded = np.empty(n, dtype=object)
+        for i in range(n):
+            value = {}
+            for path, values in parts:
+                node = value
+                for key in path[:-1]:
+                    node = node.setdefault(key, {})
+                node[path[-1]] = values[i]
+            folded[i] = value
+        data[name] = folded
+
+    missing = np.full(n, None, dtype=object)
+    for section in reversed(REQUIRED_SECTIONS):
+        section_columns = [k for k in data if k.startswith(section + ".")]
+        empty = np.ones(n, dtype=bool)
+        for k in section_columns:
+            empty &= np.fromiter((v is None for v in data[k]), dtype=bool, count=n)
+        missing[empty & data['_present']] = section
+    data['_missing_section'] = missing
+    return pd.DataFrame({k: pd.Series(v, index=df.index, dtype=v.dtype) for k, v in data.items()})
+
+
+#### COLUMN HELPERS
+
+
+def _col(frame, name):
+    if name in frame:
+        return frame[name].to_numpy(dtype=object)
+    return np.full(len(frame), None, dtype=object)
+
+
+# Derived columns several rules share (the lowercased free text), kept per frame while it is alive
+_derived = {}
+
+
+def _memo(frame, key, compute):
+    memo = _derived.get(id(frame))
+    if memo is None:
+        memo = _derived[id(frame)] = {}
+        weakref.finalize(frame, _derived.pop, id(frame), None)
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+
+def _text(frame, name):
+    # _clean of a free text column, computed once per frame
+    return _memo(frame, ('clean', name), lambda: _clean(_col(frame, name)))
+
+
+def _is_dict(values):
+    return np.fromiter(map(isinstance, values, repeat(dict)), dtype=bool, count=len(values))
+
+
+def _field(values, key, default=None):
+    if _is_dict(values).all():
+        return np.fromiter(map(dict.get, values, repeat(key), repeat(default)), dtype=object, count=len(values))
+    return np.array([v.get(key, default) if isinstance(v, dict) else default for v in values], dtype=object)
+
+
+def _array(values):
+    return np.array(values, dtype=object) if not isinstance(values, np.ndarray) else values
+
+
+def _str(values):
+    # str() of every value, '' for None (string ops below then never see None)
+    return _array([v if v.__class__ is str else '' if v is None else str(v) for v in values])
+
+
+def _strs(frame, name):
+    # _str of a column, computed once per frame
+    return _memo(frame, ('str', name), lambda: _str(_col(frame, name)))
+
+
+def _clean(values):
+    # clean_string: lowercase and strip, '' for non-strings
+    return _array([v.lower().strip() if isinstance(v, str) else '' for v in values])
+
+
+def _upper(values):
+    return _array(list(map(str.upper, values)))
+
+
+# The element-wise helpers below map C functions over the columns instead of running a
+# Python expression per row
+
+
+def _eq(a, b):
+    return np.fromiter(map(operator.eq, a, b), dtype=bool, count=len(a))
+
+
+def _contains(needles, haystacks):
+    return np.fromiter(map(operator.contains, haystacks, needles), dtype=bool, count=len(needles))
+
+
+def _find(haystacks, needles):
+    # str.find per row: -1 where the needle is absent
+    return np.fromiter(map(str.find, haystacks, needles), dtype=np.int64, count=len(haystacks))
+
+
+def _empty(values):
+    # None or ''
+    return np.fromiter(map(operator.contains, repeat((None, '')), values), dtype=bool, count=len(values))
+
+
+def _explode(values):
+    # The items of list values, flattened, and the row each one comes from
+    lists = [v if v is not None else () for v in values]
+    owner = np.repeat(np.arange(len(lists)), np.fromiter(map(len, lists), dtype=np.int64, count=len(lists)))
+    return owner, list(chain.from_iterable(lists))
+
+
+def _date(values):
+    return pd.to_datetime(pd.Series(values, dtype=object), format="%Y-%m-%d", errors="coerce")
+
+
+def _dates(frame, name):
+    # _date of a column, parsed once per frame
+    return _memo(frame, ('date', name), lambda: _date(_col(frame, name)))
+
+
+def _any_empty(values, none=True):
+    # Dicts with a '' value (or a None one)
+    if none:
+        return np.fromiter((isinstance(v, dict) and ('' in v.values() or None in v.values()) for v in values),
+                           dtype=bool, count=len(values))
+    return np.fromiter((isinstance(v, dict) and '' in v.values() for v in values), dtype=bool, count=len(values))
+
+
+#### RULES (same order and messages as check_all_flags in final_pipeline.ipynb)
+
+
+@rule('high_school_graduation', "High School Graduation Inconsistent")
+def high_school_graduation(frame, min_age=16, max_age=21):
+    grad_year = pd.to_numeric(pd.Series(_field(_col(frame, 'client_profile.secondary_school'), 'graduation_year')),
+                              errors='coerce')
+    age_at_graduation = grad_year - _dates(frame, 'client_profile.birth_date').dt.year
+    return ~((age_at_graduation >= min_age) & (age_at_graduation <= max_age)).to_numpy()
+
+
+@rule('country_code', "Country Code Mismatch")
+def country_code(frame):
+    from countries import get_alpha_3_country_code
+
+    countries = pd.Series(_col(frame, 'passport.country'), dtype=object)
+    # Only a few hundred distinct country strings, so look each one up once
+    lookup = {c: get_alpha_3_country_code(c) for c in countries.dropna().unique()}
+    return ~_eq(_col(frame, 'passport.country_code'), countries.map(lookup).to_numpy(dtype=object))
+
+
+@rule('passport_name', "Passport Name Mismatch")
+def passport_name(frame):
+    mismatch = np.zeros(len(frame), dtype=bool)
+    for field in ['first_name', 'last_name', 'middle_name']:
+        mismatch |= ~_eq(_col(frame, f'passport.{field}'), _col(frame, f'account_form.{field}'))
+    return mismatch
+
+
+@rule('full_name', "Full Name Mismatch")
+def full_name(frame):
+    def no_spaces(values):
+        return _array([v.replace(" ", "") for v in values])
+
+    passport = no_spaces(_strs(frame, 'passport.first_name') + _strs(frame, 'passport.middle_name')
+                         + _strs(frame, 'passport.last_name'))
+    account = no_spaces(_strs(frame, 'account_form.name'))
+    profile = no_spaces(_strs(frame, 'client_profile.name'))
+    return ~_eq(passport, account) | ~_eq(passport, profile)
+
+
+@rule('gender', "Passport Gender Mismatch")
+def gender(frame):
+    return ~_eq(_col(frame, 'passport.gender'), _col(frame, 'client_profile.gender'))
+
+
+@rule('passport_number', "Passport Number Mismatch")
+def passport_number(frame):
+    return ~_eq(_col(frame, 'passport.passport_number'), _col(frame, 'account_form.passport_number'))
+
+
+@rule('passport_expired', "Passport Expiry Date Invalid")
+def passport_expired(frame):
+    return (_dates(frame, 'passport.passport_expiry_date') < pd.Timestamp(EXPIRY_REFERENCE_DATE)).to_numpy()
+
+
+@rule('email_validity', "Email Address Invalid")
+def email_validity(frame):
+    from email_validator import validate_email, EmailNotValidError
+
+    def could_be_valid_email(email):
+        try:
+            validate_email(email, check_deliverability=False)
+            return True
+        except (EmailNotValidError, TypeError, AttributeError):
+            return False
+
+    emails = _col(frame, 'client_profile.email_address')
+    # Validate each distinct address once
+    valid = {e: could_be_valid_email(e) for e in set(emails) if e is not None}
+    return ~np.fromiter(map(valid.get, emails, repeat(False)), dtype=bool, count=len(emails))
+
+
+@rule('phone_number', "Phone Number Mismatch")
+def phone_number(frame):
+    return ~_eq(_col(frame, 'account_form.phone_number'), _col(frame, 'client_profile.phone_number'))
+
+
+@rule('email_address', "Email Address Mismatch")
+def email_address(frame):
+    return ~_eq(_col(frame, 'account_form.email_address'), _col(frame, 'client_profile.email_address'))
+
+
+# check_passport_dates reports up to five messages, one rule each
+@rule('passport_issue_after_expiry', "Passport Issued Date Invalid")
+def passport_issue_after_expiry(frame):
+    return (_dates(frame, 'passport.passport_expiry_date')
+            < _dates(frame, 'passport.passport_issue_date')).to_numpy()
+
+
+@rule('passport_birth_date', "Passport Birth Date Mismatch")
+def passport_birth_date(frame):
+    return (_dates(frame, 'passport.birth_date') != _dates(frame, 'client_profile.birth_date')).to_numpy()
+
+
+@rule('passport_issue_date', "Passport Issued Date Mismatch")
+def passport_issue_date(frame):
+    return (_dates(frame, 'passport.passport_issue_date')
+            != _dates(frame, 'client_profile.passport_issue_date')).to_numpy()
+
+
+@rule('passport_expiry_date', "Passport Expiry Date Mismatch")
+def passport_expiry_date(frame):
+    return (_dates(frame, 'passport.passport_expiry_date')
+            != _dates(frame, 'client_profile.passport_expiry_date')).to_numpy()
+
+
+@rule('passport_issue_before_birth', "Passport Issued Date Mismatch")
+def passport_issue_before_birth(frame):
+    return (_dates(frame, 'passport.passport_issue_date')
+            < _dates(frame, 'passport.birth_date')).to_numpy()
+
+
+@rule('mrz', "MRZ Mismatch")
+def mrz(frame):
+    mrz_lines = _col(frame, 'passport.passport_mrz')
+    line0 = _array([m[0] if m is not None and len(m) > 0 else '' for m in mrz_lines])
+    line1 = _array([m[1] if m is not None and len(m) > 1 else '' for m in mrz_lines])
+    first, middle, last, code = (_upper(_strs(frame, f'passport.{field}'))
+                                 for field in ['first_name', 'middle_name', 'last_name', 'country_code'])
+
+    # Every name must be in the first line, the last name after the country code and the
+    # middle name (when there is one) after the last name
+    code_pos, last_pos, middle_pos = _find(line0, code), _find(line0, last), _find(line0, middle)
+    names_present = (code_pos >= 0) & (last_pos >= 0) & (middle_pos >= 0) & _contains(first, line0)
+    has_middle = np.fromiter(map(len, middle), dtype=np.int64, count=len(middle)) != 0
+    ordered = (code_pos < last_pos) & (~has_middle | (last_pos < middle_pos))
+
+    birth = _array([v.replace('-', '')[2:] for v in _strs(frame, 'passport.birth_date')])
+    number_line = _strs(frame, 'passport.passport_number') + _strs(frame, 'passport.country_code') + birth
+    return ~(names_present & ordered & _contains(number_line, line1))
+
+
+@rule('currency', "Currency Mismatch")
+def currency(frame):
+    return ~_eq(_col(frame, 'account_form.currency'), _col(frame, 'client_profile.currency'))
+
+
+@rule('domicile', "Country of Domicile Mismatch")
+def domicile(frame):
+    return ~_eq(_col(frame, 'account_form.country_of_domicile'), _col(frame, 'client_profile.country_of_domicile'))
+
+
+@rule('address', "Address Mismatch")
+def address(frame):
+    return ~_eq(_col(frame, 'account_form.address'), _col(frame, 'client_profile.address'))
+
+
+@rule('age', "Age less than 18")
+def age(frame):
+    birth = _dates(frame, 'client_profile.birth_date')
+    years = ((datetime.now() - timedelta(5)) - birth).dt.days // 365
+    # An unparseable birth date does not reject the client (check_age returned None)
+    return (years < 18).to_numpy()
+
+
+def _first(values, key):
+    return np.array([v[0].get(key) if isinstance(v, (list, np.ndarray)) and len(v) and isinstance(v[0], dict)
+                     else None for v in values], dtype=object)
+
+
+@rule('higher_education', "Graduation Years Inconsistent")
+def higher_education(frame):
+    higher = _col(frame, 'client_profile.higher_education')
+    has_higher = np.array([v is not None and len(v) > 0 for v in higher], dtype=bool)
+    grad = pd.to_numeric(pd.Series(_first(higher, 'graduation_year')), errors='coerce')
+    secondary = pd.to_numeric(pd.Series(_field(_col(frame, 'client_profile.secondary_school'), 'graduation_year')),
+                              errors='coerce')
+    birth_year = _dates(frame, 'client_profile.birth_date').dt.year
+    consistent = ((grad > secondary) & (grad - birth_year > 17)).to_numpy()
+    return has_higher & ~consistent
+
+
+@rule('employment_history', "Employment History Years Inconsistent")
+def employment_history(frame):
+    jobs = _col(frame, 'client_profile.employment_history')
+    has_jobs = np.array([v is not None and len(v) > 0 for v in jobs], dtype=bool)
+    start = pd.to_numeric(pd.Series(_first(jobs, 'start_year')), errors='coerce')
+    birth_year = _dates(frame, 'client_profile.birth_date').dt.year
+    return has_jobs & ~(start - birth_year > 16).to_numpy()
+
+
+@rule('gender_not_null', "Gender Not Specified")
+def gender_not_null(frame):
+    return _empty(_col(frame, 'passport.gender'))
+
+
+@rule('mandate_not_null', "Type of Mandate Not Specified")
+def mandate_not_null(frame):
+    return _empty(_col(frame, 'client_profile.type_of_mandate'))
+
+
+@rule('risk_profile_not_null', "Investment Risk Profile Not Specified")
+def risk_profile_not_null(frame):
+    return _empty(_col(frame, 'client_profile.investment_risk_profile'))
+
+
+@rule('properties_sum_to_aum', "Real Estate Value Mismatch")
+def properties_sum_to_aum(frame):
+    details = _col(frame, 'client_profile.real_estate_details')
+    owner, properties = _explode(details)
+    values = np.array(list(map(operator.itemgetter('property value'), properties)), dtype=np.float64)
+    totals = np.bincount(owner, weights=values, minlength=len(frame))
+    totals[np.fromiter(map(operator.is_, details, repeat(None)), dtype=bool, count=len(details))] = np.nan
+    declared = pd.to_numeric(pd.Series(_field(_col(frame, 'client_profile.aum'), 'real_estate_value')),
+                             errors='coerce').to_numpy()
+    return ~(totals == declared)
+
+
+@rule('secondary_school_name', "Secondary School Name Mismatch")
+def secondary_school_name(frame):
+    school = _clean(_field(_col(frame, 'client_profile.secondary_school'), 'name'))
+    education = _text(frame, 'client_description.Education Background')
+    return ~_contains(school, education)
+
+
+# check_grad_const never rejects in final_pipeline.ipynb (its result is discarded), so it is not registered
+
+
+@rule('higher_education_description', "University info Mismatch")
+def higher_education_description(frame):
+    higher = _col(frame, 'client_profile.higher_education')
+    education = _text(frame, 'client_description.Education Background')
+    # Explode the (university, year) pairs once and reduce back per client
+    owner, degrees = _explode(higher)
+    if not degrees:
+        return np.zeros(len(frame), dtype=bool)
+    unis = _clean(list(map(operator.itemgetter('university'), degrees)))
+    years = _array(list(map(str, map(operator.itemgetter('graduation_year'), degrees))))
+    text = education[owner]
+    bad = ~_contains(unis, text) | ~_contains(years, text)
+    return np.bincount(owner, weights=bad, minlength=len(frame)) > 0
+
+
+@rule('missing_inheritance_details', "Missing Inheritance Details")
+def missing_inheritance_details(frame):
+    inherited = pd.Series(_field(_col(frame, 'client_profile.aum'), 'inheritance')).fillna(0).to_numpy() != 0
+    return inherited & _any_empty(_col(frame, 'client_profile.inheritance_details'), none=False)
+
+
+@rule('missing_passport_number_profile', "Missing Passport Number in Client Profile")
+def missing_passport_number_profile(frame):
+    return _empty(_col(frame, 'client_profile.passport_number'))
+
+
+@rule('missing_phone_number_profile', "Missing Phone Number in Client Profile")
+def missing_phone_number_profile(frame):
+    return _empty(_col(frame, 'client_profile.phone_number'))
+
+
+@rule('missing_address_profile', "Missing Address Details in Client Profile")
+def missing_address_profile(frame):
+    return _any_empty(_col(frame, 'client_profile.address'))
+
+
+@rule('missing_employment_details', "Missing Employment History Details in Client Profile")
+def missing_employment_details(frame):
+    owner, jobs = _explode(_col(frame, 'client_profile.employment_history'))
+    empty = np.fromiter(map(operator.contains, map(dict.values, jobs), repeat('')), dtype=bool, count=len(jobs))
+    return np.bincount(owner, weights=empty, minlength=len(frame)) > 0
+
+
+@rule('missing_education_background', "Missing Education Background in Client Profile")
+def missing_education_background(frame):
+    return np.fromiter((v == '' for v in _col(frame, 'client_description.Education Background')),
+                       dtype=bool, count=len(frame))
+
+
+def _section_has_empty(frame, section, skip):
+    flagged = np.zeros(len(frame), dtype=bool)
+    for name in frame.columns:
+        if name.startswith(section + ".") and name[len(section) + 1:] not in skip:
+            flagged |= np.fromiter(map(operator.eq, _col(frame, name), repeat('')), dtype=bool, count=len(frame))
+    return flagged
+
+
+@rule('missing_passport_details', "Missing Passport Details")
+def missing_passport_details(frame):
+    return _section_has_empty(frame, 'passport', skip={'middle_name'})
+
+
+@rule('missing_account_form_details', "Missing Account Form Details")
+def missing_account_form_details(frame):
+    return _section_has_empty(frame, 'account_form', skip={'address', 'middle_name'})
+
+
+@rule('missing_address_account_form', "Missing Address Details in Account Form")
+def missing_address_account_form(frame):
+    return _any_empty(_col(frame, 'account_form.address'))
+
+
+def _inheritance_not_described(frame, key, clean):
+    details = _col(frame, 'client_profile.inheritance_details')
+    has_details = _is_dict(details) & np.fromiter(map(bool, details), dtype=bool, count=len(details))
+    values = _field(details, key)
+    values = _clean(values) if clean else _str(values)
+    wealth = _text(frame, 'client_description.Wealth Summary')
+    return has_details & ~_contains(values, wealth)
+
+
+@rule('inheritance_profession', 'Inheritance Information does not match Wealth Summary')
+def inheritance_profession(frame):
+    return _inheritance_not_described(frame, 'profession', clean=True)
+
+
+@rule('inheritance_year', 'Inheritance Information does not match Wealth Summary')
+def inheritance_year(frame):
+    return _inheritance_not_described(frame, 'inheritance year', clean=False)
+
+
+@rule('inheritance_relationship', 'Inheritance Information does not match Wealth Summary')
+def inheritance_relationship(frame):
+    return _inheritance_not_described(frame, 'relationship', clean=True)
+
+
+def _amount_not_described(frame, key):
+    amounts = _field(_col(frame, 'client_profile.aum'), key)
+    nonzero = pd.Series(amounts).fillna(0).to_numpy() != 0
+    currencies = _array([v.lower() for v in _strs(frame, 'client_profile.currency')])
+    text = _str(amounts) + ' ' + currencies
+    wealth = _text(frame, 'client_description.Wealth Summary')
+    return nonzero & ~_contains(text, wealth)
+
+
+@rule('inheritance_amount', 'Inheritance amount does not match Wealth Summary')
+def inheritance_amount(frame):
+    return _amount_not_described(frame, 'inheritance')
+
+
+@rule('savings_amount', 'Savings amount does not match Wealth Summary')
+def savings_amount(frame):
+    return _amount_not_described(frame, 'savings')
+
+
+# Not part of check_all_flags (pipeline_AS.ipynb / jad_flags_checker.ipynb only), so these are opt-in
+
+
+@rule('postal_code', "Invalid Postal Code", default=False)
+def postal_code(frame):
+    from flags_AS import validate_postal_code_for_client
+
+    countries = _col(frame, 'client_profile.country_of_domicile')
+    codes = _field(_col(frame, 'client_profile.address'), 'postal code', '')
+    keys = list(zip(countries, codes))
+    valid = {key: validate_postal_code_for_client(
+        {'client_profile': {'country_of_domicile': key[0] or '', 'address': {'postal code': key[1]}}})
+        for key in set(keys)}
+    return ~np.array([valid[key] for key in keys], dtype=bool)
+
+
+@rule('phone_country', "Invalid Phone Number", default=False)
+def phone_country(frame):
+    from phone_validation import validator
+
+    phones = _strs(frame, 'client_profile.phone_number')
+    countries = _strs(frame, 'client_profile.country_of_domicile')
+    return ~np.array(validator.check_batch(list(phones), list(countries)), dtype=bool)
+
+
+#### STATS AND SCHEDULING
+
+
+class RuleStats:
+    """
+    Running totals per rule: rows evaluated, seconds spent and rows rejected. They are
+    loaded from and saved back to a JSON file, so every run refines the rule ordering
+    used by decide().
+
+    Args:
+        path (str): JSON file holding the totals (None keeps them in memory only).
+    """
+
+    def __init__(self, path=STATS_PATH):
+        self.path = path
+        self.totals = {}
+        if path is not None and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.totals = json.load(f)
+
+    def record(self, name, rows, seconds, hits):
+        entry = self.totals.setdefault(name, {"rows": 0, "seconds": 0.0, "hits": 0})
+        entry["rows"] += int(rows)
+        entry["seconds"] += float(seconds)
+        entry["hits"] += int(hits)
+
+    def merge(self, totals):
+        """
+        Adds the totals of another run (e.g. RuleStats.totals of a worker).
+        """
+        for name, entry in totals.items():
+            self.record(name, entry["rows"], entry["seconds"], entry["hits"])
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.totals, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def cost(self, name):
+        # Seconds per row, or None for a rule never measured
+        entry = self.totals.get(name)
+        return entry["seconds"] / entry["rows"] if entry and entry["rows"] else None
+
+    def reject_rate(self, name):
+        entry = self.totals.get(name)
+        return entry["hits"] / entry["rows"] if entry and entry["rows"] else None
+
+    def schedule(self, names):
+        """
+        Orders rules by expected cost per rejected client (cost / reject rate), cheapest
+        first. Rules without measurements get the average cost and rate of the measured ones;
+        ties keep the registry order.
+        """
+        measured = [n for n in names if self.cost(n) is not None]
+        if not measured:
+            return list(names)
+        mean_cost = sum(self.cost(n) for n in measured) / len(measured)
+        mean_rate = sum(self.reject_rate(n) for n in measured) / len(measured)
+
+        def expected_cost(name):
+            cost = self.cost(name)
+            rate = self.reject_rate(name)
+            cost = mean_cost if cost is None else cost
+            rate = mean_rate if rate is None else rate
+            # A rule that never rejects is only worth running last
+            return cost / rate if rate > 0 else float("inf")
+
+        return sorted(names, key=expected_cost)
+
+    def report(self):
+        rows = []
+        for name, entry in self.totals.items():
+            rows.append({"rule": name, "rows": entry["rows"], "hits": entry["hits"],
+                         "reject_rate": self.reject_rate(name),
+                         "us_per_row": 1e6 * self.cost(name) if entry["rows"] else None})
+        return pd.DataFrame(rows).sort_values("us_per_row", ascending=False)
+
+
+def _complete(frame):
+    present = frame['_present'].to_numpy(dtype=bool)
+    return present & np.array([m is None for m in frame['_missing_section'].to_numpy(dtype=object)], dtype=bool)
+
+
+def _run(rule_, frame, stats, alive=None):
+    start = time.perf_counter()
+    fired = np.asarray(rule_.func(frame), dtype=bool)
+    if stats is not None:
+        # Only the clients still alive count towards the rows and the hit rate
+        if alive is None:
+            rows, hits = len(frame), fired.sum()
+        else:
+            rows, hits = alive.sum(), (fired & alive).sum()
+        stats.record(rule_.name, rows, time.perf_counter() - start, hits)
+    return fired
+
+
+#### EVALUATION
+
+
+def evaluate(frame, rules=None, stats=None):
+    """
+    Explain mode: runs every rule as one column operation over the whole batch.
+
+    Args:
+        frame (pd.DataFrame): Frame from client_frame or store_frame.
+        rules (list): Rule names to run, in reporting order (default: default_rules()).
+        stats (RuleStats): Optional totals to add this run's timings and hits to.
+
+    Returns:
+        tuple: (flags, reasons) where flags is a boolean DataFrame (clients x rules, True
+            where the rule rejects the client; missing clients and clients missing a
+            required section only fail 'missing_docs') and reasons maps every rule
+            name, plus 'missing_docs', to its message.
+    """
+    names = default_rules() if rules is None else list(rules)
+    complete = _complete(frame)
+
+    flags = np.zeros((len(frame), len(names) + 1), dtype=bool)
+    flags[:, 0] = ~complete
+    sub = frame[complete]
+    for j, name in enumerate(names, start=1):
+        if len(sub):
+            flags[complete, j] = _run(RULES[name], sub, stats)
+
+    reasons = {'missing_docs': "Missing docs"}
+    reasons.update({name: RULES[name].reason for name in names})
+    return pd.DataFrame(flags, columns=['missing_docs'] + names, index=frame.index), reasons
+
+
+def decide(frame, rules=None, stats=None, reslice=0.75, order=None):
+    """
+    Decide mode: only answers Accept/Reject. Rules run cheapest-per-rejection first (as
+    ordered by stats) and each one only sees the clients no earlier rule has rejected.
+    The rule reported for a rejected client does not depend on that ordering: it is the
+    first of rules that rejects the client, as in explain mode.
+
+    Args:
+        frame (pd.DataFrame): Frame from client_frame or store_frame.
+        rules (list): Rule names to run, in reporting order (default: default_rules()).
+        stats (RuleStats): Totals used for the ordering and updated with this run.
+        reslice (float): The surviving rows are copied into a smaller frame once they
+            fall below this fraction of the current one.
+        order (list): Order to run the rules in (default: stats.schedule(rules)), e.g.
+            one scheduled once for every batch of a run.
+
+    Returns:
+        tuple: (accepted, rejected_by) where accepted is a boolean array and rejected_by
+            holds the name of the rule that rejected each client (None when accepted).
+    """
+    names = default_rules() if rules is None else list(rules)
+    if order is None:
+        order = stats.schedule(names) if stats is not None else names
+
+    complete = _complete(frame)
+    rejected_by = np.where(complete, None, 'missing_docs').astype(object)
+    # sub holds the rows of frame at positions sub_rows; sub_alive marks those not yet rejected
+    sub_rows = np.flatnonzero(complete)
+    sub = frame.iloc[sub_rows]
+    sub_alive = np.ones(len(sub_rows), dtype=bool)
+    for name in order:
+        alive_count = sub_alive.sum()
+        if alive_count == 0:
+            break
+        if alive_count < reslice * len(sub_rows):
+            sub_rows, sub = sub_rows[sub_alive], sub[sub_alive]
+            sub_alive = np.ones(len(sub_rows), dtype=bool)
+        fired = _run(RULES[name], sub, stats, sub_alive)
+        rejected_by[sub_rows[fired & sub_alive]] = name
+        sub_alive &= ~fired
+    _report_first(frame, names, order, rejected_by)
+    return np.array([r is None for r in rejected_by], dtype=bool), rejected_by
+
+
+def _report_first(frame, names, order, rejected_by):
+    # A client rejected by rule r passed every rule run before r, but a rule run after r
+    # may come first in names and reject it too: run those on the rejected clients only
+    # and report the first one that fires
+    position = {name: i for i, name in enumerate(names)}
+    ran = {name: i for i, name in enumerate(order)}
+    rows = np.flatnonzero([r is not None and r != 'missing_docs' for r in rejected_by])
+    if not len(rows):
+        return
+    first_ran = np.array([ran[r] for r in rejected_by[rows]])
+    for name in names:
+        reported = np.array([position[r] for r in rejected_by[rows]])
+        candidates = (reported > position[name]) & (first_ran < ran[name])
+        if candidates.any():
+            fired = _run(RULES[name], frame.iloc[rows[candidates]], None)
+            rejected_by[rows[candidates][fired]] = name
+
+
+def reason_lists(flags, reasons, frame=None):
+    """
+    Turns a flag matrix into check_all_flags-style per-client lists of error messages.
+    A present client missing a required section gets 'Missing <section> information'.
+    """
+    columns = list(flags.columns)
+    messages = [reasons[c] for c in columns]
+    missing_section = frame['_missing_section'].to_numpy(dtype=object) if frame is not None else None
+    present = frame['_present'].to_numpy(dtype=bool) if frame is not None else None
+    matrix = flags.to_numpy()
+    out = [[] for _ in range(len(matrix))]
+    # Row-major nonzero: every client's messages come out in column order
+    for i, j in zip(*(a.tolist() for a in np.nonzero(matrix))):
+        out[i].append(messages[j])
+    if frame is not None:
+        for i in np.flatnonzero(matrix[:, 0] & present).tolist():
+            out[i] = [f"Missing {missing_section[i]} information"]
+    return out
+
+
+def flag_clients(clients, rules=None, mode="explain", stats_path=STATS_PATH):
+    """
+    Vectorized drop-in for flag_clients in final_pipeline.ipynb.
+
+    Args:
+        clients: Client dicts (list, LazyClients, ...), or a path to a Parquet store.
+        rules (list): Rule names to run (default: default_rules()).
+        mode (str): 'explain' runs every rule and returns every error message;
+            'decide' stops once a rule rejects a client and returns one message only:
+            that of the first rule (in rules order) that rejects it, whatever order the
+            rules ran in.
+        stats_path (str): Rule statistics file read for the ordering and updated after
+            the run (None to neither read nor write it).
+
+    Returns:
+        tuple: (flags_preds, client_errors) as check_all_flags would produce them.
+    """
+    if mode not in ("explain", "decide"):
+        raise ValueError(f"Unknown mode: {mode}")
+    frame = store_frame(clients) if isinstance(clients, str) else client_frame(clients)
+    stats = RuleStats(stats_path)
+    result = flag_frame(frame, rules, mode, stats)
+    stats.save()
+    return result
+
+
+def flag_frame(frame, rules=None, mode="explain", stats=None, order=None):
+    """
+    flag_clients over an already built frame (client_frame or store_frame); stats is
+    updated but not saved. In decide mode, order is the order to run the rules in (see
+    decide).
+
+    Returns:
+        tuple: (flags_preds, client_errors).
+    """
+    if mode == "decide":
+        accepted, rejected_by = decide(frame, rules, stats, order=order)
+        missing_section = frame['_missing_section'].to_numpy(dtype=object)
+        client_errors = []
+        for i, name in enumerate(rejected_by):
+            if name is None:
+                client_errors.append([])
+            elif name == 'missing_docs' and missing_section[i] is not None:
+                client_errors.append([f"Missing {missing_section[i]} information"])
+            else:
+                client_errors.append(["Missing docs" if name == 'missing_docs' else RULES[name].reason])
+        return accepted.tolist(), client_errors
+    flags, reasons = evaluate(frame, rules, stats)
+    flags_preds = (~flags.to_numpy().any(axis=1)).tolist()
+    return flags_preds, reason_lists(flags, reasons, frame)
+
+# USAGE: flags_preds, client_errors = flag_clients(load_clients("clients_eval.pkl"))
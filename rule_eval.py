@@ -0,0 +1,115 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from rule_engine import RuleStats, client_frame, default_rules, evaluate, store_frame
+
+
+def _frame(clients):
+    if isinstance(clients, str) and clients.endswith(".parquet"):
+        return store_frame(clients)
+    if isinstance(clients, str):
+        from load_updated_data import load_clients
+        clients = load_clients(clients)
+    return client_frame(clients)
+
+
+def _reject_labels(frame, labels):
+    # True for Reject, False for Accept, None for unlabelled clients
+    if labels is None:
+        labels = frame['label.label'] if 'label.label' in frame else [None] * len(frame)
+    out = []
+    for label in labels:
+        if isinstance(label, (bool, np.bool_)):
+            out.append(not label)  # flags_preds convention: True is Accept
+        elif label in ('Reject', 'Accept'):
+            out.append(label == 'Reject')
+        else:
+            out.append(None)
+    return np.array(out, dtype=object)
+
+
+def _ratio(num, den):
+    return num / den if den else np.nan
+
+
+def evaluate_rules(clients, rules=None, labels=None):
+    """
+    Scores rules against labelled clients: all of them are run once over the whole
+    batch (rule_engine.evaluate) and every count comes from the resulting flag matrix,
+    instead of one loop and one confusion_matrix per rule as in flags_checker.ipynb.
+
+    A rule 'fires' on a client it would reject; Reject is the positive class.
+
+    Args:
+        clients: Labelled client dicts (clients.pkl, remaining_clients.pkl), a path to a
+            client pickle/JSON Lines store, or a Parquet store.
+        rules (list): Rule names (default: default_rules(); add the opt-in ones, e.g.
+            list(RULES), to score them too).
+        labels (list): 'Accept'/'Reject' or flags_preds-style booleans per client
+            (default: each client's label section). Unlabelled clients are skipped.
+
+    Returns:
+        pd.DataFrame: One row per rule, plus 'missing_docs' and '_all' (the rules
+            together), with columns reason, fired, tp, fp, fn, tn, precision, recall,
+            only_tp / only_fp (rejects / accepts no other rule fires on), gain_recall
+            (recall lost without the rule), gain_precision (precision of '_all' minus
+            that without the rule), seconds and us_per_row.
+    """
+    names = default_rules() if rules is None else list(rules)
+    start = time.perf_counter()
+    frame = _frame(clients)
+    reject = _reject_labels(frame, labels)
+    labelled = np.array([r is not None for r in reject], dtype=bool)
+    if not labelled.any():
+        raise ValueError("No labelled clients: pass labels or clients with a label section")
+
+    stats = RuleStats(None)
+    flags, reasons = evaluate(frame, names, stats)
+    fired = flags.to_numpy()[labelled]
+    reject = reject[labelled].astype(bool)
+    accept = ~reject
+
+    tp = (fired & reject[:, None]).sum(axis=0)
+    fp = (fired & accept[:, None]).sum(axis=0)
+    fn = reject.sum() - tp
+    tn = accept.sum() - fp
+    # Clients only this rule fires on: what the other rules together would miss without it
+    alone = fired & (fired.sum(axis=1) == 1)[:, None]
+    only_tp = (alone & reject[:, None]).sum(axis=0)
+    only_fp = (alone & accept[:, None]).sum(axis=0)
+
+    any_fired = fired.any(axis=1)
+    all_tp, all_fp = int((any_fired & reject).sum()), int((any_fired & accept).sum())
+    all_precision = _ratio(all_tp, all_tp + all_fp)
+    without_precision = np.array([_ratio(all_tp - a, all_tp - a + all_fp - b) for a, b in zip(only_tp, only_fp)])
+
+    columns = list(flags.columns)
+    seconds = [stats.totals.get(name, {}).get("seconds", 0.0) for name in columns]
+    rows = [stats.totals.get(name, {}).get("rows", 0) for name in columns]
+    table = pd.DataFrame({
+        "reason": [reasons[name] for name in columns],
+        "fired": fired.sum(axis=0),
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": [_ratio(a, a + b) for a, b in zip(tp, fp)],
+        "recall": tp / reject.sum() if reject.any() else np.nan,
+        "only_tp": only_tp, "only_fp": only_fp,
+        "gain_recall": only_tp / reject.sum() if reject.any() else np.nan,
+        "gain_precision": all_precision - without_precision,
+        "seconds": seconds,
+        "us_per_row": [1e6 * s / r if r else np.nan for s, r in zip(seconds, rows)],
+    }, index=pd.Index(columns, name="rule"))
+    table.loc["_all"] = {
+        "reason": None, "fired": int(any_fired.sum()), "tp": all_tp, "fp": all_fp,
+        "fn": int(reject.sum()) - all_tp, "tn": int(accept.sum()) - all_fp,
+        "precision": all_precision, "recall": _ratio(all_tp, reject.sum()),
+        "only_tp": np.nan, "only_fp": np.nan, "gain_recall": np.nan, "gain_precision": np.nan,
+        "seconds": sum(seconds), "us_per_row": np.nan,
+    }
+    table = table.astype({"only_tp": "Int64", "only_fp": "Int64"})
+    print(f"Evaluated {len(names)} rules on {labelled.sum()} labelled clients "
+          f"({reject.sum()} Reject) in {time.perf_counter() - start:.2f}s")
+    return table
+
+# USAGE: table = evaluate_rules("clients.pkl"); table.sort_values("gain_recall", ascending=False)
@@ -1,36 +1,234 @@
+import io
 import os
-import zipfile
+import re
 import json
+import time
+import hashlib
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+ZIP_PATTERN = re.compile(r"^client_(\d+)\.zip$")
+
+
+def read_client_zip(zip_path):
+    """
+    Decodes every JSON member of a client zip into one dict.
+
+    Args:
+        zip_path (str or file-like): Path to a client_{i}.zip file, or its bytes wrapped in BytesIO.
+
+    Returns:
+        dict: Section name (file name without extension) -> decoded JSON.
+    """
+    client_data = {}
+    with zipfile.ZipFile(zip_path, "r") as z:
+        for file in z.namelist():
+            key = os.path.splitext(os.path.basename(file))[0]
+            with z.open(file) as f:
+                client_data[key] = json.load(f)
+    return client_data
 
-# Path to your folder containing client0.zip to client9999.zip
-zip_dir = "data/eval"  # <-- CHANGE THIS TO YOUR FOLDER PATH
 
-# Initialize matrix with 10,000 client entries
-clients = [None] * 1000
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Returns the sha256 hex digest of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-for i in range(1000):
-    zip_filename = f"client_{i}.zip"
-    zip_path = zip_dir+"/"+zip_filename
-    print(zip_path)
-    if not os.path.exists(zip_path):
-        print(f"Missing file: {zip_filename}")
-        continue
 
+def _decode_client(zip_path):
+    # Runs in the worker: the zip is read once for both the hash and the decode, and the
+    # record is serialised there so the parent only writes text
     try:
-        with zipfile.ZipFile(zip_path, "r") as z:
-            client_data = {}
-            for file in z.namelist():
-                key = os.path.splitext(os.path.basename(file))[0]
-                with z.open(file) as f:
-                    client_data[key] = json.load(f)
-            clients[i] = client_data
+        with open(zip_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return None, f"{type(e).__name__}: {e}", None
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        return json.dumps(read_client_zip(io.BytesIO(data)), ensure_ascii=False), None, digest
     except Exception as e:
-        print(f"Error processing {zip_filename}: {e}")
+        return None, f"{type(e).__name__}: {e}", digest
+
+
+def discover_clients(zip_dir):
+    """
+    Maps client index -> zip file name for every client_{i}.zip in zip_dir.
+    """
+    found = {}
+    for name in os.listdir(zip_dir):
+        match = ZIP_PATTERN.match(name)
+        if match:
+            found[int(match.group(1))] = name
+    return found
+
+
+def load_manifest(manifest_path):
+    """
+    Returns the manifest written by a previous ingestion, or None if there is none.
+    """
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ingest_clients(zip_dir, out_path, manifest_path=None, num_clients=None, workers=None,
+                   chunksize=32, report_every=1000, incremental=False):
+    """
+    Decodes the client zips of a directory with a process pool and streams them to disk.
+
+    The store is a JSON Lines file with one line per client index (line i is client_{i}),
+    so the index order is kept; a missing or corrupt zip is written as `null`. The manifest
+    records the sha256 of every zip so that later runs can be incremental.
+
+    Args:
+        zip_dir (str): Folder holding client_{i}.zip files.
+        out_path (str): Destination JSON Lines file (e.g. 'clients_eval.jsonl').
+        manifest_path (str): Where to record hashes, missing/corrupt zips and throughput.
+            Defaults to out_path with a '.manifest.json' suffix.
+        num_clients (int): Number of client indices to ingest. Defaults to the
+            highest index found in zip_dir + 1.
+        workers (int): Size of the process pool (default: os.cpu_count()).
+        chunksize (int): Zips handed to a worker at a time.
+        report_every (int): Print progress every this many clients.
+        incremental (bool): Only decode zips that are new or whose hash changed since the
+            previous manifest; the other lines are copied from the existing store.
+
+    Returns:
+        dict: The manifest that was written. Its 'changed' entry lists the client
+            indices that were (re-)decoded or removed in this run.
+    """
+    found = discover_clients(zip_dir)
+    if num_clients is None:
+        num_clients = max(found) + 1 if found else 0
+    if manifest_path is None:
+        manifest_path = os.path.splitext(out_path)[0] + ".manifest.json"
+
+    previous = load_manifest(manifest_path) if incremental and os.path.exists(out_path) else None
+    if previous is not None and (previous.get("files") is None or previous.get("num_clients") is None):
+        # Manifests of older versions have no per-zip hashes: decode everything again
+        print(f"{manifest_path} has no zip hashes; re-decoding every client")
+        previous = None
+    old_files = previous["files"] if previous else {}
+
+    missing = [i for i in range(num_clients) if i not in found]
+    indices = [i for i in range(num_clients) if i in found]
+    paths = {i: os.path.join(zip_dir, found[i]) for i in indices}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if previous:
+            # Hashing is far cheaper than decoding, so hash everything and decode only what changed
+            digests = dict(zip(indices, pool.map(hash_file, [paths[i] for i in indices], chunksize=chunksize)))
+            to_decode = [i for i in indices if old_files.get(str(i), {}).get("sha256") != digests[i]]
+        else:
+            to_decode = indices
+        decode_set = set(to_decode)
+        if previous:
+            # Re-decoded zips, zips that disappeared, and new indices that have no zip
+            removed = {int(i) for i in old_files if int(i) not in found or int(i) >= num_clients}
+            new_missing = {i for i in missing if i >= previous["num_clients"]}
+            changed = sorted(decode_set | removed | new_missing)
+        else:
+            changed = list(range(num_clients))
+
+        files, corrupt = {}, {}
+        written = 0
+        tmp_path = out_path + ".tmp"
+        old_lines = open(out_path, "r", encoding="utf-8") if previous else None
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as out:
+                # map() yields in submission order, so lines can be written as soon as they arrive
+                results = iter(pool.map(_decode_client, [paths[i] for i in to_decode], chunksize=chunksize))
+                for i in range(num_clients):
+                    old_line = old_lines.readline() if old_lines else ""
+                    if i in decode_set:
+                        line, error, digest = next(results)
+                        files[str(i)] = {"name": found[i], "sha256": digest, "error": error}
+                        if error is not None:
+                            corrupt[i] = error
+                            out.write("null\n")
+                            continue
+                        out.write(line + "\n")
+                        written += 1
+                    elif i in found:
+                        # Unchanged zip: keep the already decoded record (or its recorded error)
+                        files[str(i)] = old_files[str(i)]
+                        out.write(old_line)
+                        if files[str(i)]["error"] is not None:
+                            corrupt[i] = files[str(i)]["error"]
+                        else:
+                            written += 1
+                    else:
+                        out.write("null\n")
+                    if report_every and (i + 1) % report_every == 0:
+                        elapsed = time.perf_counter() - start
+                        print(f"{i + 1}/{num_clients} clients, {(i + 1) / elapsed:.1f} clients/s")
+        finally:
+            if old_lines:
+                old_lines.close()
+    os.replace(tmp_path, out_path)
+    elapsed = time.perf_counter() - start
+
+    manifest = {
+        "zip_dir": os.path.abspath(zip_dir),
+        "store": os.path.abspath(out_path),
+        "num_clients": num_clients,
+        "written": written,
+        "decoded": len(to_decode),
+        "changed": changed,
+        "missing": missing,
+        "corrupt": {str(i): error for i, error in corrupt.items()},
+        "elapsed_s": round(elapsed, 3),
+        "clients_per_s": round(num_clients / elapsed, 1) if elapsed > 0 else None,
+        "files": files,
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+    print(f"Ingested {written}/{num_clients} clients ({len(to_decode)} decoded, {len(changed)} changed) "
+          f"in {elapsed:.2f}s ({manifest['clients_per_s']} clients/s), "
+          f"{len(missing)} missing, {len(corrupt)} corrupt -> {manifest_path}")
+    return manifest
+
+
+def iter_store(store_path):
+    """
+    Yields the clients of a JSON Lines store in index order (None for missing clients).
+    """
+    with open(store_path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode client_{i}.zip files into a JSON Lines store.")
+    parser.add_argument("zip_dir", help="folder containing client_{i}.zip files (e.g. data/eval)")
+    parser.add_argument("out", help="output JSON Lines store (e.g. clients_eval.jsonl)")
+    parser.add_argument("--manifest", default=None, help="manifest path (default: <out>.manifest.json)")
+    parser.add_argument("--num-clients", type=int, default=None,
+                        help="number of client indices (default: highest index found + 1)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only decode zips added or changed since the previous manifest")
+    parser.add_argument("--pickle", default=None,
+                        help="also write the legacy list-of-dicts pickle (e.g. clients_eval.pkl)")
+    args = parser.parse_args(argv)
 
-# Now `clients[0]` to `clients[9999]` each hold a dict of JSONs for that client
+    ingest_clients(args.zip_dir, args.out, manifest_path=args.manifest,
+                   num_clients=args.num_clients, workers=args.workers, incremental=args.incremental)
 
-import pickle
-with open("clients_eval.pkl", "wb") as f:
-    pickle.dump(clients, f)
+    if args.pickle:
+        import pickle
+        with open(args.pickle, "wb") as f:
+            pickle.dump(list(iter_store(args.out)), f)
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import queue
+import threading
+from contextlib import ExitStack
+
+import numpy as np
+
+from rule_engine import RuleStats, STATS_PATH, client_frame, default_rules, flag_frame
+
+# Clients per batch flowing between the stages
+BATCH_SIZE = 256
+
+# Batches a stage may have waiting for the next one; a full queue blocks the stage before
+# it, so a slow LLM stage slows the reader down instead of letting batches pile up
+QUEUE_SIZE = 4
+
+_DONE = object()
+
+
+def iter_source(source):
+    """
+    Yields (client index, client dict or None) from a folder of client_{i}.zip files, a
+    JSON Lines store (save_data.py), a Parquet store (client_store.py) or any iterable of
+    client dicts, one client at a time.
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        from save_data import discover_clients, read_client_zip
+        found = discover_clients(source)
+        for i in range(max(found) + 1 if found else 0):
+            yield i, read_client_zip(os.path.join(source, found[i])) if i in found else None
+    elif isinstance(source, str) and source.endswith(".parquet"):
+        from client_store import iter_clients
+        yield from enumerate(iter_clients(source))
+    elif isinstance(source, str):
+        from save_data import iter_store
+        yield from enumerate(iter_store(source))
+    else:
+        yield from enumerate(source)
+
+
+class _Stage(threading.Thread):
+    # Takes batches from inbox (or source), hands fn(batch) to outbox; counts its busy
+    # and blocked time
+
+    def __init__(self, name, fn, inbox, outbox, stop, source=None):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.source = source
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop = stop
+        self.error = None
+        self.batches = 0
+        self.busy_s = 0.0
+        self.blocked_s = 0.0
+
+    def _put(self, item):
+        start = time.perf_counter()
+        while not self.stop.is_set():
+            try:
+                self.outbox.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.blocked_s += time.perf_counter() - start
+
+    def _get(self):
+        while not self.stop.is_set():
+            try:
+                return self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def run(self):
+        try:
+            batches = iter(self._get, _DONE) if self.source is None else iter(self.source)
+            while not self.stop.is_set():
+                start = time.perf_counter()
+                batch = next(batches, _DONE)
+                if batch is _DONE:
+                    break
+                if self.source is not None:
+                    self.busy_s += time.perf_counter() - start  # reading is the reader's work
+                start = time.perf_counter()
+                result = self.fn(batch) if self.fn is not None else batch
+                self.busy_s += time.perf_counter() - start
+                self.batches += 1
+                if self.outbox is not None:
+                    self._put(result)
+        except BaseException as e:
+            self.error = e
+            self.stop.set()
+        finally:
+            if self.outbox is not None:
+                self._put(_DONE)
+
+
+def run_streaming(source, solution_path="client_labels.csv", errors_path="client_errors.jsonl", rules=None,
+                  mode="explain", runner=None, checks=None, prefilter=False, batch_size=BATCH_SIZE,
+                  queue_size=QUEUE_SIZE, checkpoint_path=None, resume=False, stats_path=STATS_PATH):
+    """
+    Streams clients from source through the rules, the optional LLM checks and the
+    writers, batch_size clients at a time, with at most queue_size batches waiting
+    between two stages, so memory does not grow with the number of clients.
+
+    Args:
+        source: Zip folder, JSON Lines or Parquet store, or iterable of clients (see iter_source).
+        solution_path (str): 'client_{i};Accept|Reject' csv, written in client order.
+        errors_path (str): JSON Lines file with one list of error messages per client,
+            or the clients' reason masks for a .parquet path (see reason_codes).
+        rules (list): Rule names (default: rule_engine.default_rules()).
+        mode (str): 'explain' or 'decide' (see rule_engine.flag_clients).
+        runner (LLMRunner): Runs the LLM checks on the clients the rules accepted (None
+            skips the LLM stage).
+        checks (list): LLM checks to run (default: llm_checks.DEFAULT_CHECKS).
+        prefilter (bool): Let the cheap text matchers answer first (see infer_llm).
+        batch_size (int): Clients per batch.
+        queue_size (int): Batches buffered between two stages.
+        checkpoint_path (str): If given, each batch's decisions are appended to this
+            CheckpointLog instead of the output files, which are written from the log
+            once every client is decided.
+        resume (bool): Skip the clients already decided in checkpoint_path. The output
+            is byte-identical to that of an uninterrupted run.
+        stats_path (str): Rule statistics file the decide-mode order is read from (None
+            keeps the rules order).
+
+    Returns:
+        dict: Clients written, clients taken from the checkpoint and, per stage, batches
+            handled, seconds busy and seconds blocked on a full queue.
+    """
+    from reason_codes import encode_errors, save_reasons
+
+    # Scheduled once, as in flag_clients_parallel, so every batch runs the rules in the same order
+    names = default_rules() if rules is None else list(rules)
+    order = RuleStats(stats_path).schedule(names) if mode == "decide" else None
+
+    log = None
+    if checkpoint_path is not None:
+        from checkpoint import CheckpointLog
+        from llm_checks import DEFAULT_CHECKS
+        run = {"source": source if isinstance(source, str) else None, "mode": mode,
+               "rules": names, "order": order,
+               "model": runner.model if runner is not None else None,
+               "checks": list(checks or DEFAULT_CHECKS) if runner is not None else None, "prefilter": prefilter}
+        log = CheckpointLog(checkpoint_path, run, resume)
+    resumed = len(log) if log is not None else 0
+    seen = [0]
+
+    def read_batches():
+        batch = []
+        for item in iter_source(source):
+            seen[0] = item[0] + 1
+            if log is not None and item[0] in log:
+                continue
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def flag(batch):
+        indices = [i for i, _ in batch]
+        clients = [client for _, client in batch]
+        flags_preds, client_errors = flag_frame(client_frame(clients), names, mode, order=order)
+        return indices, clients, flags_preds, client_errors
+
+    def ask_llm(flagged):
+        from llm_checks import DEFAULT_CHECKS, infer_llm
+        indices, clients, flags_preds, client_errors = flagged
+        flags_preds, client_errors = infer_llm(clients, flags_preds, client_errors, runner,
+                                               checks or DEFAULT_CHECKS, prefilter)
+        return indices, clients, flags_preds, client_errors
+
+    masks = []
+    stop = threading.Event()
+    boxes = [queue.Queue(maxsize=queue_size) for _ in range(3 if runner is not None else 2)]
+    written = [0]
+    with ExitStack() as files:
+        if log is not None:
+            files.callback(log.close)
+
+            def write(flagged):
+                indices, _, flags_preds, client_errors = flagged
+                log.append(indices, flags_preds, client_errors)
+                written[0] += len(indices)
+        else:
+            solution = files.enter_context(open(solution_path, "w", encoding="utf-8"))
+            # Masks are 8 bytes a client and are saved at the end; messages are written as they come
+            errors = None if errors_path.endswith(".parquet") else \
+                files.enter_context(open(errors_path, "w", encoding="utf-8"))
+
+            def write(flagged):
+                indices, _, flags_preds, client_errors = flagged
+                for i, flag_ in zip(indices, flags_preds):
+                    solution.write(f"client_{i};{'Accept' if flag_ else 'Reject'}\n")
+                if errors is None:
+                    masks.append(encode_errors(client_errors))
+                else:
+                    for messages in client_errors:
+                        errors.write(json.dumps(messages, ensure_ascii=False) + "\n")
+                written[0] += len(indices)
+
+        stages = [_Stage("reader", None, None, boxes[0], stop, source=read_batches()),
+                  _Stage("rules", flag, boxes[0], boxes[1], stop)]
+        if runner is not None:
+            stages.append(_Stage("llm", ask_llm, boxes[1], boxes[2], stop))
+        stages.append(_Stage("writer", write, boxes[-1], None, stop))
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+
+    for stage in stages:
+        if stage.error is not None:
+            raise stage.error
+    if log is not None:
+        log.compact(seen[0], solution_path, errors_path)
+    elif errors_path.endswith(".parquet"):
+        save_reasons(np.concatenate(masks) if masks else np.zeros(0, dtype=np.uint64), errors_path)
+    report = {"clients": written[0] + resumed, "resumed": resumed}
+    for stage in stages:
+        report[stage.name] = {"batches": stage.batches, "busy_s": round(stage.busy_s, 3),
+                              "blocked_s": round(stage.blocked_s, 3)}
+    return report
+
+
+def read_errors(errors_path="client_errors.jsonl"):
+    """
+    Loads an errors file written by run_streaming back into per-client error lists.
+    """
+    from reason_codes import read_errors as read
+    return read(errors_path)
+
+# USAGE: run_streaming("data/eval", runner=LLMRunner("phi:latest"), prefilter=True, checkpoint_path="run_checkpoint.jsonl", resume=True); client_errors = read_errors()
@@ -0,0 +1,14 @@
+import pytest
+
+from batch_flags import flag_clients_parallel
+from rule_engine import flag_clients
+
+
+@pytest.mark.parametrize("mode", ["explain", "decide"])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_matches_serial(eval_clients, mode, workers):
+    serial = flag_clients(eval_clients, mode=mode, stats_path=None)
+    parallel = flag_clients_parallel(eval_clients, mode=mode, workers=workers, chunk_size=96, stats_path=None)
+    assert parallel == serial
+
+# USAGE: python -m pytest -q test_batch_flags.py
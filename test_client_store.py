@@ -0,0 +1,77 @@
+import copy
+
+import pyarrow.parquet as pq
+
+from client_store import iter_clients, read_columns, store_layout, write_store
+from rule_engine import flag_clients
+
+
+def test_round_trip(eval_clients, tmp_path):
+    path = str(tmp_path / "clients.parquet")
+    assert write_store(eval_clients, path, row_group_size=128) == len(eval_clients)
+    assert list(iter_clients(path)) == eval_clients
+
+
+def test_row_ranges(eval_clients, tmp_path):
+    path = str(tmp_path / "clients.parquet")
+    write_store(eval_clients, path, row_group_size=128)
+    assert list(iter_clients(path, rows=range(100, 300))) == eval_clients[100:300]
+
+    df = read_columns(path, ['client_profile.aum.savings'], rows=range(250, 260))
+    expected = [c['client_profile']['aum']['savings'] if c is not None else None for c in eval_clients[250:260]]
+    assert df['client_profile.aum.savings'].tolist() == expected
+    assert df['_present'].tolist() == [c is not None for c in eval_clients[250:260]]
+
+
+def test_row_range_reads_overlapping_groups(eval_clients, tmp_path, monkeypatch):
+    path = str(tmp_path / "clients.parquet")
+    write_store(eval_clients, path, row_group_size=128)
+    read = []
+    iter_batches = pq.ParquetFile.iter_batches
+
+    def spy(self, *args, **kwargs):
+        read.append(kwargs.get("row_groups"))
+        return iter_batches(self, *args, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, "iter_batches", spy)
+    assert list(iter_clients(path, rows=range(700, 800), batch_size=50)) == eval_clients[700:800]
+    assert read == [[5, 6]]
+    assert list(iter_clients(path, rows=range(2000, 3000))) == []
+
+
+def _types(value):
+    # The value with every leaf replaced by its type, to tell 140000 from 140000.0
+    if isinstance(value, dict):
+        return {k: _types(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_types(v) for v in value]
+    return type(value)
+
+
+def test_mixed_int_float_round_trip(eval_clients, tmp_path):
+    # One fractional amount must not turn the other clients' whole amounts into floats
+    clients = copy.deepcopy(eval_clients[:200])
+    next(c for c in clients if c is not None)['client_profile']['aum']['savings'] = 1234.5
+    path = str(tmp_path / "clients.parquet")
+    write_store(clients, path, row_group_size=64)
+
+    stored = list(iter_clients(path))
+    assert stored == clients
+    assert _types(stored) == _types(clients)
+    for mode in ("explain", "decide"):
+        assert flag_clients(path, mode=mode, stats_path=None) == flag_clients(clients, mode=mode, stats_path=None)
+
+
+def test_mixed_types_round_trip(eval_clients, tmp_path):
+    # A field that is an int for one client and a string for another is kept as JSON text
+    clients = copy.deepcopy([c for c in eval_clients if c is not None][:3])
+    clients[0]['client_profile']['aum']['savings'] = "unknown"
+    clients[1]['client_profile']['aum']['savings'] = 300000.5
+    path = str(tmp_path / "clients.parquet")
+    write_store(clients, path)
+
+    assert list(iter_clients(path)) == clients
+    layout = {c['name']: c for c in store_layout(path)}
+    assert layout['client_profile.aum.savings']['json']
+
+# USAGE: python -m pytest -q test_client_store.py
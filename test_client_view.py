@@ -0,0 +1,86 @@
+import copy
+import json
+import os
+import pickle
+
+import pytest
+
+from client_view import LazyClients
+from load_updated_data import load_clients
+
+
+def _write_store(path, clients):
+    with open(path, "w", encoding="utf-8") as f:
+        for client in clients:
+            f.write(json.dumps(client, ensure_ascii=False) + "\n")
+
+
+@pytest.fixture
+def store(eval_clients, tmp_path):
+    path = str(tmp_path / "clients.jsonl")
+    _write_store(path, eval_clients)
+    return path
+
+
+def test_indexing(eval_clients, store):
+    clients = LazyClients(store)
+    assert len(clients) == len(eval_clients)
+    assert clients[0] == eval_clients[0]
+    assert clients[-1] == eval_clients[-1]
+    assert clients[10:20] == eval_clients[10:20]
+    assert clients[::-97] == eval_clients[::-97]
+    assert list(clients) == eval_clients
+    with pytest.raises(IndexError):
+        clients[len(eval_clients)]
+    with pytest.raises(IndexError):
+        clients[-len(eval_clients) - 1]
+    clients.close()
+
+
+def test_normalizes_passport_number(eval_clients, tmp_path):
+    client = copy.deepcopy(next(c for c in eval_clients if c is not None))
+    number = client['client_profile']['passport_number']
+    client['client_profile']['passport_number'] = [number, "XX0000000"]
+    path = str(tmp_path / "clients.jsonl")
+    _write_store(path, [client, None])
+    assert LazyClients(path)[0]['client_profile']['passport_number'] == number
+    assert LazyClients(path, normalize=None)[0]['client_profile']['passport_number'] == [number, "XX0000000"]
+    assert load_clients(path)[1] is None
+
+
+def test_pickles_as_path(eval_clients, store):
+    clients = pickle.loads(pickle.dumps(LazyClients(store)))
+    assert clients[5] == eval_clients[5]
+    assert len(pickle.dumps(clients)) < 1000
+
+
+def test_stale_index_rebuilt(eval_clients, store):
+    LazyClients(store).close()
+    index_mtime = os.path.getmtime(store + ".idx")
+
+    # A shorter store written with an older mtime than the index
+    _write_store(store, eval_clients[:300])
+    os.utime(store, (index_mtime - 60, index_mtime - 60))
+    clients = LazyClients(store)
+    assert len(clients) == 300
+    assert clients[-1] == eval_clients[299]
+
+    # A newer store of the same size
+    _write_store(store, reversed(eval_clients[:300]))
+    os.utime(store, (index_mtime + 60, index_mtime + 60))
+    assert LazyClients(store)[0] == eval_clients[299]
+
+    # A truncated index
+    with open(store + ".idx", "r+b") as f:
+        f.truncate(12)
+    assert len(LazyClients(store)) == 300
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / "clients.jsonl")
+    open(path, "w").close()
+    clients = LazyClients(path)
+    assert len(clients) == 0
+    assert list(clients) == []
+
+# USAGE: python -m pytest -q test_client_view.py
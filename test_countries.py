@@ -0,0 +1,65 @@
+import phonenumbers
+import pycountry
+import pytest
+
+from countries import CountryResolver
+
+
+def _pycountry_alpha_2(name):
+    try:
+        return pycountry.countries.lookup(name).alpha_2
+    except LookupError:
+        return None
+
+
+def _country_strings(eval_clients):
+    strings = {"Britain", "Czechia", "Türkiye", "U.S.", "Atlantis", "", "de", "DEU", "276", "switzerland"}
+    for country in pycountry.countries:
+        strings.update(v for v in (country.alpha_2, country.alpha_3, country.numeric, country.name,
+                                   getattr(country, "official_name", None)) if v)
+    for client in eval_clients:
+        if client is None:
+            continue
+        strings.add(client['passport'].get('country'))
+        strings.add(client['client_profile'].get('nationality'))
+        strings.add(client['client_profile'].get('country_of_domicile'))
+    return sorted(s for s in strings if isinstance(s, str))
+
+
+def test_matches_pycountry(eval_clients):
+    resolver = CountryResolver()
+    for name in _country_strings(eval_clients):
+        assert resolver.alpha_2(name) == _pycountry_alpha_2(name), name
+        if resolver.alpha_2(name):
+            assert resolver.alpha_3(name) == pycountry.countries.lookup(name).alpha_3, name
+    assert resolver.alpha_2(None) is None
+
+
+def test_memoized():
+    resolver = CountryResolver()
+    assert resolver.alpha_2("Denmark") == "DK"
+    assert resolver.alpha_2("Atlantis") is None
+    assert resolver.alpha_2("Atlantis") is None
+    assert resolver.stats()["country"] == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
+
+    assert [resolver.calling_code(code) for code in ("DK", "CH", "DK", "XX")] == \
+        [phonenumbers.country_code_for_region(code) for code in ("DK", "CH", "DK", "XX")]
+    assert (resolver.hits["calling_code"], resolver.misses["calling_code"]) == (1, 3)
+
+
+def test_demonym():
+    pytest.importorskip("countryinfo")
+    resolver = CountryResolver()
+    assert resolver.demonym("Switzerland") == "Swiss"
+    assert resolver.demonym("Atlantis") == "Unknown"
+    assert resolver.demonym("Atlantis", default=None) is None
+    assert resolver.stats()["demonym"]["misses"] == 2
+
+
+def test_multi_country_fields():
+    resolver = CountryResolver()
+    assert resolver.split("Spain, France") == ["Spain", "France"]
+    assert resolver.alpha_2_all("Germany; Austria|Atlantis") == ["DE", "AT"]
+    assert resolver.alpha_2_all(None) == []
+
+# USAGE: python -m pytest -q test_countries.py
@@ -0,0 +1,82 @@
+import copy
+import random
+
+import pandas as pd
+import pytest
+
+from encode_data import CLIENT_SCHEMA, data_to_df, flatten_clients
+
+
+@pytest.fixture
+def clients(eval_clients):
+    clients = copy.deepcopy([client for client in eval_clients if client is not None][:200])
+    for i, client in enumerate(clients):
+        client['label'] = {'label': 'Accept' if i % 3 else 'Reject'}
+    return clients
+
+
+def _shuffled(client, rng):
+    sections = list(client.items())
+    rng.shuffle(sections)
+    shuffled = {}
+    for section, values in sections:
+        fields = list(values.items())
+        rng.shuffle(fields)
+        shuffled[section] = dict(fields)
+    return shuffled
+
+
+def test_columns(clients):
+    df = data_to_df(clients)
+    assert list(df.columns) == list(CLIENT_SCHEMA)
+    for column, (section, field, dtype) in CLIENT_SCHEMA.items():
+        if column == 'label':
+            continue
+        assert list(df[column]) == [client[section][field] for client in clients], column
+        if dtype == 'str':
+            assert isinstance(df[column].dtype, pd.StringDtype), column
+
+
+def test_key_order_independent(clients):
+    rng = random.Random(0)
+    pd.testing.assert_frame_equal(data_to_df([_shuffled(client, rng) for client in clients]), data_to_df(clients))
+
+
+def test_labels(clients):
+    clients[5].pop('label')
+    labels = data_to_df(clients)['label']
+    assert labels.dtype == "Int64"
+    assert labels[0] == 0 and labels[1] == 1 and labels[3] == 0
+    assert labels.isna().tolist() == [i == 5 for i in range(len(clients))]
+
+
+def test_unknown_label(clients):
+    clients[7]['label']['label'] = 'Maybe'
+    with pytest.raises(ValueError, match="Maybe"):
+        data_to_df(clients)
+
+
+def test_missing_fields(clients, capsys):
+    clients[2]['passport'].pop('gender')
+    clients[4]['client_profile'].pop('preferred_markets')
+    clients[4]['passport'].pop('gender')
+    clients[9].pop('client_profile')
+    clients[11] = None
+    profile_columns = [column for column, (section, _, _) in CLIENT_SCHEMA.items() if section == 'client_profile']
+
+    columns, missing = flatten_clients(clients)
+    assert missing['gender'] == [2, 4, 11]
+    assert missing['preferred_markets'] == [4, 9, 11]
+    assert all(missing[column] == [9, 11] for column in profile_columns if column != 'preferred_markets')
+    assert missing['label'] == [11]
+
+    df = data_to_df(clients)
+    out = capsys.readouterr().out
+    assert f"Missing fields (clients of {len(clients)}):" in out
+    assert "gender (3)" in out and "preferred_markets (3)" in out
+    assert df['gender'].isna().tolist() == [i in (2, 4, 11) for i in range(len(clients))]
+    assert df['preferred_markets'][4] is None and df['preferred_markets'][9] is None
+    assert df['currency'].isna()[[9, 11]].all()
+    assert df['label'].isna().tolist() == [i == 11 for i in range(len(clients))]
+
+# USAGE: python -m pytest -q test_encode_data.py
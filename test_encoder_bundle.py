@@ -0,0 +1,77 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sklearn.preprocessing import LabelEncoder, MultiLabelBinarizer
+
+from encode_data import data_to_df
+from encoder_bundle import LABEL_COLUMNS, UNSEEN, EncoderBundle
+
+
+@pytest.fixture
+def frames(eval_clients):
+    df = data_to_df([client for client in eval_clients if client is not None])
+    return df.iloc[:600].reset_index(drop=True), df.iloc[600:].reset_index(drop=True)
+
+
+def test_matches_sklearn(frames):
+    train, test = frames
+    bundle = EncoderBundle(reference_date="2025-01-01").fit(train)
+    encoded = bundle.transform(test)
+    for column in LABEL_COLUMNS:
+        encoder = LabelEncoder().fit(train[column])
+        seen = test[column].isin(encoder.classes_).to_numpy()
+        assert (encoded[column].to_numpy()[seen] == encoder.transform(test[column][seen])).all(), column
+        assert (encoded[column].to_numpy()[~seen] == UNSEEN).all(), column
+    markets = MultiLabelBinarizer().fit(train['preferred_markets'].to_list())
+    columns = [f'pref_markets_{i}' for i in range(len(markets.classes_))]
+    assert (encoded[columns].to_numpy() == markets.transform(test['preferred_markets'].to_list())).all()
+    assert encoded['higher_education'].tolist() == [int(bool(h)) for h in test['higher_education']]
+    ages = (pd.Timestamp("2025-01-01") - pd.to_datetime(test['birth_date'])).dt.days // 365
+    assert encoded['age'].tolist() == ages.tolist()
+
+
+def test_unseen_categories(frames):
+    train, _ = frames
+    bundle = EncoderBundle(reference_date="2025-01-01").fit(train)
+    new = train.iloc[:2].copy()
+    new['nationality'] = pd.array(["Martian", train['nationality'][1]], dtype="string")
+    new['preferred_markets'] = [["Mars"], ["Mars"] + list(train['preferred_markets'][1])]
+    encoded = bundle.transform(new)
+    assert encoded['nationality'].tolist() == [UNSEEN, bundle.transform(train.iloc[1:2])['nationality'].iloc[0]]
+    markets = [c for c in encoded.columns if c.startswith('pref_markets_')]
+    assert encoded[markets].iloc[0].sum() == 0
+    assert (encoded[markets].iloc[1].to_numpy() == bundle.transform(train.iloc[1:2])[markets].iloc[0].to_numpy()).all()
+
+
+def test_save_and_load(frames, tmp_path):
+    train, test = frames
+    path = str(tmp_path / "encoder_bundle.pkl")
+    bundle = EncoderBundle(reference_date="2025-01-01").fit(train)
+    bundle.save(path)
+    loaded = EncoderBundle.load(path)
+    pd.testing.assert_frame_equal(loaded.transform(test), bundle.transform(test))
+
+    with open(path, "wb") as f:
+        pickle.dump({"not": "a bundle"}, f)
+    with pytest.raises(TypeError, match="EncoderBundle"):
+        EncoderBundle.load(path)
+
+
+def test_not_fitted(frames):
+    with pytest.raises(ValueError, match="not fitted"):
+        EncoderBundle().transform(frames[1])
+
+
+def test_invalid_birth_dates(frames):
+    train, _ = frames
+    new = train.iloc[:3].copy()
+    new['birth_date'] = pd.array(["1980-02-30", None, "1990-06-01"], dtype="string")
+    ages = EncoderBundle(reference_date="2025-01-01").fit(train).transform(new)['age']
+    assert np.isnan(ages[0]) and np.isnan(ages[1]) and ages[2] == 34
+
+# USAGE: python -m pytest -q test_encoder_bundle.py
@@ -0,0 +1,120 @@
+import functools
+import os
+import pickle
+import time
+
+import pandas as pd
+import pytest
+
+from encoder_bundle import EncoderBundle
+from encode_data import data_to_df
+from feature_cache import FeatureCache, builder_version
+
+
+@pytest.fixture
+def store(eval_clients, tmp_path):
+    path = str(tmp_path / "clients.pkl")
+    with open(path, "wb") as f:
+        pickle.dump([client for client in eval_clients[:100] if client is not None], f)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FeatureCache(str(tmp_path / "cache"), max_entries=2)
+
+
+def _counting(calls):
+    # A builder that records the clients it is called with
+    def build(clients):
+        calls.append(len(clients))
+        return _frame(clients)
+    return build
+
+
+def _frame(clients, scale=1.0):
+    return pd.DataFrame({
+        "first_name": [client["account_form"]["first_name"] for client in clients],
+        "aum": [scale * client["client_profile"]["aum"]["savings"] for client in clients],
+        "jobs": [client["client_profile"]["employment_history"] for client in clients],
+    })
+
+
+def test_miss_then_hit(cache, store):
+    calls = []
+    build = _counting(calls)
+    first = cache.load(store, build)
+    second = cache.load(store, build)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] > 0
+
+
+def test_json_columns_round_trip(cache, store):
+    built = cache.load(store, _frame)
+    cached = cache.load(store, _frame)
+    assert cached["jobs"].dtype == object
+    assert list(cached["jobs"]) == list(built["jobs"])
+    assert isinstance(cached["jobs"][0], list)
+
+
+def test_key_changes(cache, store, tmp_path):
+    key = cache.key(store, build=_frame)
+    assert cache.key(store, build=_frame) == key
+    # another builder, or the same one with other arguments or another version
+    assert cache.key(store, build=data_to_df) != key
+    assert cache.key(store, build=functools.partial(_frame, scale=2.0)) != key
+    assert cache.key(store, version="2") != cache.key(store, version="1")
+
+    # the content of the store
+    with open(store, "rb") as f:
+        clients = pickle.load(f)
+    with open(store, "wb") as f:
+        pickle.dump(clients[:-1], f)
+    assert cache.key(store, build=_frame) != key
+
+    # the encoder bundle
+    bundle_path = str(tmp_path / "bundle.pkl")
+    EncoderBundle(reference_date="2025-01-01").fit(data_to_df(clients)).save(bundle_path)
+    with_bundle = cache.key(store, bundle_path, build=_frame)
+    assert with_bundle != cache.key(store, build=_frame)
+    EncoderBundle(reference_date="2020-01-01").fit(data_to_df(clients)).save(bundle_path)
+    assert cache.key(store, bundle_path, build=_frame) != with_bundle
+
+
+def test_stale_frame_not_read(cache, store):
+    calls = []
+    build = _counting(calls)
+    cache.load(store, build)
+    with open(store, "rb") as f:
+        clients = pickle.load(f)
+    with open(store, "wb") as f:
+        pickle.dump(clients[:10], f)
+    assert len(cache.load(store, build)) == 10
+    assert calls == [len(clients), 10]
+
+
+def test_eviction_by_last_use(cache, store):
+    frame = _frame([])
+    for version in ("a", "b"):
+        cache.put(cache.key(store, version=version), frame)
+        time.sleep(0.01)
+    # a is used after b was written: b is the least recently used
+    assert cache.get(cache.key(store, version="a")) is not None
+    time.sleep(0.01)
+    cache.put(cache.key(store, version="c"), frame)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get(cache.key(store, version="b")) is None
+    assert cache.get(cache.key(store, version="a")) is not None
+    assert not os.path.exists(os.path.join(cache.cache_dir, cache.key(store, version="b") + ".parquet"))
+
+
+def test_builder_version():
+    assert builder_version(_frame) == builder_version(_frame)
+    assert builder_version(functools.partial(_frame, scale=2.0)) != builder_version(_frame)
+    with pytest.raises(ValueError, match="version="):
+        builder_version(len)
+
+# USAGE: python -m pytest -q test_feature_cache.py
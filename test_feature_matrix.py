@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from scipy import sparse
+
+from encode_data import data_for_ML, data_to_df
+from encoder_bundle import UNSEEN, EncoderBundle
+from feature_matrix import FeatureMatrixBuilder
+
+ONEHOT_FEATURES = ['gender', 'country_code', 'country_of_domicile', 'nationality', 'marital_status',
+                   'higher_education', 'investment_risk_profile', 'investment_horizon', 'investment_experience',
+                   'type_of_mandate', 'currency']
+
+
+@pytest.fixture(scope="module")
+def frame():
+    import pickle
+    from conftest import EVAL_CLIENTS_PATH
+
+    with open(EVAL_CLIENTS_PATH, "rb") as f:
+        clients = [client for client in pickle.load(f) if client is not None]
+    bundle = EncoderBundle(reference_date="2025-01-01").fit(data_to_df(clients))
+    return data_for_ML(clients, bundle)
+
+
+def _features(frame):
+    numeric = ['age', 'aum', 'num_jobs', 'savings_value', 'effective_work_experience', 'gap_years']
+    return numeric[:2] + ONEHOT_FEATURES + numeric[2:] + [c for c in frame.columns if c.startswith('pref_markets_')]
+
+
+def test_columns(frame):
+    features = _features(frame)
+    builder = FeatureMatrixBuilder(features, ONEHOT_FEATURES)
+    X = builder.fit_transform(frame.iloc[:700])
+    numeric = [f for f in features if f not in ONEHOT_FEATURES]
+    assert sparse.isspmatrix_csr(X)
+    assert X.shape == (700, len(builder.feature_names_))
+    assert builder.feature_names_[:len(numeric)] == numeric
+
+    dense = X.toarray()
+    names = {name: j for j, name in enumerate(builder.feature_names_)}
+    for column in numeric:
+        assert (dense[:, names[column]] == frame[column].iloc[:700].to_numpy(dtype=np.float64)).all(), column
+    for column in ONEHOT_FEATURES:
+        values = frame[column].iloc[:700]
+        block = [name for name in builder.feature_names_ if name.startswith(column + "_")]
+        assert sorted(block) == sorted(f"{column}_{value}" for value in set(values)), column
+        for value in set(values):
+            assert (dense[:, names[f"{column}_{value}"]] == (values == value).to_numpy()).all(), column
+        # one category per row
+        assert (dense[:, [names[name] for name in block]].sum(axis=1) == 1).all(), column
+
+
+def test_unknown_category_row(frame):
+    builder = FeatureMatrixBuilder(_features(frame), ONEHOT_FEATURES, dtype=np.float32).fit(frame.iloc[:700])
+    rows = frame.iloc[:3].copy()
+    rows['nationality'] = [UNSEEN, 999, rows['nationality'].iloc[2]]
+    X = builder.transform(rows, dense=True)
+    assert X.dtype == np.float32
+    nationality = [j for j, name in enumerate(builder.feature_names_) if name.startswith('nationality_')]
+    assert X[:2, nationality].sum() == 0 and X[2, nationality].sum() == 1
+    # the rest of the rows is encoded as usual
+    others = [j for j in range(X.shape[1]) if j not in nationality]
+    assert (X[:, others] == builder.transform(frame.iloc[:3], dense=True)[:, others]).all()
+
+
+def test_not_fitted(frame):
+    with pytest.raises(ValueError, match="not fitted"):
+        FeatureMatrixBuilder(_features(frame), ONEHOT_FEATURES).transform(frame)
+
+
+def test_import_does_not_load_sklearn():
+    code = "import sys, encode_data, numeric_features, feature_matrix; print('sklearn' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip() == "False"
+
+# USAGE: python -m pytest -q test_feature_matrix.py
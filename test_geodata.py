@@ -0,0 +1,69 @@
+import os
+
+import pandas as pd
+import pytest
+
+pgeocode = pytest.importorskip("pgeocode")
+
+from geodata import GeodataBundle, build_bundle, country_codes_for_clients, open_postal_index
+
+TABLES = {
+    "CH": pd.DataFrame({"place_name": ["Zürich", "Bern", None], "postal_code": ["8001", "3011", "9999"]}),
+    "DE": pd.DataFrame({"place_name": ["Berlin", "Köln"], "postal_code": ["10115", None]}),
+}
+
+
+class _Nominatim:
+    # pgeocode.Nominatim over TABLES, so no data is downloaded
+    def __init__(self, country_code):
+        if country_code == "ZZ":
+            raise ValueError("country=ZZ is not a known country code")
+        self._data = TABLES.get(country_code, pd.DataFrame(columns=["place_name", "postal_code"]))
+
+
+@pytest.fixture
+def bundle_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(pgeocode, "Nominatim", _Nominatim)
+    path = str(tmp_path / "geodata_bundle.npz")
+    assert build_bundle(["DE", "CH", "FR", "ZZ", "CH"], path) == {"CH": 3, "DE": 1, "FR": 0, "ZZ": 0}
+    return path
+
+
+def test_bundle_round_trip(bundle_path):
+    bundle = GeodataBundle(bundle_path)
+    assert bundle.countries == ["CH", "DE"]
+    ch = bundle.country_data("CH")
+    assert ch["postal_code"].tolist() == ["8001", "3011", "9999"]
+    assert ch["place_name"].tolist() == ["Zürich", "Bern", ""]
+    assert bundle.country_data("DE")["postal_code"].tolist() == ["10115"]
+    assert bundle.country_data("FR") is None
+
+
+def test_missing_bundle(tmp_path):
+    with pytest.raises(FileNotFoundError, match="geodata.py build"):
+        GeodataBundle(str(tmp_path / "geodata_bundle.npz"))
+
+
+def test_postal_index_from_bundle(bundle_path, tmp_path, monkeypatch):
+    index_dir = str(tmp_path / "postal_index")
+    postal_index = open_postal_index(bundle_path, index_dir)
+    assert postal_index.country("CH").has_postal_code("8001")
+    assert postal_index.country("CH").city_matches("zürich-oerlikon")
+    assert postal_index.country("FR") is None
+
+    # A rebuilt bundle replaces the country indexes built from the old one
+    monkeypatch.setitem(TABLES, "CH", pd.DataFrame({"place_name": ["Basel"], "postal_code": ["4001"]}))
+    build_bundle(["CH"], bundle_path)
+    marker = os.path.join(index_dir, "CH", "place_postal.npy")
+    os.utime(bundle_path, (os.path.getmtime(marker) + 1, os.path.getmtime(marker) + 1))
+    ch = open_postal_index(bundle_path, index_dir).country("CH")
+    assert ch.has_postal_code("4001") and not ch.has_postal_code("8001")
+
+def test_country_codes_for_clients(eval_clients):
+    codes = country_codes_for_clients(eval_clients)
+    assert codes == sorted(set(codes))
+    assert all(len(code) == 2 for code in codes)
+    assert country_codes_for_clients([{'client_profile': {'country_of_domicile': 'Spain, France'}}, None, {}]) \
+        == ["ES", "FR"]
+
+# USAGE: python -m pytest -q test_geodata.py
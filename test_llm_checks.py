@@ -0,0 +1,251 @@
+import pytest
+
+from llm_checks import (CHECKS, STRICT_FOLLOW_UP, LLMCheck, LLMRunner, ResponseCache, ask_checks, estimate_tokens,
+                        family_background_fields, parse_answer, parse_boolean_answer, parse_numbered_answers,
+                        request_key)
+from ollama_stub import StubServer
+
+
+@pytest.fixture
+def clients(eval_clients):
+    return [client for client in eval_clients if client is not None][:6]
+
+
+#### PARSING
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ("True", True),
+    ("False.", False),
+    ("  FALSE\n", False),
+    ("The answer is: true", True),
+    ("**True** - the status matches the description.", True),
+    ("False. It would only be true if she were married.", False),
+    ("<think>The text says married, so true?</think>False", False),
+    ("<think>Let me think about whether this is true", None),  # cut off while thinking
+    ("Yes, they are coherent.", True),
+    ("No.", False),
+    ("untrue", None),
+    ("Trueish", None),
+    ("I cannot tell from the input.", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_answer(reply, expected):
+    assert parse_answer(reply) is expected
+    assert parse_boolean_answer(reply) is bool(expected)
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ("1: True\n2: False\n3: True", [True, False, True]),
+    ("1. **True**\n2) false\n3 - yes", [True, False, True]),
+    ("1: True\n3: False", [True, None, False]),  # a line left out
+    ("1: True\n2: Fa", [True, None, None]),  # cut off by num_predict
+    ("1: True\n1: False\n2: no", [True, False, None]),  # the first answer counts
+    ("0: False\n4: True\n2: True", [None, True, None]),  # numbers out of range
+    ("<think>1: False</think>1: True", [True, None, None]),
+    ("True\nFalse\nTrue", [None, None, None]),  # not numbered
+    ("", [None, None, None]),
+])
+def test_parse_numbered_answers(reply, expected):
+    assert parse_numbered_answers(reply, 3) == expected
+
+
+#### PROMPTS
+
+
+def test_templates(clients):
+    check = CHECKS['family_background']
+    messages = [check.messages(client) for client in clients]
+    # Same system prompt for every client, so the server can reuse its processed prefix
+    assert len({m[0]["content"] for m in messages}) == 1
+    for client, (_, user) in zip(clients, messages):
+        fields = family_background_fields(client)
+        assert user["content"] == f"marital status:{fields['marital_status']}. " \
+                                  f"Family Background:{fields['family_background']}"
+    assert check.options == {"num_predict": check.max_output_tokens, "temperature": 0.0}
+    for name in CHECKS:
+        for client in clients:
+            assert CHECKS[name].render(client)
+
+
+def test_token_budgets(clients):
+    check = LLMCheck("budget", "Reply True or False.", "{family_background}", family_background_fields,
+                     "Budget Check Failed", max_output_tokens=3, max_input_tokens=10)
+    long_client = {"client_profile": {"marital_status": "single"},
+                   "client_description": {"Family Background": "x" * 200}}
+    assert check.render(long_client) == "x" * 40
+    assert estimate_tokens(check.render(long_client)) <= 10
+    short_client = {"client_profile": {"marital_status": "single"},
+                    "client_description": {"Family Background": "single"}}
+    assert check.render(short_client) == "single"
+    assert check.options["num_predict"] == 3
+
+    packed = CHECKS['family_background'].packed_messages(clients[:3])
+    assert [m["role"] for m in packed] == ["system", "user"]
+    assert packed[1]["content"].splitlines()[0].startswith("1. marital status:")
+    assert CHECKS['family_background'].packed_options(3)["num_predict"] == \
+        3 * (CHECKS['family_background'].max_output_tokens + 3)
+
+
+#### CACHE
+
+
+def test_request_key():
+    messages = [{"role": "user", "content": "a"}]
+    key = request_key("phi", messages, {"temperature": 0, "num_predict": 5})
+    assert key == request_key("phi", [{"content": "a", "role": "user"}], {"num_predict": 5, "temperature": 0})
+    assert key != request_key("gemma3", messages, {"temperature": 0, "num_predict": 5})
+    assert key != request_key("phi", messages, {"temperature": 0, "num_predict": 6})
+    assert request_key("phi", messages, None) == request_key("phi", messages, {})
+
+
+def test_response_cache(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    cache = ResponseCache(path)
+    keys = [request_key("phi", [{"role": "user", "content": str(i)}], None) for i in range(1200)]
+    assert cache.get_many(keys) == {}
+    cache.put_many([(key, f"reply {i}") for i, key in enumerate(keys[:1000])], "phi")
+    # More keys than one SQL query takes: hits for the stored ones, nothing for the others
+    assert cache.get_many(keys) == {key: f"reply {i}" for i, key in enumerate(keys[:1000])}
+    cache.put_many([(keys[0], "new reply")], "phi")
+    assert cache.get_many([keys[0]]) == {keys[0]: "new reply"}
+    assert len(cache) == 1000
+
+    # Another process opening the same file sees the replies, also after close
+    other = ResponseCache(path)
+    assert other.get_many(keys[999:1001]) == {keys[999]: "reply 999"}
+    cache.close()
+    other.close()
+    assert len(ResponseCache(path)) == 1000
+
+
+#### RUNNER
+
+
+def _requires_ollama():
+    pytest.importorskip("ollama")
+
+
+def _echo(model, messages, options):
+    return messages[-1]["content"].upper()
+
+
+def _requests(*texts):
+    return [([{"role": "user", "content": text}], {"temperature": 0}) for text in texts]
+
+
+@pytest.fixture
+def server():
+    _requires_ollama()
+    server = StubServer(answer=_echo).start()
+    yield server
+    server.stop()
+
+
+def test_replies_in_order(server):
+    with LLMRunner("stub", host=server.host, cache_path=None) as runner:
+        assert runner.run(_requests("a", "b", "a", "c")) == ["A", "B", "A", "C"]
+    # Identical requests are sent once
+    assert len(server.requests) == 3
+    assert runner.stats["sent"] == 3
+
+
+def test_retries_errors_and_timeouts(server):
+    server.failures = ["error", "slow", "error"]
+    server.slow_seconds = 1.0
+    with LLMRunner("stub", host=server.host, cache_path=None, timeout=0.3, retries=3, backoff=0.01) as runner:
+        assert runner.run(_requests("a")) == ["A"]
+    assert runner.stats["retries"] == 3
+    assert len(server.requests) == 4
+
+
+def test_gives_up_after_retries(server):
+    server.failures = ["error"] * 3
+    with LLMRunner("stub", host=server.host, cache_path=None, retries=2, backoff=0.01) as runner:
+        with pytest.raises(Exception):
+            runner.run(_requests("a"))
+    assert len(server.requests) == 3
+
+
+def test_cache(server, tmp_path):
+    cache_path = str(tmp_path / "llm_cache.sqlite")
+    with LLMRunner("stub", host=server.host, cache_path=cache_path) as runner:
+        assert runner.run(_requests("a", "b")) == ["A", "B"]
+    with LLMRunner("stub", host=server.host, cache_path=cache_path) as runner:
+        assert runner.run(_requests("b", "c", "a")) == ["B", "C", "A"]
+        assert (runner.stats["cached"], runner.stats["sent"]) == (2, 1)
+    # Another model does not share the replies
+    with LLMRunner("other", host=server.host, cache_path=cache_path) as runner:
+        runner.run(_requests("a"))
+        assert runner.stats["sent"] == 1
+    assert len(server.requests) == 4
+
+
+def test_reuses_loop_and_client(server):
+    runner = LLMRunner("stub", host=server.host, cache_path=None)
+    runner.run(_requests("a"))
+    loop, client = runner._loop, runner._client
+    runner.run(_requests("b"))
+    assert runner._loop is loop and runner._client is client
+    runner.close()
+    assert runner._loop is None and loop.is_closed()
+    # A closed runner starts a new loop when used again
+    assert runner.run(_requests("c")) == ["C"]
+    assert runner._loop is not loop
+    runner.close()
+
+
+#### FALLBACK
+
+
+def _fallback_answer(model, messages, options):
+    # Packed requests leave the 2nd input out; alone, it first gets a rambling reply and
+    # a clear one to the follow-up
+    if "several numbered inputs" in messages[0]["content"]:
+        return "1: True\n3: False"
+    if messages[-1]["content"] == STRICT_FOLLOW_UP:
+        return "True"
+    return "It depends on the context."
+
+
+def test_ask_checks_fallback(clients):
+    _requires_ollama()
+    server = StubServer(answer=_fallback_answer).start()
+    try:
+        items = [('family_background', client) for client in clients[:3]]
+        with LLMRunner("stub", host=server.host, cache_path=None) as runner:
+            answers, counts = ask_checks(items, runner, clients_per_request=3)
+    finally:
+        server.stop()
+    assert answers == [True, True, False]
+    assert counts == {"parsed": 2, "resent": 1, "reasked": 1, "defaulted": 0}
+    # one packed request, the 2nd client alone, then its follow-up
+    assert len(server.requests) == 3
+    assert server.requests[2]["messages"][-2] == {"role": "assistant", "content": "It depends on the context."}
+
+
+def test_ask_checks_defaults_to_false(clients):
+    _requires_ollama()
+    server = StubServer(answer=lambda model, messages, options: "Maybe.").start()
+    try:
+        items = [('family_background', client) for client in clients[:2]]
+        with LLMRunner("stub", host=server.host, cache_path=None) as runner:
+            answers, counts = ask_checks(items, runner)
+    finally:
+        server.stop()
+    assert answers == [False, False]
+    assert counts == {"parsed": 0, "resent": 0, "reasked": 2, "defaulted": 2}
+
+
+def test_latency_percentiles(server, tmp_path):
+    with LLMRunner("stub", host=server.host, cache_path=str(tmp_path / "llm_cache.sqlite")) as runner:
+        runner.run(_requests("a", "b", "c"), tags=["x", "x", "y"])
+        runner.run(_requests("a", "d"), tags=["x", "y"])  # 'a' comes from the cache
+        latencies = runner.latency_percentiles(percentiles=(50, 90))
+    assert {tag: row["n"] for tag, row in latencies.items()} == {"x": 2, "y": 2}
+    for row in latencies.values():
+        assert row["model"] == "stub"
+        assert 0 <= row["p50"] <= row["p90"]
+
+# USAGE: python -m pytest -q test_llm_checks.py
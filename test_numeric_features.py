@@ -0,0 +1,141 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from client_store import write_store
+from numeric_features import (calculate_effective_experience, extract_numeric_features,
+                              extract_numeric_features_from_store, reference_year)
+
+
+@pytest.fixture
+def clients(eval_clients):
+    return [client for client in eval_clients if client is not None]
+
+
+def _worked_years(jobs, now=2025):
+    years = set()
+    for start, end in jobs:
+        years.update(range(start, now if end is None else end))
+    return years
+
+
+def _baseline_features(clients):
+    # The per-client loop extract_numeric_features replaced, with its own column names
+    rows = []
+    for client in clients:
+        profile = client['client_profile']
+        aum = profile['aum']
+        jobs = [(job['start_year'], job['end_year']) for job in profile['employment_history']]
+        salaries = [job['salary'] for job in profile['employment_history']]
+        current = sum(job['salary'] for job in profile['employment_history'] if job['end_year'] is None)
+        total = sum(aum.values())
+        property_value = aum['real_estate_value']
+        cash = aum['inheritance'] + aum['savings']
+        effective = len(_worked_years(jobs))
+        rows.append({
+            'aum': total,
+            'property_value': property_value,
+            'num_properties': len(profile['real_estate_details']),
+            'inheritance_value': aum['inheritance'],
+            'savings_value': aum['savings'],
+            'num_jobs': len(jobs),
+            'current_salary': current,
+            'max_salary': max(salaries, default=0),
+            'property_to_cash_ratio': (property_value / (total - property_value)
+                                       if total != property_value else -np.inf),
+            'inheritance_to_cash_ratio': aum['inheritance'] / cash if cash else 0,
+            'total_work_experience': (max(2025 if end is None else end for _, end in jobs)
+                                      - min(start for start, _ in jobs)) if jobs else 0,
+            'effective_work_experience': effective,
+            'saving_per_annum': aum['savings'] / effective if effective else aum['savings'],
+            'salary_to_max_salary_ratio': current / max(salaries) if salaries and max(salaries) else 0,
+        })
+    df = pd.DataFrame(rows)
+    ratio = df['property_to_cash_ratio']
+    df['property_to_cash_ratio'] = ratio.replace(-np.inf, ratio.max())
+    return df
+
+
+def test_matches_baseline(clients):
+    expected = _baseline_features(clients)
+    features = extract_numeric_features(clients)
+    pd.testing.assert_frame_equal(features[expected.columns], expected, check_dtype=False)
+
+
+def test_experience_features(clients):
+    features = extract_numeric_features(clients)
+    for i, client in enumerate(clients):
+        jobs = [(job['start_year'], job['end_year']) for job in client['client_profile']['employment_history']]
+        years = sorted(_worked_years(jobs))
+        # Runs of consecutive worked years
+        blocks = np.split(years, np.flatnonzero(np.diff(years) > 1) + 1) if years else []
+        assert features['gap_years'][i] == (years[-1] + 1 - years[0] - len(years) if years else 0)
+        assert features['longest_tenure'][i] == max(map(len, blocks), default=0)
+        assert calculate_effective_experience(jobs) == len(years)
+
+
+def test_reference_date(clients):
+    features = extract_numeric_features(clients, reference_date="2021-04-10")
+    for i, client in enumerate(clients[:100]):
+        jobs = [(job['start_year'], job['end_year']) for job in client['client_profile']['employment_history']]
+        assert features['effective_work_experience'][i] == len(_worked_years(jobs, now=2021))
+
+
+def _jobs_client(jobs):
+    return {'client_profile': {
+        'aum': {'savings': 1000, 'inheritance': 0, 'real_estate_value': 0},
+        'real_estate_details': [],
+        'employment_history': [{'start_year': start, 'end_year': end, 'company': 'ACME', 'position': 'Clerk',
+                                'salary': 50000} for start, end in jobs],
+    }}
+
+
+@pytest.mark.parametrize("jobs, reference_date, effective, gap_years, longest_tenure", [
+    ([], 2025, 0, 0, 0),
+    ([(2000, 2005)], 2025, 5, 0, 5),
+    ([(2000, 2005), (2008, 2010)], 2025, 7, 3, 5),
+    # overlapping and touching jobs make one block
+    ([(2000, 2006), (2004, 2010), (2010, 2012)], 2025, 12, 0, 12),
+    # a job inside another one, listed first
+    ([(2003, 2004), (2000, 2010), (2015, 2016)], 2025, 11, 5, 10),
+    # current jobs run until the reference date
+    ([(2000, 2005), (2010, None)], 2025, 20, 5, 15),
+    ([(2000, 2005), (2010, None)], "2021-04-10", 16, 5, 11),
+    ([(2000, 2005), (2010, None)], pd.Timestamp("2012-12-31"), 7, 5, 5),
+    # a job that ends before it starts, or starts after the reference date, adds nothing
+    ([(2000, 2005), (2009, 2007), (2030, None)], 2025, 5, 0, 5),
+])
+def test_experience_with_reference_date(jobs, reference_date, effective, gap_years, longest_tenure):
+    features = extract_numeric_features([_jobs_client(jobs)], reference_date=reference_date)
+    assert (features['effective_work_experience'][0], features['gap_years'][0],
+            features['longest_tenure'][0]) == (effective, gap_years, longest_tenure)
+    assert calculate_effective_experience(jobs, reference_date) == effective
+
+
+def test_reference_year():
+    assert reference_year(2021) == 2021
+    assert reference_year("2021-04-10") == 2021
+    assert reference_year(pd.Timestamp("2019-01-01")) == 2019
+
+
+def test_fractional_amounts_kept(clients):
+    clients = copy.deepcopy(clients[:50])
+    clients[3]['client_profile']['aum']['savings'] = 300000.5
+    features = extract_numeric_features(clients)
+    assert features['savings_value'][3] == 300000.5
+    pd.testing.assert_frame_equal(features[list(_baseline_features(clients).columns)],
+                                  _baseline_features(clients), check_dtype=False)
+
+
+def test_store_matches_list(eval_clients, tmp_path):
+    path = str(tmp_path / "clients.parquet")
+    write_store(eval_clients, path, row_group_size=128)
+    present = [i for i, client in enumerate(eval_clients) if client is not None]
+    expected = extract_numeric_features([eval_clients[i] for i in present])
+    expected.index = present
+    pd.testing.assert_frame_equal(extract_numeric_features_from_store(path), expected,
+                                  check_dtype=False, check_index_type=False)
+
+# USAGE: python -m pytest -q test_numeric_features.py
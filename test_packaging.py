@@ -0,0 +1,22 @@
+import glob
+import os
+
+import pytest
+
+tomllib = pytest.importorskip("tomllib")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Top-level scripts that are not importable modules, and the test suite
+NOT_PACKAGED = {"ML methods", "conftest"}
+
+
+def test_every_module_is_packaged():
+    with open(os.path.join(HERE, "pyproject.toml"), "rb") as f:
+        packaged = set(tomllib.load(f)["tool"]["setuptools"]["py-modules"])
+    modules = {os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(HERE, "*.py"))}
+    modules = {m for m in modules if m not in NOT_PACKAGED and not m.startswith("test_")}
+    assert modules - packaged == set(), "add them to [tool.setuptools] py-modules in pyproject.toml"
+    assert packaged - modules == set(), "listed in py-modules but missing"
+
+# USAGE: python -m pytest -q test_packaging.py
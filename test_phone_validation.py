@@ -0,0 +1,45 @@
+import pytest
+
+from phone_validation import PhoneValidator, country_regions, is_valid_for_region
+
+
+@pytest.fixture
+def phones(eval_clients):
+    profiles = [client['client_profile'] for client in eval_clients if client is not None]
+    numbers = [profile['phone_number'] for profile in profiles]
+    countries = [profile['country_of_domicile'] for profile in profiles]
+    # Repeats, numbers of another country and multi-country fields
+    numbers += numbers[:50] + numbers[:20] + ["0041 44 668 18 00", "+31 6 12345678", "12"]
+    countries += countries[:50] + countries[20:40] + ["Switzerland, Germany", "Netherlands", "Atlantis"]
+    return numbers, countries
+
+
+def _uncached(number, countries):
+    return any(is_valid_for_region(number, region) for region in country_regions(countries))
+
+
+@pytest.mark.parametrize("workers, parallel_threshold", [(1, 5000), (2, 1)])
+def test_batch_matches_serial(phones, workers, parallel_threshold):
+    numbers, countries = phones
+    serial = [PhoneValidator().check(number, names) for number, names in zip(numbers, countries)]
+    assert serial == [_uncached(number, names) for number, names in zip(numbers, countries)]
+    assert any(serial) and not all(serial)
+
+    validator = PhoneValidator(workers=workers, parallel_threshold=parallel_threshold)
+    assert validator.check_batch(numbers, countries) == serial
+    # The second batch is answered from the memo
+    misses = validator.misses
+    assert validator.check_batch(numbers, countries) == serial
+    assert validator.misses == misses
+
+
+def test_lru_bound():
+    validator = PhoneValidator(maxsize=2)
+    for number in ("+41446681800", "+41446681801", "+41446681802"):
+        validator.is_valid(number, "CH")
+    assert validator.stats()["size"] == 2
+    validator.is_valid("+41446681802", "CH")
+    validator.is_valid("+41446681800", "CH")
+    assert (validator.hits, validator.misses) == (1, 4)
+
+# USAGE: python -m pytest -q test_phone_validation.py
@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from postal_index import CountryIndex, PostalIndex, build_country_index, normalize_place
+
+# A pgeocode-style table with what the real ones contain: several codes per place,
+# places sharing a code, names with accents and spaces, and rows without a place name
+SYNTHETIC = pd.DataFrame({
+    "place_name": ["Zürich", "Zürich", "Bern", "Saint-Étienne", "Le  Mont-sur-Lausanne", np.nan, "Ostermundigen",
+                   "Bern"],
+    "postal_code": ["8001", "8002", "3011", "42000", "1052", "9999", "3072", "3072"],
+})
+
+
+def _pgeocode_data(country_code):
+    # The cached pgeocode table of a country; skipped when it is not on disk (no download)
+    pgeocode = pytest.importorskip("pgeocode")
+    if not os.path.exists(os.path.join(pgeocode.STORAGE_DIR, f"{country_code}.txt")):
+        pytest.skip(f"no cached pgeocode data for {country_code} in {pgeocode.STORAGE_DIR}")
+    return pgeocode.Nominatim(country_code)._data
+
+
+@pytest.fixture(params=["synthetic", "CH", "DE"])
+def country_data(request):
+    return SYNTHETIC if request.param == "synthetic" else _pgeocode_data(request.param)
+
+
+def test_lookups_match_table(country_data, tmp_path):
+    index = CountryIndex(build_country_index(country_data, str(tmp_path / "XX")))
+    rows = country_data.dropna(subset=["postal_code"])
+    codes = set(rows["postal_code"].astype(str))
+
+    # Every code of the table, plus codes next to them that are not in it
+    probes = sorted(codes)[::max(1, len(codes) // 500)] + ["0", "00000", "99999x", ""]
+    for code in probes:
+        assert index.has_postal_code(code) == (code in codes), code
+
+    named = rows.dropna(subset=["place_name"])
+    expected = {}
+    for place, code in zip(named["place_name"], named["postal_code"].astype(str)):
+        expected.setdefault(normalize_place(place), set()).add(code)
+    for place in list(expected)[::max(1, len(expected) // 300)]:
+        assert sorted(index.postal_codes_for_place(place.upper())) == sorted(expected[place]), place
+    assert index.postal_codes_for_place("Atlantis") == []
+
+
+def test_city_matches_scan(country_data, tmp_path):
+    # The scan validate_postal_code_for_client used to run over the whole table
+    index = CountryIndex(build_country_index(country_data, str(tmp_path / "XX")))
+    places = [p.lower() for p in country_data["place_name"] if isinstance(p, str)]
+    cities = places[::max(1, len(places) // 50)] + ["atlantis", "zürich-oerlikon", "greater bern area", ""]
+    for city in cities:
+        assert index.city_matches(city) == any(p in city for p in places), city
+
+
+def test_postal_index_builds_once(tmp_path):
+    calls = []
+
+    def load_data(country_code):
+        calls.append(country_code)
+        return SYNTHETIC if country_code == "CH" else None
+
+    index_dir = str(tmp_path / "postal_index")
+    postal_index = PostalIndex(index_dir, load_data=load_data)
+    assert postal_index.country("CH").has_postal_code("8001")
+    assert postal_index.country("XX") is None
+    assert postal_index.country("CH") is postal_index.country("CH")
+    # A later process maps the files without loading the data again
+    assert PostalIndex(index_dir, load_data=load_data).country("CH").has_postal_code("3072")
+    assert calls == ["CH", "XX"]
+
+    # Data newer than the index is built again
+    marker = os.path.join(index_dir, "CH", "place_postal.npy")
+    PostalIndex(index_dir, load_data=load_data, source_mtime=os.path.getmtime(marker) + 60).country("CH")
+    assert calls == ["CH", "XX", "CH"]
+
+# USAGE: python -m pytest -q test_postal_index.py
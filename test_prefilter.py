@@ -0,0 +1,96 @@
+import pytest
+
+from prefilter import CHEAP_CHECKS, cheap_verdict
+
+
+def _client(marital_status="married", family="Anna Muster has been happily married to Paul since 2010.",
+            occupation="In 2012, Anna Muster started working as a Portfolio Manager at UBS AG.",
+            position="Portfolio Manager"):
+    return {
+        'client_profile': {
+            'marital_status': marital_status,
+            'secondary_school': {'name': 'Gymnasium Bern', 'graduation_year': 2004},
+            'higher_education': [{'university': 'ETH Zurich', 'graduation_year': 2009}],
+            'employment_history': [{'start_year': 2012, 'end_year': None, 'company': 'UBS AG',
+                                    'position': position, 'salary': 150000}],
+            'aum': {'savings': 120000, 'inheritance': 0, 'real_estate_value': 900000},
+            'real_estate_details': [{'property type': 'flat', 'property value': 900000}],
+        },
+        'client_description': {
+            'Family Background': family,
+            'Education Background': "Anna graduated from Gymnasium Bern and then from ETH Zurich.",
+            'Occupation History': occupation,
+            'Wealth Summary': "Her savings amount to 120000 and she owns a flat worth 900000.",
+        },
+    }
+
+
+@pytest.mark.parametrize("status, text", [
+    ("married", "Anna Muster has been happily married to Paul since 2010."),
+    ("married", "Anna Muster and Paul tied the knot in 2010."),
+    ("single", "Anna Muster is currently single. She does not have any children."),
+    ("divorced", "Anna Muster is currently divorced."),
+    ("widowed", "Anna Muster is currently widowed. Her children are named Lea and Tim."),
+])
+def test_family_accepts_stated_status(status, text):
+    assert cheap_verdict('family_background', _client(status, text)) is True
+
+
+@pytest.mark.parametrize("status, text", [
+    ("widowed", "She lost her husband in 2015."),
+    ("divorced", "He is no longer with his wife."),
+    ("married", "She was married to Paul until he passed away in 2015."),
+    ("widowed", "Anna Muster has been happily married to Paul since 2010."),
+    ("single", "Anna Muster has never married."),
+    ("married", "Anna Muster lives with her husband Paul."),
+    ("unknown", "Anna Muster is currently single."),
+])
+def test_family_asks_model(status, text):
+    assert cheap_verdict('family_background', _client(status, text)) is None
+
+
+def test_names():
+    assert cheap_verdict('education_background', _client()) is True
+    assert cheap_verdict('work_background', _client()) is True
+    # A rephrased position may still be the same job: the model decides
+    rephrased = _client(occupation="In 2012, Anna Muster joined UBS AG, where she manages client portfolios.")
+    assert cheap_verdict('work_background', rephrased) is None
+
+
+def test_wealth():
+    client = _client()
+    assert cheap_verdict('wealth_background', client) is True
+    client['client_description']['Wealth Summary'] = "Her savings amount to 120 thousand."
+    assert cheap_verdict('wealth_background', client) is None
+
+
+def test_malformed_and_unknown_checks():
+    client = _client()
+    del client['client_profile']['secondary_school']
+    assert cheap_verdict('education_background', client) is None
+    assert cheap_verdict('client_summary', _client()) is None
+
+
+def test_never_rejects(eval_clients):
+    clients = [client for client in eval_clients if client is not None]
+    for name in CHEAP_CHECKS:
+        assert {cheap_verdict(name, client) for client in clients} <= {True, None}, name
+
+
+def test_tiered_checks_ask_model_when_unsure(tmp_path):
+    pytest.importorskip("ollama")
+    from llm_checks import LLMRunner, run_tiered_checks
+    from ollama_stub import StubServer
+
+    sure, unsure = _client(), _client("widowed", "She lost her husband in 2015.")
+    server = StubServer(answer=lambda model, messages, options: "False").start()
+    try:
+        with LLMRunner("stub", host=server.host, cache_path=None) as runner:
+            verdicts, report = run_tiered_checks([sure, unsure], runner, ['family_background'])
+    finally:
+        server.stop()
+    assert verdicts['family_background'] == [True, False]
+    assert (report['family_background']['cheap'], report['family_background']['llm']) == (1, 1)
+    assert len(server.requests) == 1
+
+# USAGE: python -m pytest -q test_prefilter.py
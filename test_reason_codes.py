@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from reason_codes import (MASK_COLUMN, REASONS, TABLE_KEY, decode_masks, encode_errors, load_reasons,
+                          read_errors, reason_counts, save_reasons, select_clients, write_errors)
+from rule_engine import flag_clients
+
+
+@pytest.fixture
+def client_errors(eval_clients):
+    return flag_clients(eval_clients, stats_path=None)[1]
+
+
+def _as_sets(client_errors):
+    # What a mask keeps of a list: its messages in REASONS order, each once
+    return [sorted(set(errors), key=REASONS.index) for errors in client_errors]
+
+
+def test_round_trip(client_errors):
+    masks = encode_errors(client_errors)
+    assert masks.dtype == np.uint64
+    assert decode_masks(masks) == _as_sets(client_errors)
+
+
+def test_unordered_and_repeated():
+    errors = [["MRZ Mismatch", "Missing docs", "MRZ Mismatch"], [], [REASONS[-1]]]
+    assert decode_masks(encode_errors(errors)) == [["Missing docs", "MRZ Mismatch"], [], [REASONS[-1]]]
+
+
+def test_unknown_message():
+    with pytest.raises(ValueError, match="Unknown error message"):
+        encode_errors([["Missing docs"], ["Not a reason"]])
+
+
+def test_counts_and_selection(client_errors):
+    masks = encode_errors(client_errors)
+    counts = reason_counts(masks)
+    for message, count in counts.items():
+        assert count == sum(message in errors for errors in client_errors)
+    selected = select_clients(masks, any_of=["MRZ Mismatch"], none_of=["Missing docs"])
+    assert selected.tolist() == ["MRZ Mismatch" in e and "Missing docs" not in e for e in client_errors]
+
+
+def test_save_and_load(client_errors, tmp_path):
+    path = str(tmp_path / "reasons.parquet")
+    masks = encode_errors(client_errors)
+    save_reasons(masks, path)
+    assert np.array_equal(load_reasons(path), masks)
+
+
+def test_load_other_table(tmp_path):
+    # A file written with the reasons in another order is re-coded to the current one
+    path = str(tmp_path / "reasons.parquet")
+    table = list(reversed(REASONS))
+    masks = np.array([1 << table.index("MRZ Mismatch") | 1 << table.index("Missing docs"), 0], dtype=np.uint64)
+    pq.write_table(pa.table({MASK_COLUMN: pa.array(masks)})
+                   .replace_schema_metadata({TABLE_KEY: json.dumps(table).encode("utf-8")}), path)
+    assert decode_masks(load_reasons(path)) == [["Missing docs", "MRZ Mismatch"], []]
+
+
+@pytest.mark.parametrize("name", ["errors.jsonl", "errors.pkl"])
+def test_exact_files(client_errors, tmp_path, name):
+    path = str(tmp_path / name)
+    client_errors = client_errors + [["MRZ Mismatch", "Missing docs", "MRZ Mismatch"]]
+    write_errors(client_errors, path)
+    assert read_errors(path) == client_errors
+
+
+def test_mask_file(client_errors, tmp_path):
+    path = str(tmp_path / "errors.parquet")
+    write_errors(client_errors, path)
+    assert read_errors(path) == _as_sets(client_errors)
+
+# USAGE: python -m pytest -q test_reason_codes.py
@@ -0,0 +1,102 @@
+import ast
+import json
+import os
+
+import numpy as np
+import pytest
+
+from client_store import write_store
+from rule_engine import RuleStats, client_frame, decide, default_rules, evaluate, flag_clients, flag_frame
+
+NOTEBOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "final_pipeline.ipynb")
+
+
+@pytest.fixture(scope="module")
+def check_all_flags():
+    """
+    check_all_flags of final_pipeline.ipynb: its code cells are run up to the one that
+    defines it (definitions only). Imports of the model and LLM cells that are not
+    installed are skipped.
+    """
+    for module in ("geopy", "pgeocode", "countryinfo", "email_validator"):
+        pytest.importorskip(module)
+    with open(NOTEBOOK_PATH, "r", encoding="utf-8") as f:
+        cells = [''.join(c['source']) for c in json.load(f)['cells'] if c['cell_type'] == 'code']
+    namespace = {}
+    for statement in ast.parse(cells[0]).body:
+        try:
+            exec(compile(ast.Module([statement], []), NOTEBOOK_PATH, "exec"), namespace)
+        except ImportError:
+            pass  # xgboost, ollama, ...: not used by the flags
+    for source in cells[1:]:
+        exec(compile(source, NOTEBOOK_PATH, "exec"), namespace)
+        if 'check_all_flags' in namespace:
+            return namespace['check_all_flags']
+    raise AssertionError("final_pipeline.ipynb no longer defines check_all_flags")
+
+
+def _notebook_results(check_all_flags, clients):
+    try:
+        results = [check_all_flags(client) for client in clients]
+    except OSError as e:
+        pytest.skip(f"pgeocode data not available: {e}")
+    return [r[0] for r in results], [r[1] for r in results]
+
+
+#### EXPLAIN MODE
+
+
+def test_explain_matches_notebook(eval_clients, check_all_flags):
+    assert flag_clients(eval_clients, stats_path=None) == _notebook_results(check_all_flags, eval_clients)
+
+
+#### DECIDE MODE
+
+
+def _random_stats(names, seed):
+    # A made-up history, so every seed schedules the rules in another order
+    rng = np.random.default_rng(seed)
+    stats = RuleStats(None)
+    for name in names:
+        rows = int(rng.integers(1, 10000))
+        stats.record(name, rows, rng.uniform(0.001, 1.0), rng.integers(0, rows))
+    return stats
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_decide_reports_first_explain_reason(eval_clients, seed):
+    frame = client_frame(eval_clients)
+    stats = _random_stats(default_rules(), seed)
+    explain_preds, explain_errors = flag_frame(frame, mode="explain")
+    decide_preds, decide_errors = flag_frame(frame, mode="decide", stats=stats)
+    assert decide_preds == explain_preds
+    assert decide_errors == [errors[:1] for errors in explain_errors]
+
+
+def test_decide_records_alive_rows(eval_clients):
+    frame = client_frame(eval_clients)
+    names = default_rules()
+    order = _random_stats(names, 0).schedule(names)
+    flags, _ = evaluate(frame, names)
+    stats = RuleStats(None)
+    decide(frame, names, stats, order=order)
+
+    # Before each rule: the complete clients no rule run earlier rejected
+    alive = ~flags['missing_docs'].to_numpy()
+    for name in order:
+        fired = flags[name].to_numpy()
+        entry = stats.totals.get(name, {"rows": 0, "hits": 0})
+        assert (entry["rows"], entry["hits"]) == (alive.sum(), (fired & alive).sum()), name
+        alive &= ~fired
+
+
+#### STORES
+
+
+@pytest.mark.parametrize("mode", ["explain", "decide"])
+def test_store_matches_list(eval_clients, tmp_path, mode):
+    path = str(tmp_path / "clients.parquet")
+    write_store(eval_clients, path, row_group_size=128)
+    assert flag_clients(path, mode=mode, stats_path=None) == flag_clients(eval_clients, mode=mode, stats_path=None)
+
+# USAGE: python -m pytest -q test_rule_engine.py
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from rule_engine import client_frame, default_rules, evaluate
+from rule_eval import evaluate_rules
+
+confusion_matrix = pytest.importorskip("sklearn.metrics").confusion_matrix
+
+
+@pytest.fixture
+def labels(eval_clients):
+    # clients_eval.pkl is unlabelled: made-up labels, a few clients left unlabelled
+    rng = np.random.default_rng(0)
+    return rng.choice(np.array(["Accept", "Reject", None], dtype=object), len(eval_clients), p=[0.45, 0.45, 0.1])
+
+
+def test_counts_match_confusion_matrix(eval_clients, labels):
+    table = evaluate_rules(eval_clients, labels=list(labels))
+    flags, _ = evaluate(client_frame(eval_clients), default_rules())
+    labelled = np.array([label is not None for label in labels])
+    reject = labels[labelled] == "Reject"
+    for rule in flags.columns:
+        fired = flags[rule].to_numpy()[labelled]
+        (tn, fp), (fn, tp) = confusion_matrix(reject, fired, labels=[False, True])
+        row = table.loc[rule]
+        assert (row.tp, row.fp, row.fn, row.tn) == (tp, fp, fn, tn), rule
+        assert row.precision == pytest.approx(tp / (tp + fp)) if tp + fp else np.isnan(row.precision)
+        assert row.recall == pytest.approx(tp / reject.sum())
+
+    fired = flags.to_numpy()[labelled].any(axis=1)
+    (tn, fp), (fn, tp) = confusion_matrix(reject, fired, labels=[False, True])
+    row = table.loc["_all"]
+    assert (row.tp, row.fp, row.fn, row.tn) == (tp, fp, fn, tn)
+
+
+def test_only_and_gain(eval_clients, labels):
+    table = evaluate_rules(eval_clients, labels=list(labels))
+    flags, _ = evaluate(client_frame(eval_clients), default_rules())
+    labelled = np.array([label is not None for label in labels])
+    reject = labels[labelled] == "Reject"
+    fired = flags.to_numpy()[labelled]
+    for j, rule in enumerate(flags.columns):
+        others = np.delete(fired, j, axis=1).any(axis=1)
+        alone = fired[:, j] & ~others
+        assert table.loc[rule, "only_tp"] == (alone & reject).sum(), rule
+        assert table.loc[rule, "only_fp"] == (alone & ~reject).sum(), rule
+        assert table.loc[rule, "gain_recall"] == pytest.approx((alone & reject).sum() / reject.sum())
+
+
+def test_flags_preds_labels(eval_clients, labels):
+    # flags_preds-style booleans: True is Accept
+    table = evaluate_rules(eval_clients, labels=list(labels))
+    booleans = [None if label is None else label == "Accept" for label in labels]
+    assert table.drop(columns=["seconds", "us_per_row"]).equals(
+        evaluate_rules(eval_clients, labels=booleans).drop(columns=["seconds", "us_per_row"]))
+
+
+def test_unlabelled(eval_clients):
+    with pytest.raises(ValueError, match="No labelled clients"):
+        evaluate_rules(eval_clients)
+
+# USAGE: python -m pytest -q test_rule_eval.py
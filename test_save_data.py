@@ -0,0 +1,65 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+from save_data import ingest_clients, iter_store, read_client_zip
+
+
+def _write_zip(zip_dir, i, client):
+    with zipfile.ZipFile(os.path.join(zip_dir, f"client_{i}.zip"), "w") as z:
+        for section, value in client.items():
+            z.writestr(f"{section}.json", json.dumps(value))
+
+
+@pytest.fixture
+def zip_dir(eval_clients, tmp_path):
+    zip_dir = tmp_path / "zips"
+    zip_dir.mkdir()
+    for i, client in enumerate(eval_clients[:40]):
+        if client is not None:
+            _write_zip(str(zip_dir), i, client)
+    (zip_dir / "client_7.zip").write_bytes(b"not a zip")
+    return str(zip_dir)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_ingest(eval_clients, zip_dir, tmp_path):
+    out = str(tmp_path / "clients.jsonl")
+    manifest = ingest_clients(zip_dir, out, workers=2, report_every=0)
+    expected = [None if i == 7 else client for i, client in enumerate(eval_clients[:40])]
+    assert list(iter_store(out)) == expected
+    assert manifest["missing"] == [i for i, client in enumerate(eval_clients[:40]) if client is None]
+    assert list(manifest["corrupt"]) == ["7"]
+    assert read_client_zip(os.path.join(zip_dir, "client_0.zip")) == eval_clients[0]
+
+
+def test_incremental_matches_full_rebuild(eval_clients, zip_dir, tmp_path):
+    out = str(tmp_path / "clients.jsonl")
+    ingest_clients(zip_dir, out, workers=2, report_every=0)
+
+    # One client changed, the corrupt zip fixed, one zip removed and one new index
+    changed = dict(eval_clients[3], label={"label": "Reject"})
+    _write_zip(zip_dir, 3, changed)
+    _write_zip(zip_dir, 7, eval_clients[8])
+    os.remove(os.path.join(zip_dir, "client_12.zip"))
+    _write_zip(zip_dir, 41, eval_clients[0])
+
+    manifest = ingest_clients(zip_dir, out, workers=2, report_every=0, incremental=True)
+    full = str(tmp_path / "full.jsonl")
+    full_manifest = ingest_clients(zip_dir, full, workers=2, report_every=0)
+
+    assert _read(out) == _read(full)
+    assert manifest["decoded"] == 3
+    assert manifest["changed"] == [3, 7, 12, 40, 41]
+    assert manifest["files"] == full_manifest["files"]
+    assert (manifest["missing"], manifest["corrupt"]) == (full_manifest["missing"], full_manifest["corrupt"])
+    clients = list(iter_store(out))
+    assert (clients[3], clients[7], clients[12], clients[41]) == (changed, eval_clients[8], None, eval_clients[0])
+
+# USAGE: python -m pytest -q test_save_data.py
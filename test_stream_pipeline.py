@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from rule_engine import flag_clients
+from stream_pipeline import read_errors, run_streaming
+
+BATCH_SIZE = 128
+
+
+def _crashing(clients, checkpoint_path, crash_at):
+    # Yields clients until crash_at, then waits for a batch to reach the log and fails
+    # like a killed reader
+    yield from clients[:crash_at]
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        with open(checkpoint_path, "rb") as f:
+            if sum(1 for _ in f) > 1:
+                break
+        time.sleep(0.01)
+    raise RuntimeError("crash")
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("mode", ["explain", "decide"])
+def test_matches_flag_clients(eval_clients, tmp_path, mode):
+    solution, errors = str(tmp_path / "solution.csv"), str(tmp_path / "errors.jsonl")
+    run_streaming(eval_clients, solution, errors, mode=mode, batch_size=BATCH_SIZE, stats_path=None)
+    flags_preds, client_errors = flag_clients(eval_clients, mode=mode, stats_path=None)
+    assert _read(solution).decode("utf-8") == "".join(
+        f"client_{i};{'Accept' if flag else 'Reject'}\n" for i, flag in enumerate(flags_preds))
+    assert read_errors(errors) == client_errors
+
+
+@pytest.mark.parametrize("errors_name", ["errors.jsonl", "errors.parquet"])
+@pytest.mark.parametrize("mode", ["explain", "decide"])
+def test_resume_after_crash(eval_clients, tmp_path, mode, errors_name):
+    expected = tmp_path / "expected"
+    expected.mkdir()
+    run_streaming(eval_clients, str(expected / "solution.csv"), str(expected / errors_name), mode=mode,
+                  batch_size=BATCH_SIZE, stats_path=None)
+
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    solution, errors = str(tmp_path / "solution.csv"), str(tmp_path / errors_name)
+    with pytest.raises(RuntimeError, match="crash"):
+        run_streaming(_crashing(eval_clients, checkpoint, 600), solution, errors, mode=mode,
+                      batch_size=BATCH_SIZE, checkpoint_path=checkpoint, stats_path=None)
+    with open(checkpoint, "a", encoding="utf-8") as f:
+        f.write('{"client": 9')  # torn line of a write the crash cut short
+
+    report = run_streaming(eval_clients, solution, errors, mode=mode, batch_size=BATCH_SIZE,
+                           checkpoint_path=checkpoint, resume=True, stats_path=None)
+    assert 0 < report["resumed"] <= 600
+    assert report["clients"] == len(eval_clients)
+    assert _read(solution) == _read(expected / "solution.csv")
+    assert _read(errors) == _read(expected / errors_name)
+
+
+def test_resume_other_run_refused(eval_clients, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    solution, errors = str(tmp_path / "solution.csv"), str(tmp_path / "errors.jsonl")
+    run_streaming(eval_clients[:100], solution, errors, mode="explain", checkpoint_path=checkpoint,
+                  stats_path=None)
+    with pytest.raises(ValueError, match="different run"):
+        run_streaming(eval_clients[:100], solution, errors, mode="decide", checkpoint_path=checkpoint,
+                      resume=True, stats_path=None)
+
+# USAGE: python -m pytest -q test_stream_pipeline.py